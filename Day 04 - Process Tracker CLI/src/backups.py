@@ -0,0 +1,293 @@
+"""
+Backups for the Process Tracker's tasks.json.
+
+Two modes (PROCESS_TRACKER_BACKUP_MODE):
+- "snapshot" (default): after a save, the new file content is copied to
+  data/backups/tasks_backup_<YYYYmmdd_HHMMSS>_<hash>.json, but only when its
+  tasks differ from every kept backup (sha256, ignoring the save counter and
+  rollups). Within BACKUP_MIN_INTERVAL_SECONDS of the newest backup the copy
+  is deferred: the latest content is written once the interval is over (or
+  when the program exits), so the end of a burst of edits is always backed
+  up. Old backups are thinned to the last
+  KEEP_LAST, one per hour for KEEP_HOURLY hours and one per day for
+  KEEP_DAILY days.
+- "journal": every change appends one line (the changed task, or a delete)
+  to data/tasks.journal.jsonl. Every JOURNAL_CHECKPOINT_OPS changes a full
+  checkpoint is written and the journal starts over. After a crash,
+  `recover` replays the journal on top of the checkpoint.
+- "off": no backups.
+
+Command line:
+    python src/backups.py list
+    python src/backups.py prune
+    python src/backups.py recover [--output FILE]
+"""
+import os
+import re
+import sys
+import json
+import atexit
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from datetime import datetime
+
+# Constants
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+BACKUP_DIR = DATA_DIR / "backups"
+JOURNAL_FILE = DATA_DIR / "tasks.journal.jsonl"
+CHECKPOINT_FILE = DATA_DIR / "tasks.checkpoint.json"
+BACKUP_MODE = os.environ.get("PROCESS_TRACKER_BACKUP_MODE", "snapshot").strip().lower()
+BACKUP_MODES = ("snapshot", "journal", "off")
+
+# Retention policy
+KEEP_LAST = 10
+KEEP_HOURLY = 24
+KEEP_DAILY = 30
+BACKUP_MIN_INTERVAL_SECONDS = 60
+# Journal entries between full checkpoints
+JOURNAL_CHECKPOINT_OPS = 200
+
+# tasks_backup_20251021_093000.json (old style) or tasks_backup_20251021_093000_1a2b3c4d.json
+BACKUP_NAME = re.compile(r"^tasks_backup_(\d{8}_\d{6})(?:_([0-9a-f]+))?\.json$")
+TS_FORMAT = "%Y%m%d_%H%M%S"
+
+def content_hash(content):
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+
+def data_hash(d):
+    # Hash of the task data alone: "version" and "rollups" change on every save even when the tasks do not
+    return content_hash(json.dumps({k: v for k, v in d.items() if k not in ("version", "rollups")}, sort_keys=True))
+
+def write_file(path, content, mode=None):
+    # write to a temp file, fsync, then rename over the target
+    # with `mode`, the file is created with those permissions (not chmod'ed afterwards)
+    tmp = path.with_name(path.name + ".tmp")
+    if mode is None:
+        f = tmp.open("w", encoding="utf-8")
+    else:
+        # a leftover temp file would keep its old permissions
+        tmp.unlink(missing_ok=True)
+        f = os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, mode), "w", encoding="utf-8")
+    with f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+class SnapshotBackups:
+    """Deduplicated, thinned full copies of tasks.json."""
+
+    def __init__(self, backup_dir=BACKUP_DIR, legacy_dir=DATA_DIR, keep_last=KEEP_LAST, keep_hourly=KEEP_HOURLY,
+                 keep_daily=KEEP_DAILY, min_interval=BACKUP_MIN_INTERVAL_SECONDS):
+        self.backup_dir = Path(backup_dir)
+        self.legacy_dir = Path(legacy_dir)
+        self.keep_last = keep_last
+        self.keep_hourly = keep_hourly
+        self.keep_daily = keep_daily
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self._backups = None  # cached list of (datetime, hash, path), newest first
+        self._deferred = None  # (content, hash) of a save that came too soon after the newest backup
+        self._timer = None
+        # a deferred backup is still written when the program exits before its timer fires
+        atexit.register(self.flush)
+
+    def list_backups(self):
+        # Backups in data/backups plus old-style ones left directly in data/
+        found = []
+        for folder in (self.backup_dir, self.legacy_dir):
+            if not folder.exists():
+                continue
+            for path in folder.iterdir():
+                m = BACKUP_NAME.match(path.name)
+                if m:
+                    found.append((datetime.strptime(m.group(1), TS_FORMAT), m.group(2), path))
+        found.sort(key=lambda b: (b[0], b[2].name), reverse=True)
+        return found
+
+    def _cached(self):
+        if self._backups is None:
+            self._backups = self.list_backups()
+        return self._backups
+
+    def record(self, content, changes=None, next_id=None, digest=None):
+        # Called after every save with the new file content; `digest` identifies the data for deduplication
+        with self.lock:
+            backups = self._cached()
+            digest = digest or content_hash(content)
+            now = datetime.now()
+            if any(b[1] == digest for b in backups):
+                self._deferred = None
+                return None  # identical content is already backed up
+            wait = self.min_interval - (now - backups[0][0]).total_seconds() if backups else 0
+            if wait > 0:
+                # too soon after the last backup: keep only the newest content and write it later
+                self._deferred = (content, digest)
+                if self._timer is None:
+                    self._timer = threading.Timer(wait, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return None
+            self._deferred = None
+            return self._write(content, digest, now)
+
+    def flush(self):
+        # Writes the deferred backup, if any (called by its timer and at exit)
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            deferred, self._deferred = self._deferred, None
+            if deferred is None:
+                return None
+            try:
+                return self._write(*deferred, datetime.now())
+            except OSError:
+                return None  # like a failed backup during a save: not worth crashing over
+
+    def _write(self, content, digest, now):
+        backups = self._cached()
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        path = self.backup_dir / f"tasks_backup_{now.strftime(TS_FORMAT)}_{digest}.json"
+        write_file(path, content)
+        backups.insert(0, (now, digest, path))  # exact time, so the interval check is not up to 1s early
+        self._prune(backups)
+        return path
+
+    def prune(self):
+        with self.lock:
+            self._backups = self.list_backups()
+            return self._prune(self._backups)
+
+    def _prune(self, backups):
+        keep = set()
+        hours, days = set(), set()
+        for i, (ts, _, path) in enumerate(backups):
+            hour, day = ts.strftime("%Y%m%d%H"), ts.strftime("%Y%m%d")
+            if i < self.keep_last:
+                keep.add(path)
+            if hour not in hours and len(hours) < self.keep_hourly:
+                keep.add(path)
+            if day not in days and len(days) < self.keep_daily:
+                keep.add(path)
+            hours.add(hour)
+            days.add(day)
+        removed = 0
+        for b in list(backups):
+            if b[2] not in keep:
+                try:
+                    b[2].unlink()
+                    removed += 1
+                except OSError:
+                    pass
+                backups.remove(b)
+        return removed
+
+class Journal:
+    """Append-only log of changed tasks with periodic full checkpoints."""
+
+    def __init__(self, journal_file=JOURNAL_FILE, checkpoint_file=CHECKPOINT_FILE, checkpoint_ops=JOURNAL_CHECKPOINT_OPS):
+        self.journal_file = Path(journal_file)
+        self.checkpoint_file = Path(checkpoint_file)
+        self.checkpoint_ops = checkpoint_ops
+        self.lock = threading.Lock()
+        self._ops = None  # entries since the last checkpoint
+
+    def record(self, content, changes=None, next_id=None, digest=None):
+        with self.lock:
+            if changes is None or not self.checkpoint_file.exists():
+                # Whole-document saves (or no base yet) start a fresh checkpoint
+                self.checkpoint(content)
+                return
+            if self._ops is None:
+                self._ops = self._count()
+            with self.journal_file.open("a", encoding="utf-8") as f:
+                for kind, value in changes:
+                    entry = {"ts": datetime.now().isoformat(), "next_id": next_id, kind: value}
+                    f.write(json.dumps(entry) + "\n")
+                    self._ops += 1
+                f.flush()
+                os.fsync(f.fileno())
+            if self._ops >= self.checkpoint_ops:
+                self.checkpoint(content)
+
+    def checkpoint(self, content):
+        # The checkpoint already contains every journaled change, so the journal can start over
+        write_file(self.checkpoint_file, content)
+        with self.journal_file.open("w", encoding="utf-8"):
+            pass
+        self._ops = 0
+
+    def _count(self):
+        if not self.journal_file.exists():
+            return 0
+        with self.journal_file.open("r", encoding="utf-8") as f:
+            return sum(1 for _ in f)
+
+    def replay(self):
+        # Checkpoint + journal -> the latest tasks.json document
+        d = {"next_id": 1, "tasks": []}
+        if self.checkpoint_file.exists():
+            with self.checkpoint_file.open("r", encoding="utf-8") as f:
+                d = json.load(f)
+        tasks = {t["id"]: t for t in d.get("tasks", [])}
+        applied = 0
+        if self.journal_file.exists():
+            with self.journal_file.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # torn last line from a crash mid-append
+                    if "put" in entry:
+                        tasks[entry["put"]["id"]] = entry["put"]
+                    elif "delete" in entry:
+                        tasks.pop(entry["delete"], None)
+                    if entry.get("next_id"):
+                        d["next_id"] = max(d.get("next_id", 1), entry["next_id"])
+                    applied += 1
+        d["tasks"] = sorted(tasks.values(), key=lambda t: t["id"])
+        # the checkpoint's rollups do not include the replayed entries; rebuilt on next use
+        d.pop("rollups", None)
+        return d, applied
+
+def open_backups(mode=BACKUP_MODE):
+    if mode not in BACKUP_MODES:
+        raise ValueError(f"Unknown PROCESS_TRACKER_BACKUP_MODE '{mode}', expected one of: {', '.join(BACKUP_MODES)}")
+    if mode == "journal":
+        return Journal()
+    if mode == "snapshot":
+        return SnapshotBackups()
+    return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Process Tracker backup tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="List snapshot backups, newest first")
+    sub.add_parser("prune", help="Apply the retention policy to snapshot backups now")
+    rec = sub.add_parser("recover", help="Rebuild tasks.json from the checkpoint and journal")
+    rec.add_argument("--output", default=str(DATA_DIR / "tasks.json"), help="Where to write the recovered data ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for ts, digest, path in SnapshotBackups().list_backups():
+            print(f"{ts.isoformat()}  {digest or '-':16}  {path}")
+    elif args.command == "prune":
+        print(f"Removed {SnapshotBackups().prune()} backups")
+    else:
+        journal = Journal()
+        if not journal.checkpoint_file.exists():
+            print(f"Error: no checkpoint at {journal.checkpoint_file}", file=sys.stderr)
+            sys.exit(1)
+        d, applied = journal.replay()
+        content = json.dumps(d, indent=2)
+        if args.output == "-":
+            print(content)
+        else:
+            write_file(Path(args.output), content)
+            print(f"Recovered {len(d['tasks'])} tasks ({applied} journal entries replayed) into {args.output}")
+
+if __name__ == "__main__":
+    main()
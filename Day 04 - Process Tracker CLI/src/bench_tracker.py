@@ -0,0 +1,201 @@
+"""
+Benchmark for the Process Tracker data layer.
+
+Generates a synthetic data set (N tasks x M sessions over the past year,
+tags drawn from a Zipf-like distribution), writes it as tasks.json and
+migrates it to tasks.db, then times for each backend:
+- load          full load of every task and session
+- save          full rewrite of the document
+- start_stop    start_task + stop_task cycles on random tasks
+- log_manual    manual log entries on random tasks
+- refresh       the GUI's TaskModel reload (tasks + totals, no sessions)
+- select        loading one task's sessions for the details pane
+- export        raw CSV export of every session (export.py)
+- export_week   export grouped per ISO week
+- report        minutes per tag per week from the rollups (reports.py)
+
+Times are the median of --repeat runs. Peak memory is measured in a separate
+run under tracemalloc, so its overhead does not distort the times. The data
+lives in a temporary folder; the real data/ folder is never touched.
+
+Example:
+    python src/bench_tracker.py --tasks 2000 --sessions 50 --output before.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+import argparse
+import tracemalloc
+from datetime import datetime, timedelta
+from storage import JsonBackend, SqliteBackend, migrate
+from backups import SnapshotBackups, Journal
+import export
+import reports
+
+PHASES = ("load", "save", "start_stop", "log_manual", "refresh", "select", "export", "export_week", "report")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Process Tracker storage backends")
+    parser.add_argument("--tasks", type=int, default=1000, help="Tasks to generate")
+    parser.add_argument("--sessions", type=int, default=50, help="Average sessions per task")
+    parser.add_argument("--tags", type=int, default=30, help="Size of the tag pool")
+    parser.add_argument("--ops", type=int, default=10, help="start/stop cycles and manual logs per run")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per phase (the median is reported)")
+    parser.add_argument("--backends", default="json,sqlite", help="Comma separated: json, sqlite")
+    parser.add_argument("--backup-mode", default="off", choices=("snapshot", "journal", "off"),
+                        help="Backups for the JSON backend (default off, to time the storage alone)")
+    parser.add_argument("--dir", help="Folder for the generated files (default: a new temp folder, removed afterwards)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for reproducible data")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    return parser.parse_args(argv)
+
+# Synthetic data
+def generate(task_count, sessions_per_task, tag_count, rng, now=None):
+    # tasks.json-style document; session counts vary around the average, minutes are log-normal
+    now = now or datetime.now().replace(microsecond=0)
+    tags = [f"tag{i}" for i in range(tag_count)]
+    weights = [1.0 / (rank + 1) for rank in range(tag_count)]
+    tasks = []
+    for tid in range(1, task_count + 1):
+        created = now - timedelta(days=rng.uniform(1, 365))
+        sessions = []
+        for _ in range(max(0, int(rng.gauss(sessions_per_task, sessions_per_task / 3)))):
+            start = created + timedelta(seconds=rng.uniform(0, (now - created).total_seconds()))
+            minutes = max(1, min(480, int(rng.lognormvariate(3.4, 0.8))))
+            manual = rng.random() < 0.1
+            end = start if manual else start + timedelta(minutes=minutes)
+            s = {"start": start.isoformat(), "end": end.isoformat(), "minutes": minutes}
+            if manual:
+                s["manual"] = True
+            sessions.append(s)
+        sessions.sort(key=lambda s: s["start"])
+        tasks.append({
+            "id": tid,
+            "title": f"Synthetic task {tid}",
+            "description": "Generated by bench_tracker.py",
+            "tags": sorted(set(rng.choices(tags, weights=weights, k=rng.randint(0, 3)))),
+            "estimate_minutes": rng.choice([None, 30, 60, 120, 240, 480]),
+            "created_at": created.isoformat(),
+            "completed": rng.random() < 0.3,
+            "sessions": sessions,
+            "running": None
+        })
+    return {"version": 0, "next_id": task_count + 1, "tasks": tasks}
+
+def write_dataset(folder, d):
+    json_file = os.path.join(folder, "tasks.json")
+    with open(json_file, "w", encoding="utf-8") as f:
+        json.dump(d, f, indent=2)
+    db_file = os.path.join(folder, "tasks.db")
+    migrate(json_file, db_file, force=True)
+    return json_file, db_file
+
+# Phases
+def make_phases(backend, folder, task_ids, ops, rng):
+    from process_tracker import TaskModel  # imports tkinter, but creates no window
+
+    def start_stop():
+        for tid in rng.sample(task_ids, min(ops, len(task_ids))):
+            backend.start_task(tid)
+            backend.stop_task()
+
+    def log_manual():
+        for tid in rng.sample(task_ids, min(ops, len(task_ids))):
+            backend.log_manual(tid, 5)
+
+    def save():
+        backend.save(backend.load())
+
+    def refresh():
+        model = TaskModel(backend)
+        model.refresh_if_changed()
+
+    return {
+        "load": backend.load,
+        "save": save,
+        "start_stop": start_stop,
+        "log_manual": log_manual,
+        "refresh": refresh,
+        "select": lambda: backend.get_task(rng.choice(task_ids)),
+        "export": lambda: export.export(os.path.join(folder, "bench_export.csv"), backend=backend),
+        "export_week": lambda: export.export(os.path.join(folder, "bench_week.csv"), group_by="week", backend=backend),
+        "report": lambda: reports.minutes(backend, "tag", "week"),
+    }
+
+def measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"median_ms": round(times[len(times) // 2] * 1000, 2), "min_ms": round(times[0] * 1000, 2),
+            "peak_kib": round(peak / 1024, 1)}
+
+def open_bench_backend(name, json_file, db_file, backup_mode):
+    if name == "sqlite":
+        return SqliteBackend(db_file)
+    # backups are kept inside the benchmark folder
+    folder = os.path.dirname(json_file)
+    backups = None
+    if backup_mode == "snapshot":
+        backups = SnapshotBackups(os.path.join(folder, "backups"), folder)
+    elif backup_mode == "journal":
+        backups = Journal(os.path.join(folder, "tasks.journal.jsonl"), os.path.join(folder, "tasks.checkpoint.json"))
+    return JsonBackend(json_file, backups)
+
+def main(argv=None):
+    args = parse_args(argv)
+    names = [n.strip() for n in args.backends.split(",") if n.strip()]
+    for name in names:
+        if name not in ("json", "sqlite"):
+            print(f"Error: unknown backend '{name}'", file=sys.stderr)
+            sys.exit(1)
+    folder = args.dir or tempfile.mkdtemp(prefix="process_tracker_bench_")
+    os.makedirs(folder, exist_ok=True)
+    rng = random.Random(args.seed)
+    try:
+        t0 = time.perf_counter()
+        d = generate(args.tasks, args.sessions, args.tags, rng)
+        session_count = sum(len(t["sessions"]) for t in d["tasks"])
+        json_file, db_file = write_dataset(folder, d)
+        print(f"Generated {args.tasks} tasks / {session_count} sessions in {time.perf_counter() - t0:.1f}s "
+              f"(tasks.json {os.path.getsize(json_file) / 1e6:.1f} MB)", file=sys.stderr)
+        task_ids = [t["id"] for t in d["tasks"]]
+        del d
+        results = {}
+        for name in names:
+            backend = open_bench_backend(name, json_file, db_file, args.backup_mode)
+            phases = make_phases(backend, folder, task_ids, args.ops, random.Random(args.seed))
+            results[name] = {}
+            for phase in PHASES:
+                results[name][phase] = measure(phases[phase], args.repeat)
+                r = results[name][phase]
+                print(f"{name:7} {phase:12} {r['median_ms']:>10.2f} ms  (min {r['min_ms']:.2f})  peak {r['peak_kib']:>10.1f} KiB",
+                      file=sys.stderr)
+            if hasattr(backend, "close"):
+                backend.close()
+        report = {
+            "tasks": args.tasks, "sessions": session_count, "tags": args.tags, "ops": args.ops,
+            "repeat": args.repeat, "backup_mode": args.backup_mode, "results": results
+        }
+        print(json.dumps(report, indent=2))
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+    finally:
+        if not args.dir:
+            shutil.rmtree(folder, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
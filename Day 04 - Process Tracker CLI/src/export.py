@@ -0,0 +1,216 @@
+"""
+Streaming timesheet export for the Process Tracker.
+
+Sessions are read one at a time from the active storage backend, filtered by
+date range, tag and task, optionally aggregated per day / week / task / tag,
+and written incrementally as CSV, JSON Lines or a columnar format:
+- "columns": JSON Lines where each line is one row group
+  {"rows": n, "columns": {"task_id": [...], "minutes": [...], ...}}
+- "parquet": real Parquet row groups (needs: pip install pyarrow)
+
+Memory stays bounded by the row-group size (raw export) or the number of
+groups (aggregated export). With the SQLite backend only the selected date
+range is read.
+
+Examples:
+    python src/export.py timesheet.csv
+    python src/export.py october.csv --from 2025-10-01 --to 2025-10-31 --tag writing
+    python src/export.py weekly.jsonl --group-by week
+    python src/export.py sessions.parquet --task 1 --task 3
+"""
+import sys
+import csv
+import json
+import argparse
+from datetime import date, timedelta
+from storage import open_backend, parse_iso
+
+FORMATS = ("csv", "jsonl", "columns", "parquet")
+GROUP_BY = ("day", "week", "task", "tag")
+FORMAT_EXTENSIONS = {"csv": ".csv", "jsonl": ".jsonl", "columns": ".columns.jsonl", "parquet": ".parquet"}
+# Rows buffered per columnar row group
+ROW_GROUP_SIZE = 10000
+
+# Raw export keeps the columns of the original GUI CSV export
+SESSION_FIELDS = ["task_id", "title", "start", "end", "minutes"]
+GROUP_FIELDS = {
+    "day": ["day", "minutes", "sessions"],
+    "week": ["week", "minutes", "sessions"],
+    "task": ["task_id", "title", "minutes", "sessions"],
+    "tag": ["tag", "minutes", "sessions"],
+}
+
+def date_range(date_from=None, date_to=None):
+    # Inclusive YYYY-MM-DD bounds -> ISO [since, until) strings for the backend
+    since = date.fromisoformat(date_from).isoformat() if date_from else None
+    until = (date.fromisoformat(date_to) + timedelta(days=1)).isoformat() if date_to else None
+    return since, until
+
+def iter_rows(backend=None, date_from=None, date_to=None, tag=None, task_ids=None):
+    backend = backend or open_backend()
+    since, until = date_range(date_from, date_to)
+    return backend.iter_sessions(since, until, tag or None, set(task_ids) if task_ids else None)
+
+def group_keys(row, by):
+    # One session can count towards several tags
+    if by == "tag":
+        return [(t,) for t in row["tags"]] or [("(untagged)",)]
+    if by == "task":
+        return [(row["task_id"], row["title"])]
+    start = parse_iso(row["start"])
+    if by == "day":
+        return [(start.date().isoformat(),)]
+    year, week, _ = start.isocalendar()
+    return [(f"{year}-W{week:02d}",)]
+
+def aggregate(rows, by):
+    # Streams rows into per-group totals; memory is one entry per group
+    totals = {}
+    for row in rows:
+        for key in group_keys(row, by):
+            entry = totals.setdefault(key, [0, 0])
+            entry[0] += row["minutes"]
+            entry[1] += 1
+    fields = GROUP_FIELDS[by]
+    for key in sorted(totals):
+        minutes, sessions = totals[key]
+        yield dict(zip(fields, key + (minutes, sessions)))
+
+class CsvWriter:
+    def __init__(self, f, fields):
+        self.writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+        self.writer.writeheader()
+
+    def write(self, row):
+        self.writer.writerow(row)
+
+    def close(self):
+        pass
+
+class JsonlWriter:
+    def __init__(self, f, fields):
+        self.f = f
+        self.fields = fields
+
+    def write(self, row):
+        self.f.write(json.dumps({k: row.get(k) for k in self.fields}) + "\n")
+
+    def close(self):
+        pass
+
+class ColumnsWriter:
+    """Buffers ROW_GROUP_SIZE rows, then writes them as one column-oriented JSON line."""
+
+    def __init__(self, f, fields, row_group_size=ROW_GROUP_SIZE):
+        self.f = f
+        self.fields = fields
+        self.row_group_size = row_group_size
+        self._columns = {k: [] for k in fields}
+        self._count = 0
+
+    def write(self, row):
+        for k in self.fields:
+            self._columns[k].append(row.get(k))
+        self._count += 1
+        if self._count >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if self._count:
+            self.f.write(json.dumps({"rows": self._count, "columns": self._columns}) + "\n")
+            self._columns = {k: [] for k in self.fields}
+            self._count = 0
+
+    def close(self):
+        self.flush()
+
+class ParquetWriter(ColumnsWriter):
+    """Same row groups as ColumnsWriter, written with pyarrow."""
+
+    def __init__(self, path, fields, row_group_size=ROW_GROUP_SIZE):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+        super().__init__(None, fields, row_group_size)
+        self.pa = pyarrow
+        self.path = path
+        self._writer = None
+        self._parquet = pyarrow.parquet
+
+    def flush(self):
+        if not self._count:
+            return
+        table = self.pa.table(self._columns)
+        if self._writer is None:
+            self._writer = self._parquet.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+        self._columns = {k: [] for k in self.fields}
+        self._count = 0
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+
+def guess_format(path, explicit=None):
+    if explicit:
+        return explicit
+    lower = path.lower()
+    # Longest extension first, so ".columns.jsonl" wins over ".jsonl"
+    for fmt, ext in sorted(FORMAT_EXTENSIONS.items(), key=lambda item: -len(item[1])):
+        if lower.endswith(ext):
+            return fmt
+    return "csv"
+
+def export(path, fmt=None, group_by=None, date_from=None, date_to=None, tag=None, task_ids=None, backend=None):
+    # Writes the export to `path` ('-' for stdout) and returns the number of rows written
+    fmt = guess_format(path, fmt)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}', expected one of: {', '.join(FORMATS)}")
+    if group_by and group_by not in GROUP_BY:
+        raise ValueError(f"Unknown grouping '{group_by}', expected one of: {', '.join(GROUP_BY)}")
+    rows = iter_rows(backend, date_from, date_to, tag, task_ids)
+    fields = SESSION_FIELDS
+    if group_by:
+        rows = aggregate(rows, group_by)
+        fields = GROUP_FIELDS[group_by]
+    if fmt == "parquet":
+        if path == "-":
+            raise ValueError("Parquet output needs a file path")
+        writer, f = ParquetWriter(path, fields), None
+    else:
+        f = sys.stdout if path == "-" else open(path, "w", newline="", encoding="utf-8")
+        writer = {"csv": CsvWriter, "jsonl": JsonlWriter, "columns": ColumnsWriter}[fmt](f, fields)
+    count = 0
+    try:
+        for row in rows:
+            writer.write(row)
+            count += 1
+        writer.close()
+    finally:
+        if f is not None and f is not sys.stdout:
+            f.close()
+    return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export Process Tracker sessions")
+    parser.add_argument("file", help="Output file ('-' for stdout); the extension picks the format")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--from", dest="date_from", help="First day to include (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", help="Last day to include (YYYY-MM-DD)")
+    parser.add_argument("--tag", help="Only tasks with this tag")
+    parser.add_argument("--task", type=int, action="append", dest="task_ids", help="Only this task id (repeatable)")
+    parser.add_argument("--group-by", choices=GROUP_BY, help="Aggregate minutes per day, ISO week, task or tag")
+    args = parser.parse_args(argv)
+    try:
+        count = export(args.file, args.format, args.group_by, args.date_from, args.date_to, args.tag, args.task_ids)
+    except (ValueError, RuntimeError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    if args.file != "-":
+        print(f"Exported {count} rows to {args.file}")
+
+if __name__ == "__main__":
+    main()
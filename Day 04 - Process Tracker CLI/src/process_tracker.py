@@ -1,76 +1,51 @@
 """
 Process Tracker GUI
 A simple Tkinter GUI for the Process Tracker CLI's data model.
-Reads/writes `data/tasks.json` in the same folder and keeps compatibility
-with the CLI tool. Features:
+Reads/writes `data/tasks.json` (or `data/tasks.db` with the SQLite backend,
+see storage.py) and keeps compatibility with the CLI tool. Features:
 - List tasks in a table
 - Add task dialog
 - Start / Stop timers
 - Mark complete / Reopen
 - Delete task
 - Live running timer display
-- Exports are still available via CLI script if needed
+- Export sessions (date range, tag, grouping) as CSV / JSONL / columnar, see export.py
 """
 import os
-import json
-import threading
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
+from storage import open_backend, parse_iso, BACKENDS, ConflictError
+from tracker_client import DaemonError
+import export
+import reports
 
 # Constants
 BASE_DIR = Path(__file__).resolve().parents[1] if (Path(__file__).resolve().parents and Path(__file__).exists()) else Path(".")
 DATA_DIR = BASE_DIR / "data"
 DATA_FILE = DATA_DIR / "tasks.json"
-LOCK = threading.Lock()
 UI_REFRESH_MS = 1000  # update UI every second
+SESSION_PAGE = 50     # sessions shown per "Show older sessions" click
+
+# Active storage backend (JSON file or SQLite, see storage.py)
+backend = open_backend()
+
+def use_local_backend():
+    # The daemon went away: read and write the data files directly again
+    global backend
+    backend = open_backend(backend.name if backend.name in BACKENDS else None)
+    return backend
 
 # Utilities for data handling
 def ensure_data():
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    if not DATA_FILE.exists():
-        with DATA_FILE.open("w", encoding="utf-8") as f:
-            json.dump({"next_id": 1, "tasks": []}, f, indent=2)
+    backend.ensure()
 
 def load_data():
-    ensure_data()
-    with LOCK:
-        with DATA_FILE.open("r", encoding="utf-8") as f:
-            return json.load(f)
+    return backend.load()
 
 def save_data(d):
-    ensure_data()
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup = DATA_DIR / f"tasks_backup_{ts}.json"
-    with LOCK:
-        # create backup
-        try:
-            with DATA_FILE.open("r", encoding="utf-8") as f:
-                old = f.read()
-            with backup.open("w", encoding="utf-8") as bf:
-                bf.write(old)
-        except Exception:
-            # ignore if backup fails (e.g., file missing)
-            pass
-        with DATA_FILE.open("w", encoding="utf-8") as f:
-            json.dump(d, f, indent=2)
-
-# Time helpers
-def iso_now():
-    return datetime.now().isoformat()
-
-def parse_iso(s):
-    try:
-        return datetime.fromisoformat(s)
-    except Exception:
-        # fallback naive parse
-        return datetime.strptime(s, "%Y-%m-%dT%H:%M:%S")
-
-def minutes_between(a_iso, b_iso):
-    a = parse_iso(a_iso)
-    b = parse_iso(b_iso)
-    return int((b - a).total_seconds() / 60)
+    backend.save(d)
 
 def human_delta_minutes(minutes):
     # return H:MM string
@@ -82,94 +57,195 @@ def human_delta_minutes(minutes):
 
 # Core operations (same semantics as CLI)
 def add_task(title, description="", tags=None, estimate_minutes=None):
-    d = load_data()
-    tid = d.get("next_id", 1)
-    task = {
-        "id": tid,
-        "title": title,
-        "description": description,
-        "tags": tags or [],
-        "estimate_minutes": estimate_minutes,
-        "created_at": iso_now(),
-        "completed": False,
-        "sessions": [],
-        "running": None
-    }
-    d.setdefault("tasks", []).append(task)
-    d["next_id"] = tid + 1
-    save_data(d)
-    return task
+    return backend.add_task(title, description, tags, estimate_minutes)
 
 def start_task(tid):
-    d = load_data()
-    # stop any running tasks first
-    for t in d.get("tasks", []):
-        if t.get("running"):
-            stop_task(t["id"], save=False)
-    task = next((t for t in d.get("tasks", []) if t["id"] == tid), None)
-    if not task:
-        raise ValueError("Task not found")
-    if task.get("running"):
-        return False
-    task["running"] = iso_now()
-    save_data(d)
-    return True
-
-def stop_task(tid=None, save=True):
-    d = load_data()
-    if tid is None:
-        task = next((t for t in d.get("tasks", []) if t.get("running")), None)
-    else:
-        task = next((t for t in d.get("tasks", []) if t["id"] == tid), None)
-    if not task or not task.get("running"):
-        return None
-    start = task["running"]
-    end = iso_now()
-    minutes = minutes_between(start, end)
-    session = {"start": start, "end": end, "minutes": minutes}
-    task.setdefault("sessions", []).append(session)
-    task["running"] = None
-    if save:
-        save_data(d)
-    return session
+    return backend.start_task(tid)
+
+def stop_task(tid=None):
+    return backend.stop_task(tid)
 
 def mark_done(tid):
-    d = load_data()
-    task = next((t for t in d.get("tasks", []) if t["id"] == tid), None)
-    if not task:
-        raise ValueError("Task not found")
-    task["completed"] = True
-    # if running, stop it
-    if task.get("running"):
-        stop_task(tid)
-    save_data(d)
+    backend.mark_done(tid)
 
 def reopen_task(tid):
-    d = load_data()
-    task = next((t for t in d.get("tasks", []) if t["id"] == tid), None)
-    if not task:
-        raise ValueError("Task not found")
-    task["completed"] = False
-    save_data(d)
+    backend.reopen_task(tid)
 
 def delete_task(tid):
-    d = load_data()
-    tasks = d.get("tasks", [])
-    idx = next((i for i, t in enumerate(tasks) if t["id"] == tid), None)
-    if idx is None:
-        raise ValueError("Task not found")
-    tasks.pop(idx)
-    save_data(d)
+    backend.delete_task(tid)
 
 def log_manual(tid, minutes):
-    d = load_data()
-    task = next((t for t in d.get("tasks", []) if t["id"] == tid), None)
-    if not task:
-        raise ValueError("Task not found")
-    now = iso_now()
-    session = {"start": now, "end": now, "minutes": minutes, "manual": True}
-    task.setdefault("sessions", []).append(session)
-    save_data(d)
+    backend.log_manual(tid, minutes)
+
+def get_task(tid):
+    return backend.get_task(tid)
+
+class TaskModel:
+    """In-memory copy of the tasks (without sessions) for the GUI, with per-task totals.
+
+    It reloads only when the storage reports a change (another process wrote)
+    or when invalidate() is called after the GUI's own changes.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.tasks = []          # sorted by id
+        self.by_id = {}
+        self.totals = {}         # task id -> minutes in finished sessions
+        self.running = None      # the running task, if any
+        self._token = None
+        self._loaded = False
+
+    def invalidate(self):
+        self._loaded = False
+
+    def refresh_if_changed(self):
+        # Returns True if the data was reloaded
+        token = self.backend.change_token()
+        if self._loaded and token == self._token:
+            return False
+        self._token = token
+        # Sessions are not loaded here; totals come from the storage's rollups
+        self.tasks = self.backend.task_summaries()
+        self.by_id = {t["id"]: t for t in self.tasks}
+        self.totals = {t["id"]: t.get("tracked_minutes", 0) for t in self.tasks}
+        self.running = next((t for t in self.tasks if t.get("running")), None)
+        self._loaded = True
+        return True
+
+    def counts(self):
+        total = len(self.tasks)
+        completed = sum(1 for t in self.tasks if t.get("completed"))
+        return total, total - completed, completed
+
+    def display_minutes(self, t):
+        # Finished sessions plus the elapsed time of a running timer
+        minutes = self.totals.get(t["id"], 0)
+        if t.get("running"):
+            try:
+                # calculate current extra minutes since running start
+                start = parse_iso(t["running"])
+                minutes += int((datetime.now() - start).total_seconds() / 60)
+            except Exception:
+                pass
+        return minutes
+
+class VirtualTable:
+    """Treeview that only materializes the visible rows.
+
+    The tree holds at most `height` items; scrolling re-fills them from the
+    row list, and an item is only updated when its values changed.
+    """
+
+    def __init__(self, tree, scrollbar, values_for, on_select=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.values_for = values_for  # task id -> tuple of column values
+        self.on_select = on_select
+        self.height = int(tree.cget("height"))
+        self.keys = []                # task ids of all rows, in display order
+        self.index = {}               # task id -> position in keys
+        self.offset = 0               # position of the first visible row
+        self.selected = None          # selected task id, kept while scrolled out of view
+        self._items = []              # tree items, top to bottom
+        self._shown = []              # (task id, values) currently in each item
+        scrollbar.configure(command=self.yview)
+        tree.bind("<<TreeviewSelect>>", self._on_tree_select)
+        tree.bind("<MouseWheel>", lambda e: self.scroll(-3 if e.delta > 0 else 3))
+        tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        tree.bind("<Button-5>", lambda e: self.scroll(3))
+        tree.bind("<Up>", lambda e: self.step(-1))
+        tree.bind("<Down>", lambda e: self.step(1))
+        tree.bind("<Prior>", lambda e: self.step(-self.height))
+        tree.bind("<Next>", lambda e: self.step(self.height))
+
+    def set_rows(self, keys):
+        self.keys = list(keys)
+        self.index = {k: i for i, k in enumerate(self.keys)}
+        if self.selected not in self.index:
+            self.selected = None
+        self.render()
+
+    def render(self):
+        self.offset = max(0, min(self.offset, len(self.keys) - self.height))
+        visible = self.keys[self.offset:self.offset + self.height]
+        # one tree item per visible row
+        while len(self._items) < len(visible):
+            self._items.append(self.tree.insert("", "end"))
+            self._shown.append(None)
+        while len(self._items) > len(visible):
+            self.tree.delete(self._items.pop())
+            self._shown.pop()
+        for i, key in enumerate(visible):
+            self._fill(i, key)
+        self._sync_selection()
+        n = len(self.keys)
+        if n:
+            self.scrollbar.set(self.offset / n, min(1.0, (self.offset + self.height) / n))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def refresh_row(self, key):
+        # Re-renders one row, if it is on screen
+        pos = self.index.get(key)
+        if pos is not None and self.offset <= pos < self.offset + len(self._items):
+            self._fill(pos - self.offset, key)
+
+    def _fill(self, i, key):
+        values = self.values_for(key)
+        if self._shown[i] != (key, values):
+            self.tree.item(self._items[i], values=values)
+            self._shown[i] = (key, values)
+
+    def _sync_selection(self):
+        pos = self.index.get(self.selected)
+        if pos is not None and self.offset <= pos < self.offset + len(self._items):
+            item = self._items[pos - self.offset]
+            if self.tree.selection() != (item,):
+                self.tree.selection_set(item)
+        elif self.tree.selection():
+            self.tree.selection_remove(self.tree.selection())
+
+    def _on_tree_select(self, event=None):
+        sel = self.tree.selection()
+        if not sel or sel[0] not in self._items:
+            return  # the selected row was scrolled out of view; keep it selected
+        key = self._shown[self._items.index(sel[0])][0]
+        if key != self.selected:
+            self.selected = key
+            if self.on_select:
+                self.on_select()
+
+    def yview(self, *args):
+        # Scrollbar command: ("moveto", fraction) or ("scroll", n, "units" | "pages")
+        if args[0] == "moveto":
+            self.offset = int(float(args[1]) * len(self.keys))
+        elif args[0] == "scroll":
+            self.offset += int(args[1]) * (self.height if args[2] == "pages" else 1)
+        self.render()
+
+    def scroll(self, rows):
+        self.offset += rows
+        self.render()
+        return "break"
+
+    def step(self, delta):
+        # Keyboard navigation across the whole list, not just the visible rows
+        if not self.keys:
+            return "break"
+        pos = self.index.get(self.selected)
+        if pos is None:
+            pos = self.offset - 1 if delta > 0 else self.offset + len(self._items)
+        pos = max(0, min(len(self.keys) - 1, pos + delta))
+        if pos < self.offset:
+            self.offset = pos
+        elif pos >= self.offset + self.height:
+            self.offset = pos - self.height + 1
+        self.selected = self.keys[pos]
+        self.render()
+        if self.on_select:
+            self.on_select()
+        return "break"
 
 # GUI Implementation
 class ProcessTrackerGUI(tk.Tk):
@@ -193,7 +269,7 @@ class ProcessTrackerGUI(tk.Tk):
         ttk.Button(controls_frame, text="Reopen", command=self.ui_reopen).pack(side="left", padx=6)
         ttk.Button(controls_frame, text="Delete", command=self.ui_delete).pack(side="left", padx=6)
         ttk.Button(controls_frame, text="Manual Log", command=self.ui_manual_log).pack(side="left", padx=6)
-        ttk.Button(controls_frame, text="Export CSV", command=self.ui_export_csv).pack(side="left", padx=6)
+        ttk.Button(controls_frame, text="Export...", command=self.ui_export_csv).pack(side="left", padx=6)
 
         # Stats frame
         stats_frame = ttk.LabelFrame(top_frame, text="Stats", padding=8)
@@ -207,13 +283,26 @@ class ProcessTrackerGUI(tk.Tk):
         self.lbl_completed.pack(anchor="w")
         self.lbl_running = ttk.Label(stats_frame, text="Currently Running: -")
         self.lbl_running.pack(anchor="w")
-
-        # Middle: Treeview table
+        self.lbl_today = ttk.Label(stats_frame, text="Today: 0m")
+        self.lbl_today.pack(anchor="w")
+        self.lbl_week = ttk.Label(stats_frame, text="This Week: 0m")
+        self.lbl_week.pack(anchor="w")
+
+        # Filter bar
+        filter_frame = ttk.Frame(self, padding=(10, 0))
+        filter_frame.pack(fill="x")
+        self.var_hide_completed = tk.BooleanVar(value=False)
+        ttk.Checkbutton(filter_frame, text="Hide completed", variable=self.var_hide_completed,
+                        command=self.rebuild_tree).pack(side="left")
+        self.lbl_showing = ttk.Label(filter_frame, text="")
+        self.lbl_showing.pack(side="right")
+
+        # Middle: Treeview table (only the visible rows exist as tree items, see VirtualTable)
         table_frame = ttk.Frame(self, padding=(10, 2))
         table_frame.pack(fill="both", expand=False)
 
         columns = ("id", "title", "est", "time_spent", "status", "running_since", "tags")
-        self.tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=15)
+        self.tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=15, selectmode="browse")
         self.tree.heading("id", text="ID")
         self.tree.heading("title", text="Title")
         self.tree.heading("est", text="Est (min)")
@@ -230,8 +319,7 @@ class ProcessTrackerGUI(tk.Tk):
         self.tree.column("tags", width=150, anchor="w")
         self.tree.pack(side="left", fill="both", expand=True)
 
-        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscroll=scrollbar.set)
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical")
         scrollbar.pack(side="right", fill="y")
 
         # Bottom: details & sessions
@@ -244,6 +332,10 @@ class ProcessTrackerGUI(tk.Tk):
 
         self.details_text = tk.Text(details_frame, wrap="word", height=10, state="disabled", font=("Segoe UI", 10))
         self.details_text.pack(fill="both", expand=True)
+        self.details_text.tag_configure("more", foreground="blue", underline=True)
+        self.details_text.tag_bind("more", "<Button-1>", self.show_more_sessions)
+        self.detail_sessions = []  # sessions of the selected task, newest first
+        self.sessions_shown = 0
 
         # Right pane: buttons and quick actions
         right_actions = ttk.Frame(bottom_frame)
@@ -253,20 +345,32 @@ class ProcessTrackerGUI(tk.Tk):
         ttk.Button(right_actions, text="Open Data Folder", command=self.open_data_folder).pack(fill="x", pady=4)
         ttk.Button(right_actions, text="Quit", command=self.quit).pack(fill="x", pady=4)
 
-        # Bind selection
-        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+        # Cached task data; reloaded only when the storage changes
+        self.model = TaskModel(backend)
+        self.table = VirtualTable(self.tree, scrollbar, self.row_values, self.on_select)
 
         # Start periodic UI refresh
         self.refresh()
         self.after(UI_REFRESH_MS, self._periodic_refresh)
 
     # ---------------- UI Actions ----------------
+    def show_error(self, e):
+        if isinstance(e, ConflictError):
+            # other processes kept saving tasks.json through every retry; nothing was changed
+            messagebox.showwarning("Busy", "Tasks are being changed by another program right now. Please try again.")
+        else:
+            messagebox.showerror("Error", str(e))
+
     def ui_add_task(self):
         dialog = AddTaskDialog(self)
         self.wait_window(dialog)
         if dialog.result:
             title, desc, tags, estimate = dialog.result
-            add_task(title, desc, tags, estimate)
+            try:
+                add_task(title, desc, tags, estimate)
+            except Exception as e:
+                self.show_error(e)
+                return
             self.refresh()
             messagebox.showinfo("Task Added", f"Added task: {title}")
 
@@ -282,7 +386,7 @@ class ProcessTrackerGUI(tk.Tk):
             else:
                 messagebox.showinfo("Already running", "Selected task is already running.")
         except Exception as e:
-            messagebox.showerror("Error", str(e))
+            self.show_error(e)
 
     def ui_stop_selected(self):
         sel = self.get_selected_task_id()
@@ -303,7 +407,7 @@ class ProcessTrackerGUI(tk.Tk):
                 self.refresh()
                 messagebox.showinfo("Stopped", f"Stopped session: +{res['minutes']} minutes")
         except Exception as e:
-            messagebox.showerror("Error", str(e))
+            self.show_error(e)
 
     def ui_mark_done(self):
         sel = self.get_selected_task_id()
@@ -314,7 +418,7 @@ class ProcessTrackerGUI(tk.Tk):
             mark_done(sel)
             self.refresh()
         except Exception as e:
-            messagebox.showerror("Error", str(e))
+            self.show_error(e)
 
     def ui_reopen(self):
         sel = self.get_selected_task_id()
@@ -325,7 +429,7 @@ class ProcessTrackerGUI(tk.Tk):
             reopen_task(sel)
             self.refresh()
         except Exception as e:
-            messagebox.showerror("Error", str(e))
+            self.show_error(e)
 
     def ui_delete(self):
         sel = self.get_selected_task_id()
@@ -338,7 +442,7 @@ class ProcessTrackerGUI(tk.Tk):
             delete_task(sel)
             self.refresh()
         except Exception as e:
-            messagebox.showerror("Error", str(e))
+            self.show_error(e)
 
     def ui_manual_log(self):
         sel = self.get_selected_task_id()
@@ -352,31 +456,23 @@ class ProcessTrackerGUI(tk.Tk):
             log_manual(sel, val)
             self.refresh()
         except Exception as e:
-            messagebox.showerror("Error", str(e))
+            self.show_error(e)
 
     def ui_export_csv(self):
-        d = load_data()
-        default = f"timesheet_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        path = filedialog.asksaveasfilename(defaultextension=".csv", initialfile=default, filetypes=[("CSV files","*.csv")])
+        dialog = ExportDialog(self)
+        self.wait_window(dialog)
+        if not dialog.result:
+            return
+        fmt, group_by, date_from, date_to, tag = dialog.result
+        ext = export.FORMAT_EXTENSIONS[fmt]
+        default = f"timesheet_{datetime.now().strftime('%Y%m%d_%H%M%S')}{ext}"
+        path = filedialog.asksaveasfilename(defaultextension=ext, initialfile=default, filetypes=[(f"{fmt.upper()} files", f"*{ext}")])
         if not path:
             return
-        import csv
-        rows = []
-        for t in d.get("tasks", []):
-            for s in t.get("sessions", []):
-                rows.append({
-                    "task_id": t["id"],
-                    "title": t["title"],
-                    "start": s.get("start"),
-                    "end": s.get("end"),
-                    "minutes": s.get("minutes", 0)
-                })
         try:
-            with open(path, "w", newline="", encoding="utf-8") as f:
-                writer = csv.DictWriter(f, fieldnames=["task_id","title","start","end","minutes"])
-                writer.writeheader()
-                writer.writerows(rows)
-            messagebox.showinfo("Exported", f"Exported {len(rows)} rows to {path}")
+            # Rows are streamed from the backend straight into the file
+            count = export.export(path, fmt, group_by, date_from, date_to, tag, backend=backend)
+            messagebox.showinfo("Exported", f"Exported {count} rows to {path}")
         except Exception as e:
             messagebox.showerror("Error exporting", str(e))
 
@@ -395,14 +491,7 @@ class ProcessTrackerGUI(tk.Tk):
 
     # ---------------- Helpers ----------------
     def get_selected_task_id(self):
-        sel = self.tree.selection()
-        if not sel:
-            return None
-        item = sel[0]
-        try:
-            return int(self.tree.set(item, "id"))
-        except Exception:
-            return None
+        return self.table.selected
 
     def on_select(self, event=None):
         tid = self.get_selected_task_id()
@@ -411,8 +500,7 @@ class ProcessTrackerGUI(tk.Tk):
             self.details_text.delete("1.0", "end")
             self.details_text.configure(state="disabled")
             return
-        d = load_data()
-        task = next((t for t in d.get("tasks", []) if t["id"] == tid), None)
+        task = self.model.by_id.get(tid)
         if not task:
             return
         self.details_text.configure(state="normal")
@@ -421,95 +509,89 @@ class ProcessTrackerGUI(tk.Tk):
         self.details_text.insert("end", f"Description: {task.get('description') or ''}\n")
         self.details_text.insert("end", f"Tags: {', '.join(task.get('tags') or [])}\n")
         self.details_text.insert("end", f"Estimate (min): {task.get('estimate_minutes') or ''}\n")
-        total = sum(s.get("minutes", 0) for s in task.get("sessions", []))
+        total = self.model.totals.get(tid, 0)
         self.details_text.insert("end", f"Total time tracked: {total} minutes ({human_delta_minutes(total)})\n")
         self.details_text.insert("end", f"Completed: {'Yes' if task.get('completed') else 'No'}\n")
         self.details_text.insert("end", f"Running: {task.get('running') or 'No'}\n\n")
-        self.details_text.insert("end", "Sessions:\n")
-        for s in task.get("sessions", []):
+        # Sessions are loaded for the selected task only, and shown a page at a time
+        full = self.model.backend.get_task(tid) or {}
+        self.detail_sessions = list(reversed(full.get("sessions", [])))
+        self.sessions_shown = 0
+        self.details_text.insert("end", f"Sessions ({len(self.detail_sessions)}, newest first):\n")
+        self.show_more_sessions()
+
+    def show_more_sessions(self, event=None):
+        text = self.details_text
+        text.configure(state="normal")
+        if text.tag_ranges("more"):
+            text.delete("more.first", "more.last")
+        page = self.detail_sessions[self.sessions_shown:self.sessions_shown + SESSION_PAGE]
+        for s in page:
             mark = " (manual)" if s.get("manual") else ""
-            self.details_text.insert("end", f" - {s.get('start')} → {s.get('end')} : {s.get('minutes')} min{mark}\n")
-        self.details_text.configure(state="disabled")
+            text.insert("end", f" - {s.get('start')} → {s.get('end')} : {s.get('minutes')} min{mark}\n")
+        self.sessions_shown += len(page)
+        remaining = len(self.detail_sessions) - self.sessions_shown
+        if remaining:
+            text.insert("end", f" ▸ Show {min(remaining, SESSION_PAGE)} older sessions ({remaining} left)\n", "more")
+        text.configure(state="disabled")
 
     def refresh(self):
-        # Reload data and refresh tree and stats
-        d = load_data()
-        tasks = sorted(d.get("tasks", []), key=lambda x: x["id"])
-        # Clear tree
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        total = len(tasks)
-        active = sum(1 for t in tasks if not t.get("completed"))
-        completed = sum(1 for t in tasks if t.get("completed"))
-        running_task = next((t for t in tasks if t.get("running")), None)
-        running_label = f"#{running_task['id']} - {running_task['title']}" if running_task else "-"
-        self.lbl_total.config(text=f"Total: {total}")
-        self.lbl_active.config(text=f"Active: {active}")
-        self.lbl_completed.config(text=f"Completed: {completed}")
-        self.lbl_running.config(text=f"Currently Running: {running_label}")
-
-        for t in tasks:
-            total_minutes = sum(s.get("minutes", 0) for s in t.get("sessions", []))
-            running_since = t.get("running") or ""
-            status = "Done" if t.get("completed") else ("Running" if t.get("running") else "Open")
-            tags = ", ".join(t.get("tags") or [])
-            est = t.get("estimate_minutes") or ""
-            # show human readable time spent
-            time_spent = human_delta_minutes(total_minutes)
-            self.tree.insert("", "end", values=(t["id"], t["title"], est, time_spent, status, running_since, tags))
+        # Reload data and refresh tree and stats (called after the GUI changes something)
+        self.model.invalidate()
+        self.model.refresh_if_changed()
+        self.rebuild_tree()
+
+    def rebuild_tree(self):
+        # Hand the (filtered) row list to the table; it only touches visible rows whose values changed
+        tasks = self.model.tasks
+        if self.var_hide_completed.get():
+            tasks = [t for t in tasks if not t.get("completed")]
+        self.table.set_rows(t["id"] for t in tasks)
+        self.lbl_showing.config(text=f"Showing {len(tasks)} of {len(self.model.tasks)}")
+        self.refresh_stats_labels()
 
         # Update details if selection exists
         self.on_select()
 
+    def row_values(self, tid):
+        t = self.model.by_id[tid]
+        running_since = t.get("running") or ""
+        status = "Done" if t.get("completed") else ("Running" if t.get("running") else "Open")
+        tags = ", ".join(t.get("tags") or [])
+        est = t.get("estimate_minutes") or ""
+        # show human readable time spent
+        time_spent = human_delta_minutes(self.model.display_minutes(t))
+        return (t["id"], t["title"], est, time_spent, status, running_since, tags)
+
     def _periodic_refresh(self):
-        # Update running timer display & tree periodically
-        # We will update time_spent for running task(s) in the tree
-        d = load_data()
-        tasks = {t["id"]: t for t in d.get("tasks", [])}
-        for item in self.tree.get_children():
-            try:
-                tid = int(self.tree.set(item, "id"))
-            except Exception:
-                continue
-            t = tasks.get(tid)
-            if not t:
-                continue
-            total_minutes = sum(s.get("minutes", 0) for s in t.get("sessions", []))
-            if t.get("running"):
-                try:
-                    # calculate current extra minutes since running start
-                    start = parse_iso(t["running"])
-                    extra = int((datetime.now() - start).total_seconds() / 60)
-                    display_minutes = total_minutes + extra
-                except Exception:
-                    display_minutes = total_minutes
-                time_spent = human_delta_minutes(display_minutes)
-                running_since = t.get("running")
-                status = "Running"
-            else:
-                time_spent = human_delta_minutes(total_minutes)
-                running_since = ""
-                status = "Done" if t.get("completed") else "Open"
-            # update tree row
-            self.tree.set(item, "time_spent", time_spent)
-            self.tree.set(item, "running_since", running_since)
-            self.tree.set(item, "status", status)
-        # update stats and details
-        self.refresh_stats_labels()
-        self.after(UI_REFRESH_MS, self._periodic_refresh)
+        # Reload only if the data changed (on disk, or as pushed by the daemon); otherwise just tick the running task's timer
+        try:
+            if self.model.refresh_if_changed():
+                self.rebuild_tree()
+            elif self.model.running is not None:
+                self.table.refresh_row(self.model.running["id"])
+        except DaemonError as e:
+            # switch to the local files once, instead of failing on every tick
+            self.model.backend = use_local_backend()
+            self.model.invalidate()
+            messagebox.showwarning("Daemon stopped", f"{e}\n\nThe tracker now uses {backend.name} storage directly.")
+        finally:
+            # keep ticking even if the daemon went away; the next tick retries
+            self.after(UI_REFRESH_MS, self._periodic_refresh)
 
     def refresh_stats_labels(self):
-        d = load_data()
-        tasks = d.get("tasks", [])
-        total = len(tasks)
-        active = sum(1 for t in tasks if not t.get("completed"))
-        completed = sum(1 for t in tasks if t.get("completed"))
-        running_task = next((t for t in tasks if t.get("running")), None)
+        total, active, completed = self.model.counts()
+        running_task = self.model.running
         running_label = f"#{running_task['id']} - {running_task['title']}" if running_task else "-"
         self.lbl_total.config(text=f"Total: {total}")
         self.lbl_active.config(text=f"Active: {active}")
         self.lbl_completed.config(text=f"Completed: {completed}")
         self.lbl_running.config(text=f"Currently Running: {running_label}")
+        # finished sessions only, read from the storage's rollups
+        today = reports.total_minutes(backend, *reports.period_range("today"))
+        week = reports.total_minutes(backend, *reports.period_range("week"))
+        self.lbl_today.config(text=f"Today: {human_delta_minutes(today)}")
+        self.lbl_week.config(text=f"This Week: {human_delta_minutes(week)}")
 
 # Simple dialog to add task
 class AddTaskDialog(tk.Toplevel):
@@ -557,6 +639,51 @@ class AddTaskDialog(tk.Toplevel):
         self.result = (title, desc, tags, estimate)
         self.destroy()
 
+# Export options dialog
+class ExportDialog(tk.Toplevel):
+    def __init__(self, master):
+        super().__init__(master)
+        self.title("Export Sessions")
+        self.geometry("360x240")
+        self.resizable(False, False)
+        self.result = None
+
+        form = ttk.Frame(self)
+        form.pack(fill="both", expand=True, padx=10, pady=10)
+        self.entry_from = self._row(form, 0, "From (YYYY-MM-DD):", ttk.Entry(form))
+        self.entry_to = self._row(form, 1, "To (YYYY-MM-DD):", ttk.Entry(form))
+        self.entry_tag = self._row(form, 2, "Tag:", ttk.Entry(form))
+        self.var_group = tk.StringVar(value="sessions")
+        self._row(form, 3, "Group by:", ttk.Combobox(form, textvariable=self.var_group, state="readonly",
+                                                     values=("sessions",) + export.GROUP_BY))
+        self.var_format = tk.StringVar(value="csv")
+        self._row(form, 4, "Format:", ttk.Combobox(form, textvariable=self.var_format, state="readonly",
+                                                   values=export.FORMATS))
+        form.columnconfigure(1, weight=1)
+
+        btn_frame = ttk.Frame(self)
+        btn_frame.pack(fill="x", pady=10)
+        ttk.Button(btn_frame, text="Export", command=self.on_export).pack(side="right", padx=8)
+        ttk.Button(btn_frame, text="Cancel", command=self.destroy).pack(side="right")
+
+    def _row(self, form, row, label, widget):
+        ttk.Label(form, text=label).grid(row=row, column=0, sticky="w", pady=3)
+        widget.grid(row=row, column=1, sticky="ew", padx=(6,0), pady=3)
+        return widget
+
+    def on_export(self):
+        date_from = self.entry_from.get().strip() or None
+        date_to = self.entry_to.get().strip() or None
+        try:
+            export.date_range(date_from, date_to)
+        except ValueError:
+            messagebox.showwarning("Validation", "Dates must be in YYYY-MM-DD format.")
+            return
+        group_by = self.var_group.get()
+        self.result = (self.var_format.get(), None if group_by == "sessions" else group_by,
+                       date_from, date_to, self.entry_tag.get().strip() or None)
+        self.destroy()
+
 # Entry point
 def main():
     ensure_data()
@@ -0,0 +1,127 @@
+"""
+Reports for the Process Tracker, answered from the precomputed rollups.
+
+The storage backends keep minutes per day, per tag per day and per task per
+day (see rollups.py) up to date as sessions are added, so these queries read
+a few hundred counters instead of every session:
+- minutes per day / tag / task, bucketed per day, ISO week, month or quarter
+- estimate vs actual per task
+
+Only finished sessions are counted; a running timer shows up once stopped.
+
+Examples:
+    python src/reports.py minutes --by tag --per week --range quarter
+    python src/reports.py minutes --by task --from 2025-10-01 --to 2025-10-31
+    python src/reports.py minutes --range week
+    python src/reports.py estimates --tag writing
+"""
+import sys
+import argparse
+from datetime import date, timedelta
+from storage import open_backend
+
+BY = ("day", "tag", "task")
+PER = ("day", "week", "month", "quarter", "all")
+RANGES = ("today", "week", "month", "quarter", "year", "all")
+
+def period_range(name, today=None):
+    # Inclusive-exclusive (since, until) YYYY-MM-DD strings for "this week", "this quarter", ...
+    today = today or date.today()
+    if name == "all":
+        return None, None
+    if name == "today":
+        start, end = today, today + timedelta(days=1)
+    elif name == "week":
+        start = today - timedelta(days=today.weekday())
+        end = start + timedelta(days=7)
+    elif name == "month":
+        start = today.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1)
+    elif name == "quarter":
+        start = date(today.year, 3 * ((today.month - 1) // 3) + 1, 1)
+        end = date(start.year + (start.month == 10), (start.month + 2) % 12 + 1, 1)
+    elif name == "year":
+        start, end = date(today.year, 1, 1), date(today.year + 1, 1, 1)
+    else:
+        raise ValueError(f"Unknown range '{name}', expected one of: {', '.join(RANGES)}")
+    return start.isoformat(), end.isoformat()
+
+def bucket(day, per):
+    # Report bucket label for a YYYY-MM-DD day
+    if per == "day":
+        return day
+    if per == "all":
+        return "all"
+    d = date.fromisoformat(day)
+    if per == "week":
+        year, week, _ = d.isocalendar()
+        return f"{year}-W{week:02d}"
+    if per == "month":
+        return day[:7]
+    return f"{d.year}-Q{(d.month - 1) // 3 + 1}"
+
+def minutes(backend=None, by="tag", per="week", since=None, until=None):
+    # [(bucket, key, minutes, sessions)] sorted by bucket, then minutes descending
+    backend = backend or open_backend()
+    kind = "day" if by == "day" else by
+    totals = {}
+    for day, key, m, n in backend.rollup_rows(kind, since, until):
+        entry = totals.setdefault((bucket(day, per), key), [0, 0])
+        entry[0] += m
+        entry[1] += n
+    return sorted(((b, key, m, n) for (b, key), (m, n) in totals.items()), key=lambda r: (r[0], -r[2], r[1]))
+
+def total_minutes(backend=None, since=None, until=None):
+    backend = backend or open_backend()
+    return sum(m for _, _, m, _ in backend.rollup_rows("day", since, until))
+
+def estimate_vs_actual(backend=None, tag=None, include_completed=True):
+    # Tasks with an estimate: (task, actual minutes, actual - estimate, actual / estimate)
+    backend = backend or open_backend()
+    actual = {int(key): m for _, key, m, _ in backend.rollup_rows("total")}
+    result = []
+    for t in backend.task_summaries():
+        if not t.get("estimate_minutes"):
+            continue
+        if tag and tag not in (t.get("tags") or []):
+            continue
+        if not include_completed and t.get("completed"):
+            continue
+        spent = actual.get(t["id"], 0)
+        result.append((t, spent, spent - t["estimate_minutes"], spent / t["estimate_minutes"]))
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Process Tracker reports")
+    sub = parser.add_subparsers(dest="command", required=True)
+    mins = sub.add_parser("minutes", help="Minutes per day, tag or task")
+    mins.add_argument("--by", choices=BY, default="tag")
+    mins.add_argument("--per", choices=PER, default="week", help="Bucket size")
+    mins.add_argument("--range", choices=RANGES, default="all", help="This day / week / month / quarter / year")
+    mins.add_argument("--from", dest="date_from", help="First day to include (YYYY-MM-DD), overrides --range")
+    mins.add_argument("--to", dest="date_to", help="Last day to include (YYYY-MM-DD), overrides --range")
+    est = sub.add_parser("estimates", help="Estimate vs actual per task")
+    est.add_argument("--tag", help="Only tasks with this tag")
+    est.add_argument("--open", action="store_true", help="Skip completed tasks")
+    args = parser.parse_args(argv)
+
+    backend = open_backend()
+    try:
+        if args.command == "estimates":
+            for t, spent, diff, ratio in estimate_vs_actual(backend, args.tag, not args.open):
+                print(f"#{t['id']:<5} {t['title'][:40]:40} est {t['estimate_minutes']:>6}  actual {spent:>6}  {diff:+7}  {ratio:6.0%}")
+            return
+        since, until = period_range(args.range)
+        if args.date_from or args.date_to:
+            since = date.fromisoformat(args.date_from).isoformat() if args.date_from else None
+            until = (date.fromisoformat(args.date_to) + timedelta(days=1)).isoformat() if args.date_to else None
+        titles = {t["id"]: t["title"] for t in backend.task_summaries()} if args.by == "task" else {}
+        for b, key, m, n in minutes(backend, args.by, args.per, since, until):
+            label = f"#{key} {titles.get(int(key), '')}" if args.by == "task" else key
+            print(f"{b:12} {label[:40]:40} {m:>7} min  {n:>5} sessions")
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
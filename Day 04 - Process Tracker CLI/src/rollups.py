@@ -0,0 +1,69 @@
+"""
+Precomputed time rollups for the Process Tracker.
+
+Every finished session adds its minutes to a handful of counters, keyed by
+(kind, day, key):
+- ("day", day, "")          minutes per day
+- ("tag", day, tag)         minutes per tag per day ("(untagged)" for tasks without tags)
+- ("task", day, task id)    minutes per task per day
+- ("total", "", task id)    minutes per task, all time
+
+A session counts towards the day it started on. The storage backends apply
+these increments in the same save/transaction that appends the session
+(stop, manual log) or deletes the task, so reports.py can answer range
+queries from the counters instead of rescanning every session.
+"""
+
+KINDS = ("day", "tag", "task", "total")
+UNTAGGED = "(untagged)"
+
+def session_day(session):
+    return (session.get("start") or "")[:10]
+
+def increments(task, session, sign=1):
+    # (kind, day, key, minutes, sessions) rows for one session; sign=-1 takes it out again
+    day = session_day(session)
+    minutes = sign * (session.get("minutes") or 0)
+    tid = str(task["id"])
+    keys = [("day", day, ""), ("task", day, tid), ("total", "", tid)]
+    keys += [("tag", day, tag) for tag in sorted(set(task.get("tags") or [UNTAGGED]))]
+    return [(kind, d, key, minutes, sign) for kind, d, key in keys]
+
+def task_increments(task, sign=1):
+    rows = []
+    for s in task.get("sessions", []):
+        rows.extend(increments(task, s, sign))
+    return rows
+
+# In-memory form, kept inside tasks.json by the JSON backend:
+# {"version": <tasks.json version>, "day": {day: {key: [minutes, sessions]}}, "tag": {...}, ...}
+def empty(version=0):
+    r = {kind: {} for kind in KINDS}
+    r["version"] = version
+    return r
+
+def apply(r, rows):
+    for kind, day, key, minutes, sessions in rows:
+        by_key = r[kind].setdefault(day, {})
+        entry = by_key.setdefault(key, [0, 0])
+        entry[0] += minutes
+        entry[1] += sessions
+        if entry[1] <= 0:
+            # the last session of this bucket was removed
+            del by_key[key]
+            if not by_key:
+                del r[kind][day]
+
+def build(tasks, version=0):
+    r = empty(version)
+    for t in tasks:
+        apply(r, task_increments(t))
+    return r
+
+def rows(r, kind, since=None, until=None):
+    # (day, key, minutes, sessions) with since <= day < until (YYYY-MM-DD strings)
+    for day, by_key in r[kind].items():
+        if kind != "total" and ((since and day < since) or (until and day >= until)):
+            continue
+        for key, (minutes, sessions) in by_key.items():
+            yield day, key, minutes, sessions
@@ -0,0 +1,842 @@
+"""
+Storage backends for the Process Tracker.
+
+- JsonBackend keeps everything in `data/tasks.json` (the original format,
+  rewritten on every change; backups/journal handled by backups.py).
+- SqliteBackend keeps tasks and sessions in `data/tasks.db`, indexed by task
+  id and session start, so each operation only touches the rows it changes.
+
+Both keep the per-day / per-tag / per-task minute rollups of rollups.py up
+to date in the same save that adds or removes sessions.
+
+Both expose the same operations, so process_tracker.py does not care which
+one is active. The backend is picked by PROCESS_TRACKER_BACKEND ("json" or
+"sqlite"); when unset, SQLite is used once `data/tasks.db` exists. If the
+tracker daemon is running, open_backend() returns a client for it instead
+(see tracker_daemon.py).
+
+Command line:
+    python src/storage.py migrate            # tasks.json -> tasks.db (one shot)
+    python src/storage.py export out.json    # tasks.db -> CLI-compatible JSON ('-' for stdout)
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import functools
+import threading
+from pathlib import Path
+from datetime import datetime
+import rollups
+import tracker_client
+from backups import open_backups, write_file, data_hash
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Constants
+BASE_DIR = Path(__file__).resolve().parents[1]
+DATA_DIR = BASE_DIR / "data"
+DATA_FILE = DATA_DIR / "tasks.json"
+DB_FILE = DATA_DIR / "tasks.db"
+BACKENDS = ("json", "sqlite")
+# How often a JSON operation is retried when another process saved in between
+SAVE_RETRIES = 8
+# Longest wait before the first retry; doubled for each further retry (with random jitter)
+RETRY_BACKOFF_SECONDS = 0.01
+# "version" is written first, so it can be read without parsing the whole file
+VERSION_PATTERN = re.compile(r'"version":\s*(\d+)')
+
+# Time helpers
+def iso_now():
+    return datetime.now().isoformat()
+
+def parse_iso(s):
+    try:
+        return datetime.fromisoformat(s)
+    except Exception:
+        # fallback naive parse
+        return datetime.strptime(s, "%Y-%m-%dT%H:%M:%S")
+
+def minutes_between(a_iso, b_iso):
+    a = parse_iso(a_iso)
+    b = parse_iso(b_iso)
+    return int((b - a).total_seconds() / 60)
+
+def make_task(tid, title, description="", tags=None, estimate_minutes=None):
+    return {
+        "id": tid,
+        "title": title,
+        "description": description,
+        "tags": tags or [],
+        "estimate_minutes": estimate_minutes,
+        "created_at": iso_now(),
+        "completed": False,
+        "sessions": [],
+        "running": None
+    }
+
+def session_row(task, s):
+    # Flat row used by exports and reports
+    return {
+        "task_id": task["id"],
+        "title": task["title"],
+        "tags": task.get("tags") or [],
+        "start": s.get("start"),
+        "end": s.get("end"),
+        "minutes": s.get("minutes", 0),
+        "manual": bool(s.get("manual")),
+    }
+
+def close_session(start):
+    # Session dict for a timer that ran from `start` until now
+    end = iso_now()
+    return {"start": start, "end": end, "minutes": minutes_between(start, end)}
+
+class ConflictError(RuntimeError):
+    """tasks.json was saved by someone else since it was loaded."""
+
+class FileLock:
+    """Advisory lock on a side file, shared by every process using the same data folder (GUI, CLI, scripts).
+
+    Re-entrant: nested `with` blocks only lock once. Threads of one process must not share it
+    without a lock of their own (JsonBackend.lock).
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._fd = None
+        self._depth = 0
+
+    def __enter__(self):
+        if self._depth:
+            self._depth += 1
+            return self
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+        except Exception:
+            os.close(self._fd)
+            raise
+        self._depth = 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._depth -= 1
+        if self._depth:
+            return False
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+        return False
+
+def conflict_backoff(attempt):
+    # Random wait before retry number `attempt` (0-based), so processes that collided do not collide again
+    time.sleep(random.uniform(0, RETRY_BACKOFF_SECONDS * 2 ** attempt))
+
+def retry_on_conflict(op):
+    # Re-runs a load/modify/save operation when another process saved first
+    @functools.wraps(op)
+    def wrapper(self, *args, **kwargs):
+        for attempt in range(SAVE_RETRIES - 1):
+            try:
+                return op(self, *args, **kwargs)
+            except ConflictError:
+                conflict_backoff(attempt)
+        # Still losing the race: hold the file lock from load to save, so the last attempt cannot conflict
+        with self.lock, self.file_lock:
+            return op(self, *args, **kwargs)
+    return wrapper
+
+class JsonBackend:
+    """The whole data set in one JSON document (rewritten on every change)."""
+
+    name = "json"
+
+    def __init__(self, data_file=DATA_FILE, backups=None):
+        self.data_file = Path(data_file)
+        self.data_dir = self.data_file.parent
+        self.backups = backups  # SnapshotBackups / Journal from backups.py, or None
+        # re-entrant: the last retry of an operation holds it around the operation's own load and save
+        self.lock = threading.RLock()
+        self.file_lock = FileLock(self.data_file.with_name(self.data_file.name + ".lock"))
+        self._snapshot = None  # (file identity, parsed document) shared by the read-only operations
+
+    def ensure(self):
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        if not self.data_file.exists():
+            with self.lock, self.file_lock:
+                if not self.data_file.exists():
+                    write_file(self.data_file, json.dumps({"version": 0, "next_id": 1, "tasks": []}, indent=2))
+
+    def load(self):
+        self.ensure()
+        with self.lock:
+            # Saves replace the file atomically, so reads never see a partial write and need no file lock
+            with self.data_file.open("r", encoding="utf-8") as f:
+                d = json.load(f)
+        d.setdefault("version", 0)
+        return d
+
+    def change_token(self):
+        # Cheap "has the file changed?" check for readers that cache the data
+        try:
+            st = self.data_file.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def read(self):
+        # Parsed document for read-only operations, reused until the file is replaced. A GUI refresh
+        # (summaries, today/week totals, the selected task) therefore parses tasks.json once.
+        # Callers must not modify it; load() returns a private copy for changes.
+        self.ensure()
+        try:
+            st = self.data_file.stat()
+            key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            key = None
+        snapshot = self._snapshot
+        if key is not None and snapshot is not None and snapshot[0] == key:
+            return snapshot[1]
+        d = self.load()
+        self._snapshot = (key, d)
+        return d
+
+    def disk_version(self):
+        try:
+            with self.data_file.open("r", encoding="utf-8") as f:
+                m = VERSION_PATTERN.search(f.read(64))
+        except FileNotFoundError:
+            return 0
+        return int(m.group(1)) if m else 0
+
+    def save(self, d, changes=None):
+        # `changes` lists what this save changed, [("put", task)] or [("delete", tid)], for the journal.
+        # Raises ConflictError if the file's version moved since `d` was loaded.
+        self.ensure()
+        with self.lock, self.file_lock:
+            expected = d.get("version", 0)
+            if self.disk_version() != expected:
+                raise ConflictError(f"{self.data_file} was changed by another process")
+            d["version"] = expected + 1
+            r = d.get("rollups")
+            if changes is not None and r and r.get("version") == expected:
+                # the operation kept the rollups current
+                r["version"] = d["version"]
+            else:
+                # whole-document saves may have changed any session: rebuild now, so reads stay incremental
+                d["rollups"] = rollups.build(d.get("tasks", []), d["version"])
+            content = json.dumps({"version": d["version"], **{k: v for k, v in d.items() if k != "version"}}, indent=2)
+            # temp file + fsync + rename: a crash leaves either the old or the new file, never a truncated one
+            write_file(self.data_file, content)
+            if self.backups is not None:
+                try:
+                    self.backups.record(content, changes, d.get("next_id"), data_hash(d))
+                except OSError:
+                    # a failed backup must not fail the save itself
+                    pass
+
+    def transaction(self):
+        # One load, one save: see JsonTransaction
+        return JsonTransaction(self)
+
+    def _rollups(self, d):
+        # Rollups stamped with another version were written by a tool that does not maintain them
+        r = d.get("rollups")
+        if not r or r.get("version") != d["version"]:
+            r = d["rollups"] = rollups.build(d.get("tasks", []), d["version"])
+        return r
+
+    def list_tasks(self):
+        return self.read().get("tasks", [])
+
+    def task_summaries(self):
+        # Tasks without their sessions, plus "tracked_minutes" from the rollups
+        d = self.read()
+        totals = self._rollups(d)["total"].get("", {})
+        return [dict({k: v for k, v in t.items() if k != "sessions"}, tracked_minutes=totals.get(str(t["id"]), [0, 0])[0])
+                for t in d.get("tasks", [])]
+
+    def rollup_rows(self, kind, since=None, until=None):
+        return list(rollups.rows(self._rollups(self.read()), kind, since, until))
+
+    def iter_sessions(self, since=None, until=None, tag=None, task_ids=None):
+        # Session rows with since <= start < until (ISO strings); the JSON file has to be read whole
+        for t in self.list_tasks():
+            if task_ids and t["id"] not in task_ids:
+                continue
+            if tag and tag not in (t.get("tags") or []):
+                continue
+            for s in t.get("sessions", []):
+                start = s.get("start") or ""
+                if (since and start < since) or (until and start >= until):
+                    continue
+                yield session_row(t, s)
+
+    def get_task(self, tid):
+        return next((t for t in self.list_tasks() if t["id"] == tid), None)
+
+    @retry_on_conflict
+    def add_task(self, title, description="", tags=None, estimate_minutes=None):
+        with self.transaction() as tx:
+            tid = tx.d.get("next_id", 1)
+            task = make_task(tid, title, description, tags, estimate_minutes)
+            tx.add(task)
+            tx.d["next_id"] = tid + 1
+        return task
+
+    @retry_on_conflict
+    def start_task(self, tid):
+        with self.transaction() as tx:
+            task = tx.find(tid)
+            if task.get("running"):
+                return False
+            # stop the running task first, in the same save
+            if tx.running is not None:
+                tx.stop(tx.running)
+            task["running"] = iso_now()
+            tx.running = task
+            tx.put(task)
+        return True
+
+    @retry_on_conflict
+    def stop_task(self, tid=None):
+        with self.transaction() as tx:
+            task = tx.running if tid is None else tx.by_id.get(tid)
+            if not task or not task.get("running"):
+                return None
+            return tx.stop(task)
+
+    @retry_on_conflict
+    def mark_done(self, tid):
+        with self.transaction() as tx:
+            task = tx.find(tid)
+            task["completed"] = True
+            # if running, stop it
+            if task.get("running"):
+                tx.stop(task)
+            tx.put(task)
+
+    @retry_on_conflict
+    def reopen_task(self, tid):
+        with self.transaction() as tx:
+            task = tx.find(tid)
+            task["completed"] = False
+            tx.put(task)
+
+    @retry_on_conflict
+    def delete_task(self, tid):
+        with self.transaction() as tx:
+            tx.remove(tx.find(tid))
+
+    @retry_on_conflict
+    def log_manual(self, tid, minutes):
+        with self.transaction() as tx:
+            task = tx.find(tid)
+            now = iso_now()
+            tx.add_session(task, {"start": now, "end": now, "minutes": minutes, "manual": True})
+
+class JsonTransaction:
+    """Unit of work on tasks.json: loads once, indexes tasks by id, saves once.
+
+    Used as a context manager; the save (with the journal changes collected
+    by put/add/remove) happens on a clean exit, and only if something
+    changed. A ConflictError from the save lets @retry_on_conflict re-run
+    the whole operation.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.d = backend.load()
+        self.tasks = self.d.setdefault("tasks", [])
+        self.by_id = {}
+        self.running = None  # the task with a running timer, if any
+        for t in self.tasks:
+            self.by_id[t["id"]] = t
+            if t.get("running") and self.running is None:
+                self.running = t
+        self.changes = {}  # task id -> ("put", task) / ("delete", tid), for the journal
+        self._rollups = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        return False
+
+    def find(self, tid):
+        task = self.by_id.get(tid)
+        if not task:
+            raise ValueError("Task not found")
+        return task
+
+    def put(self, task):
+        self.changes[task["id"]] = ("put", task)
+
+    def add(self, task):
+        self.tasks.append(task)
+        self.by_id[task["id"]] = task
+        self.put(task)
+
+    def remove(self, task):
+        rollups.apply(self.rollups(), rollups.task_increments(task, -1))
+        self.tasks.remove(task)
+        del self.by_id[task["id"]]
+        if self.running is task:
+            self.running = None
+        self.changes[task["id"]] = ("delete", task["id"])
+
+    def rollups(self):
+        if self._rollups is None:
+            self._rollups = self.backend._rollups(self.d)
+        return self._rollups
+
+    def add_session(self, task, session):
+        r = self.rollups()
+        task.setdefault("sessions", []).append(session)
+        rollups.apply(r, rollups.increments(task, session))
+        self.put(task)
+        return session
+
+    def stop(self, task):
+        # Closes the task's running timer into a session
+        session = close_session(task["running"])
+        task["running"] = None
+        if self.running is task:
+            self.running = None
+        return self.add_session(task, session)
+
+    def commit(self):
+        if self.changes:
+            self.backend.save(self.d, list(self.changes.values()))
+            self.changes = {}
+
+class SqliteBackend:
+    """Tasks and sessions in SQLite; every operation reads and writes only the rows it needs."""
+
+    name = "sqlite"
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL,
+        description TEXT NOT NULL DEFAULT '',
+        tags TEXT NOT NULL DEFAULT '[]',
+        estimate_minutes INTEGER,
+        created_at TEXT NOT NULL,
+        completed INTEGER NOT NULL DEFAULT 0,
+        running TEXT
+    );
+    CREATE TABLE IF NOT EXISTS sessions (
+        id INTEGER PRIMARY KEY,
+        task_id INTEGER NOT NULL REFERENCES tasks (id) ON DELETE CASCADE,
+        start TEXT NOT NULL,
+        end TEXT NOT NULL,
+        minutes INTEGER NOT NULL DEFAULT 0,
+        manual INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_sessions_task ON sessions (task_id, start);
+    CREATE INDEX IF NOT EXISTS idx_sessions_start ON sessions (start);
+    CREATE INDEX IF NOT EXISTS idx_tasks_running ON tasks (running) WHERE running IS NOT NULL;
+    CREATE TABLE IF NOT EXISTS rollups (
+        kind TEXT NOT NULL,
+        day TEXT NOT NULL,
+        key TEXT NOT NULL,
+        minutes INTEGER NOT NULL DEFAULT 0,
+        sessions INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (kind, day, key)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_rollups_key ON rollups (kind, key);
+    INSERT OR IGNORE INTO meta (key, value) VALUES ('next_id', 1);
+    """
+
+    def __init__(self, db_file=DB_FILE):
+        self.db_file = Path(db_file)
+        self.lock = threading.Lock()
+        self._conn = None
+
+    def connect(self):
+        if self._conn is None:
+            self.db_file.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_file, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA foreign_keys = ON")
+            conn.execute("PRAGMA busy_timeout = 5000")
+            conn.executescript(self.SCHEMA)
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'rollups'").fetchone() is None:
+                # databases from before the rollups table: fill it once from the sessions
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._rebuild_rollups(conn)
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+            self._conn = conn
+        return self._conn
+
+    def ensure(self):
+        self.connect()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def change_token(self):
+        # data_version changes whenever another connection (e.g. the CLI) commits
+        with self.lock:
+            return self.connect().execute("PRAGMA data_version").fetchone()[0]
+
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so read-modify-write steps cannot interleave
+        return _Transaction(self)
+
+    # Row conversion
+    def _session_dict(self, row):
+        s = {"start": row["start"], "end": row["end"], "minutes": row["minutes"]}
+        if row["manual"]:
+            s["manual"] = True
+        return s
+
+    def _task_dict(self, row, sessions):
+        return {
+            "id": row["id"],
+            "title": row["title"],
+            "description": row["description"],
+            "tags": json.loads(row["tags"]),
+            "estimate_minutes": row["estimate_minutes"],
+            "created_at": row["created_at"],
+            "completed": bool(row["completed"]),
+            "sessions": sessions,
+            "running": row["running"]
+        }
+
+    def load(self):
+        # Whole data set in the tasks.json layout (used for exports and full refreshes)
+        with self.lock:
+            conn = self.connect()
+            next_id = conn.execute("SELECT value FROM meta WHERE key = 'next_id'").fetchone()[0]
+            sessions = {}
+            for row in conn.execute("SELECT * FROM sessions ORDER BY task_id, id"):
+                sessions.setdefault(row["task_id"], []).append(self._session_dict(row))
+            tasks = [self._task_dict(row, sessions.get(row["id"], []))
+                     for row in conn.execute("SELECT * FROM tasks ORDER BY id")]
+        return {"next_id": next_id, "tasks": tasks}
+
+    def save(self, d, changes=None):
+        # Replaces everything with the given tasks.json-style document
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM sessions")
+            conn.execute("DELETE FROM tasks")
+            for t in d.get("tasks", []):
+                self._insert_task(conn, t)
+            next_id = d.get("next_id") or max((t["id"] for t in d.get("tasks", [])), default=0) + 1
+            conn.execute("UPDATE meta SET value = ? WHERE key = 'next_id'", (next_id,))
+            self._rebuild_rollups(conn)
+
+    # Rollups (see rollups.py)
+    def _rebuild_rollups(self, conn):
+        conn.execute("DELETE FROM rollups")
+        tags = {row["id"]: json.loads(row["tags"]) for row in conn.execute("SELECT id, tags FROM tasks")}
+        batch = []
+        for row in conn.execute("SELECT task_id, start, minutes FROM sessions"):
+            batch.extend(rollups.increments({"id": row["task_id"], "tags": tags.get(row["task_id"])}, dict(row)))
+            if len(batch) >= 5000:
+                self._apply_rollups(conn, batch)
+                batch = []
+        self._apply_rollups(conn, batch)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('rollups', 1)")
+
+    def _apply_rollups(self, conn, rows):
+        conn.executemany(
+            "INSERT INTO rollups (kind, day, key, minutes, sessions) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (kind, day, key) DO UPDATE SET "
+            "minutes = minutes + excluded.minutes, sessions = sessions + excluded.sessions", rows
+        )
+        removed = [row[:3] for row in rows if row[4] < 0]
+        if removed:
+            conn.executemany("DELETE FROM rollups WHERE kind = ? AND day = ? AND key = ? AND sessions <= 0", removed)
+
+    def _rollup_task(self, conn, tid):
+        return {"id": tid, "tags": json.loads(conn.execute("SELECT tags FROM tasks WHERE id = ?", (tid,)).fetchone()[0])}
+
+    def rollup_rows(self, kind, since=None, until=None):
+        conditions, params = ["kind = ?"], [kind]
+        if kind != "total":
+            if since:
+                conditions.append("day >= ?")
+                params.append(since)
+            if until:
+                conditions.append("day < ?")
+                params.append(until)
+        with self.lock:
+            return [tuple(row) for row in self.connect().execute(
+                f"SELECT day, key, minutes, sessions FROM rollups WHERE {' AND '.join(conditions)}", params)]
+
+    def _insert_task(self, conn, t):
+        conn.execute(
+            "INSERT INTO tasks (id, title, description, tags, estimate_minutes, created_at, completed, running) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (t["id"], t["title"], t.get("description") or "", json.dumps(t.get("tags") or []),
+             t.get("estimate_minutes"), t.get("created_at") or iso_now(), int(bool(t.get("completed"))), t.get("running"))
+        )
+        conn.executemany(
+            "INSERT INTO sessions (task_id, start, end, minutes, manual) VALUES (?, ?, ?, ?, ?)",
+            [(t["id"], s.get("start"), s.get("end"), s.get("minutes", 0), int(bool(s.get("manual"))))
+             for s in t.get("sessions", [])]
+        )
+
+    def list_tasks(self):
+        return self.load()["tasks"]
+
+    def task_summaries(self):
+        # Tasks without their sessions, plus "tracked_minutes" from the rollups
+        with self.lock:
+            rows = self.connect().execute(
+                "SELECT t.*, COALESCE(r.minutes, 0) AS tracked_minutes FROM tasks t LEFT JOIN rollups r "
+                "ON r.kind = 'total' AND r.day = '' AND r.key = CAST(t.id AS TEXT) ORDER BY t.id"
+            ).fetchall()
+        summaries = []
+        for row in rows:
+            t = self._task_dict(row, [])
+            del t["sessions"]
+            t["tracked_minutes"] = row["tracked_minutes"]
+            summaries.append(t)
+        return summaries
+
+    def iter_sessions(self, since=None, until=None, tag=None, task_ids=None):
+        # Streams session rows in start order; the date range is answered from idx_sessions_start
+        conditions, params = [], []
+        if since:
+            conditions.append("s.start >= ?")
+            params.append(since)
+        if until:
+            conditions.append("s.start < ?")
+            params.append(until)
+        if task_ids:
+            conditions.append(f"s.task_id IN ({','.join('?' * len(task_ids))})")
+            params.extend(task_ids)
+        if tag:
+            conditions.append("EXISTS (SELECT 1 FROM json_each(t.tags) WHERE json_each.value = ?)")
+            params.append(tag)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        # A separate read connection, so a long export does not hold up the app's own connection
+        conn = sqlite3.connect(self.db_file)
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.execute(
+                "SELECT s.*, t.title, t.tags FROM sessions s JOIN tasks t ON t.id = s.task_id "
+                f"{where} ORDER BY s.start", params
+            )
+            for row in cursor:
+                s = self._session_dict(row)
+                yield session_row({"id": row["task_id"], "title": row["title"], "tags": json.loads(row["tags"])}, s)
+        finally:
+            conn.close()
+
+    def get_task(self, tid):
+        with self.lock:
+            conn = self.connect()
+            row = conn.execute("SELECT * FROM tasks WHERE id = ?", (tid,)).fetchone()
+            if row is None:
+                return None
+            sessions = [self._session_dict(s) for s in
+                        conn.execute("SELECT * FROM sessions WHERE task_id = ? ORDER BY id", (tid,))]
+        return self._task_dict(row, sessions)
+
+    def _require(self, conn, tid):
+        row = conn.execute("SELECT id, running FROM tasks WHERE id = ?", (tid,)).fetchone()
+        if row is None:
+            raise ValueError("Task not found")
+        return row
+
+    def _close_running(self, conn, tid, start):
+        session = close_session(start)
+        conn.execute(
+            "INSERT INTO sessions (task_id, start, end, minutes) VALUES (?, ?, ?, ?)",
+            (tid, session["start"], session["end"], session["minutes"])
+        )
+        conn.execute("UPDATE tasks SET running = NULL WHERE id = ?", (tid,))
+        self._apply_rollups(conn, rollups.increments(self._rollup_task(conn, tid), session))
+        return session
+
+    def add_task(self, title, description="", tags=None, estimate_minutes=None):
+        with self._transaction() as conn:
+            tid = conn.execute("SELECT value FROM meta WHERE key = 'next_id'").fetchone()[0]
+            task = make_task(tid, title, description, tags, estimate_minutes)
+            self._insert_task(conn, task)
+            conn.execute("UPDATE meta SET value = ? WHERE key = 'next_id'", (tid + 1,))
+        return task
+
+    def start_task(self, tid):
+        with self._transaction() as conn:
+            if self._require(conn, tid)["running"]:
+                return False
+            # stop any running tasks first
+            for row in conn.execute("SELECT id, running FROM tasks WHERE running IS NOT NULL").fetchall():
+                self._close_running(conn, row["id"], row["running"])
+            conn.execute("UPDATE tasks SET running = ? WHERE id = ?", (iso_now(), tid))
+        return True
+
+    def stop_task(self, tid=None):
+        with self._transaction() as conn:
+            if tid is None:
+                row = conn.execute("SELECT id, running FROM tasks WHERE running IS NOT NULL LIMIT 1").fetchone()
+            else:
+                row = conn.execute("SELECT id, running FROM tasks WHERE id = ?", (tid,)).fetchone()
+            if not row or not row["running"]:
+                return None
+            return self._close_running(conn, row["id"], row["running"])
+
+    def mark_done(self, tid):
+        with self._transaction() as conn:
+            row = self._require(conn, tid)
+            # if running, stop it
+            if row["running"]:
+                self._close_running(conn, tid, row["running"])
+            conn.execute("UPDATE tasks SET completed = 1 WHERE id = ?", (tid,))
+
+    def reopen_task(self, tid):
+        with self._transaction() as conn:
+            self._require(conn, tid)
+            conn.execute("UPDATE tasks SET completed = 0 WHERE id = ?", (tid,))
+
+    def delete_task(self, tid):
+        with self._transaction() as conn:
+            self._require(conn, tid)
+            task = self._rollup_task(conn, tid)
+            task["sessions"] = [dict(row) for row in conn.execute("SELECT start, minutes FROM sessions WHERE task_id = ?", (tid,))]
+            self._apply_rollups(conn, rollups.task_increments(task, -1))
+            conn.execute("DELETE FROM tasks WHERE id = ?", (tid,))
+
+    def log_manual(self, tid, minutes):
+        with self._transaction() as conn:
+            self._require(conn, tid)
+            now = iso_now()
+            conn.execute(
+                "INSERT INTO sessions (task_id, start, end, minutes, manual) VALUES (?, ?, ?, ?, 1)",
+                (tid, now, now, minutes)
+            )
+            self._apply_rollups(conn, rollups.increments(self._rollup_task(conn, tid), {"start": now, "minutes": minutes}))
+
+class _Transaction:
+    # Context manager: backend lock + BEGIN IMMEDIATE ... COMMIT/ROLLBACK
+    def __init__(self, backend):
+        self.backend = backend
+
+    def __enter__(self):
+        self.backend.lock.acquire()
+        try:
+            self.conn = self.backend.connect()
+            self.conn.execute("BEGIN IMMEDIATE")
+        except Exception:
+            self.backend.lock.release()
+            raise
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.conn.execute("COMMIT" if exc_type is None else "ROLLBACK")
+        finally:
+            self.backend.lock.release()
+        return False
+
+def default_backend_name():
+    name = os.environ.get("PROCESS_TRACKER_BACKEND", "").strip().lower()
+    if name:
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown PROCESS_TRACKER_BACKEND '{name}', expected one of: {', '.join(BACKENDS)}")
+        return name
+    return "sqlite" if DB_FILE.exists() else "json"
+
+def open_backend(name=None):
+    if name is None:
+        # while tracker_daemon.py runs it owns the data; talk to it instead
+        client = tracker_client.connect()
+        if client is not None:
+            return client
+    name = name or default_backend_name()
+    if name == "sqlite":
+        # SQLite's own WAL journal protects the database; backups.py only covers tasks.json
+        return SqliteBackend()
+    return JsonBackend(backups=open_backups())
+
+# CLI: migrate / export
+def migrate(json_file=DATA_FILE, db_file=DB_FILE, force=False):
+    src = JsonBackend(json_file)
+    if not src.data_file.exists():
+        raise FileNotFoundError(f"{src.data_file} does not exist")
+    dst = SqliteBackend(db_file)
+    try:
+        with dst.lock:
+            existing = dst.connect().execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+        if existing and not force:
+            raise ValueError(f"{dst.db_file} already has {existing} tasks (use --force to replace them)")
+        d = src.load()
+        dst.save(d)
+        return len(d.get("tasks", [])), sum(len(t.get("sessions", [])) for t in d.get("tasks", []))
+    finally:
+        dst.close()
+
+def export_json(target, db_file=DB_FILE):
+    src = SqliteBackend(db_file)
+    try:
+        d = src.load()
+    finally:
+        src.close()
+    json.dump(d, target, indent=2)
+    return len(d["tasks"])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Process Tracker storage tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    mig = sub.add_parser("migrate", help="Copy data/tasks.json into data/tasks.db")
+    mig.add_argument("--json", default=str(DATA_FILE), help="Source JSON file")
+    mig.add_argument("--db", default=str(DB_FILE), help="Target SQLite file")
+    mig.add_argument("--force", action="store_true", help="Replace tasks already in the database")
+    exp = sub.add_parser("export", help="Write the SQLite data as CLI-compatible tasks.json ('-' for stdout)")
+    exp.add_argument("file")
+    exp.add_argument("--db", default=str(DB_FILE), help="Source SQLite file")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "migrate":
+            tasks, sessions = migrate(args.json, args.db, args.force)
+            print(f"Migrated {tasks} tasks and {sessions} sessions into {args.db}")
+        elif args.file == "-":
+            export_json(sys.stdout, args.db)
+        else:
+            with open(args.file, "w", encoding="utf-8") as f:
+                count = export_json(f, args.db)
+            print(f"Exported {count} tasks to {args.file}")
+    except (ValueError, FileNotFoundError, sqlite3.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Thin client for the Process Tracker daemon (tracker_daemon.py).
+
+TrackerClient has the same methods as the storage backends, so
+storage.open_backend() hands it out whenever a daemon is running: the GUI,
+export.py and reports.py then talk to the daemon instead of reading
+tasks.json themselves. Set PROCESS_TRACKER_DAEMON=off to bypass it.
+
+change_token() does no I/O: a background thread long-polls GET /events and
+the token is the daemon's change counter, so the GUI reloads as soon as
+anything changes instead of checking the file every second.
+
+Command line:
+    python src/tracker_client.py status
+    python src/tracker_client.py list
+    python src/tracker_client.py add "Write README" --tags docs,writing --estimate 45
+    python src/tracker_client.py start 3
+    python src/tracker_client.py stop
+    python src/tracker_client.py log 3 30
+    python src/tracker_client.py watch          # prints a line per change
+"""
+import os
+import sys
+import json
+import argparse
+import threading
+import http.client
+from pathlib import Path
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+DAEMON_FILE = DATA_DIR / "daemon.json"
+# Connect timeout used to decide whether a daemon is running
+PROBE_TIMEOUT_SECONDS = 0.5
+REQUEST_TIMEOUT_SECONDS = 10
+EVENTS_TIMEOUT_SECONDS = 25
+
+class DaemonError(RuntimeError):
+    """The daemon could not be reached or answered with an error."""
+
+class TrackerClient:
+    """Storage backend that forwards every operation to the daemon."""
+
+    def __init__(self, port, token, backend_name="daemon"):
+        self.port = port
+        self.token = token
+        self.name = backend_name
+        self._seq = None
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def _request(self, method, path, body=None, timeout=REQUEST_TIMEOUT_SECONDS):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=timeout)
+        try:
+            conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                         headers={"X-Tracker-Token": self.token, "Content-Type": "application/json"})
+            resp = conn.getresponse()
+            payload = json.loads(resp.read() or b"{}")
+        except (OSError, http.client.HTTPException) as e:
+            raise DaemonError(f"Process Tracker daemon not reachable: {e}")
+        finally:
+            conn.close()
+        if resp.status == 400:
+            # the operation itself failed (e.g. "Task not found"), same as a local backend
+            raise ValueError(payload.get("error"))
+        if resp.status != 200:
+            raise DaemonError(payload.get("error") or f"HTTP {resp.status}")
+        return payload
+
+    def _call(self, method, **params):
+        return self._request("POST", f"/rpc/{method}", params)["result"]
+
+    def status(self, timeout=REQUEST_TIMEOUT_SECONDS):
+        return self._request("GET", "/status", timeout=timeout)
+
+    # Storage backend interface
+    def ensure(self):
+        pass
+
+    def load(self):
+        return self._call("load")
+
+    def list_tasks(self):
+        return self._call("list_tasks")
+
+    def task_summaries(self):
+        return self._call("task_summaries")
+
+    def get_task(self, tid):
+        return self._call("get_task", tid=tid)
+
+    def rollup_rows(self, kind, since=None, until=None):
+        return self._call("rollup_rows", kind=kind, since=since, until=until)
+
+    def iter_sessions(self, since=None, until=None, tag=None, task_ids=None):
+        # Rows arrive as JSON lines and are yielded as they are read
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=REQUEST_TIMEOUT_SECONDS)
+        try:
+            body = {"since": since, "until": until, "tag": tag, "task_ids": sorted(task_ids) if task_ids else None}
+            conn.request("POST", "/sessions", body=json.dumps(body), headers={"X-Tracker-Token": self.token})
+            resp = conn.getresponse()
+            if resp.status != 200:
+                raise DaemonError(json.loads(resp.read() or b"{}").get("error") or f"HTTP {resp.status}")
+            for line in resp:
+                yield json.loads(line)
+        except (OSError, http.client.HTTPException) as e:
+            raise DaemonError(f"Process Tracker daemon not reachable: {e}")
+        finally:
+            conn.close()
+
+    def add_task(self, title, description="", tags=None, estimate_minutes=None):
+        return self._call("add_task", title=title, description=description, tags=tags, estimate_minutes=estimate_minutes)
+
+    def start_task(self, tid):
+        return self._call("start_task", tid=tid)
+
+    def stop_task(self, tid=None):
+        return self._call("stop_task", tid=tid)
+
+    def mark_done(self, tid):
+        return self._call("mark_done", tid=tid)
+
+    def reopen_task(self, tid):
+        return self._call("reopen_task", tid=tid)
+
+    def delete_task(self, tid):
+        return self._call("delete_task", tid=tid)
+
+    def log_manual(self, tid, minutes):
+        return self._call("log_manual", tid=tid, minutes=minutes)
+
+    def save(self, d, changes=None):
+        raise DaemonError("Whole-document saves are not available while the daemon is running")
+
+    # Change notifications
+    def wait_for_change(self, since, timeout=EVENTS_TIMEOUT_SECONDS):
+        return self._request("GET", f"/events?since={since}&timeout={timeout}", timeout=timeout + 5)["seq"]
+
+    def change_token(self):
+        # The daemon's change counter, kept current by a long-polling thread
+        with self._lock:
+            if self._listener is None:
+                self._seq = self.status()["seq"]
+                self._listener = threading.Thread(target=self._listen, name="tracker-events", daemon=True)
+                self._listener.start()
+            return self._seq
+
+    def _listen(self):
+        while True:
+            try:
+                seq = self.wait_for_change(self._seq)
+            except DaemonError:
+                # daemon gone: report a changing token so callers reload and see the error
+                with self._lock:
+                    self._seq = None
+                    self._listener = None
+                return
+            with self._lock:
+                self._seq = seq
+
+def read_daemon_file(path=DAEMON_FILE):
+    try:
+        info = json.loads(Path(path).read_text(encoding="utf-8"))
+        return info["port"], info["token"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def connect(path=DAEMON_FILE):
+    # A TrackerClient if a daemon is running, else None
+    if os.environ.get("PROCESS_TRACKER_DAEMON", "").strip().lower() in ("off", "0", "no"):
+        return None
+    info = read_daemon_file(path)
+    if info is None:
+        return None
+    client = TrackerClient(*info)
+    try:
+        client.name = client.status(timeout=PROBE_TIMEOUT_SECONDS)["backend"]
+    except (DaemonError, ValueError):
+        return None  # stale daemon.json from a daemon that did not shut down cleanly
+    return client
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Talk to the running Process Tracker daemon")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="Show the daemon's backend and change counter")
+    sub.add_parser("list", help="List tasks")
+    add = sub.add_parser("add", help="Add a task")
+    add.add_argument("title")
+    add.add_argument("--desc", default="")
+    add.add_argument("--tags", default="", help="Comma separated")
+    add.add_argument("--estimate", type=int)
+    for name in ("start", "done", "reopen", "delete"):
+        sub.add_parser(name).add_argument("id", type=int)
+    stop = sub.add_parser("stop", help="Stop the running timer (or the given task's)")
+    stop.add_argument("id", type=int, nargs="?")
+    log = sub.add_parser("log", help="Log minutes manually")
+    log.add_argument("id", type=int)
+    log.add_argument("minutes", type=int)
+    sub.add_parser("watch", help="Print a line whenever the data changes")
+    args = parser.parse_args(argv)
+
+    client = connect()
+    if client is None:
+        print("Error: the Process Tracker daemon is not running (python src/tracker_daemon.py)", file=sys.stderr)
+        sys.exit(1)
+    try:
+        if args.command == "status":
+            print(json.dumps(client.status()))
+        elif args.command == "list":
+            for t in client.task_summaries():
+                status = "Done" if t.get("completed") else ("Running" if t.get("running") else "Open")
+                print(f"#{t['id']:<5} {status:8} {t.get('tracked_minutes', 0):>6} min  {t['title']}")
+        elif args.command == "add":
+            tags = [t.strip() for t in args.tags.split(",") if t.strip()]
+            print(f"Added task #{client.add_task(args.title, args.desc, tags, args.estimate)['id']}")
+        elif args.command == "start":
+            print("Started" if client.start_task(args.id) else "Already running")
+        elif args.command == "stop":
+            session = client.stop_task(args.id)
+            print(f"Stopped after {session['minutes']} min" if session else "Nothing running")
+        elif args.command == "log":
+            client.log_manual(args.id, args.minutes)
+        elif args.command == "done":
+            client.mark_done(args.id)
+        elif args.command == "reopen":
+            client.reopen_task(args.id)
+        elif args.command == "delete":
+            client.delete_task(args.id)
+        else:
+            seq = client.status()["seq"]
+            while True:
+                seq_new = client.wait_for_change(seq)
+                if seq_new != seq:
+                    print(f"changed (seq {seq_new})", flush=True)
+                seq = seq_new
+    except (ValueError, DaemonError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+Process Tracker daemon: one long-running process that owns the data.
+
+With the JSON backend the whole tasks.json document is kept in memory.
+Operations change it in place and return right away; a writer thread saves
+the changes shortly after (several quick changes become one save). With the
+SQLite backend operations go straight to the database, which already writes
+only the rows they touch.
+
+The API is plain HTTP on 127.0.0.1:
+    POST /rpc/<method>      JSON body with the method's arguments -> {"result": ...}
+                            (add_task, start_task, stop_task, mark_done, reopen_task,
+                            delete_task, log_manual, load, list_tasks, task_summaries,
+                            get_task, rollup_rows)
+    POST /sessions          streams iter_sessions() rows as JSON lines
+    GET  /events?since=N    waits (long poll) until the change counter passes N
+    GET  /status            backend name, change counter, pending saves
+
+The port and an access token are written to data/daemon.json; every request
+must send the token in the X-Tracker-Token header. The GUI, export.py,
+reports.py and tracker_client.py find the daemon through that file and use
+it automatically (see tracker_client.py).
+
+Usage:
+    python src/tracker_daemon.py [--port 0]
+"""
+import os
+import sys
+import json
+import math
+import time
+import signal
+import secrets
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from storage import (JsonBackend, SqliteBackend, ConflictError, DATA_DIR, DATA_FILE, SAVE_RETRIES,
+                     conflict_backoff, default_backend_name)
+from backups import open_backups, write_file
+
+DAEMON_FILE = DATA_DIR / "daemon.json"
+HOST = "127.0.0.1"
+# Changes arriving within this window are written in one save
+FLUSH_DELAY_SECONDS = 0.2
+# Longest a GET /events request waits for a change
+EVENTS_TIMEOUT_SECONDS = 25
+
+WRITE_METHODS = ("add_task", "start_task", "stop_task", "mark_done", "reopen_task", "delete_task", "log_manual")
+READ_METHODS = ("load", "list_tasks", "task_summaries", "get_task", "rollup_rows")
+
+class MemoryBackend(JsonBackend):
+    """tasks.json held in memory; save() only queues the changes for flush()."""
+
+    def __init__(self, data_file, backups=None):
+        super().__init__(data_file, backups)
+        self.d = JsonBackend.load(self)
+        self.pending = {}  # task id -> ("put", task) / ("delete", tid) not on disk yet
+
+    def load(self):
+        return self.d
+
+    def read(self):
+        return self.d
+
+    def save(self, d, changes=None):
+        for kind, value in changes or []:
+            self.pending[value["id"] if kind == "put" else value] = (kind, value)
+
+    def flush(self, lock):
+        # Writes the queued changes. Only the snapshot is taken under `lock` (the service lock), so
+        # operations keep running during the slow indented dump and fsync.
+        for attempt in range(SAVE_RETRIES):
+            with lock:
+                if not self.pending:
+                    return False
+                changes = list(self.pending.values())
+                self.pending = {}
+                # compact json round trip: a deep copy at C speed
+                snapshot = json.loads(json.dumps(self.d))
+                expected = snapshot["version"]
+            # the journal gets the snapshot's tasks, which no operation can touch while they are written
+            copies = {t["id"]: t for t in snapshot.get("tasks", [])}
+            written = [(kind, copies.get(value["id"], value) if kind == "put" else value) for kind, value in changes]
+            try:
+                JsonBackend.save(self, snapshot, written)
+            except ConflictError:
+                # another process saved tasks.json meanwhile: apply everything queued onto its copy and retry
+                with lock:
+                    self._requeue(changes)
+                    self.d = self._merge(JsonBackend.load(self), list(self.pending.values()))
+                conflict_backoff(attempt)
+                continue
+            except Exception:
+                with lock:
+                    self._requeue(changes)
+                raise
+            with lock:
+                if self.d["version"] == expected:
+                    self.d["version"] = snapshot["version"]
+                    r = self.d.get("rollups")
+                    if r and r.get("version") == expected and "rollups" in snapshot:
+                        r["version"] = snapshot["version"]
+            return True
+        raise ConflictError(f"{self.data_file} keeps changing; changes stay queued")
+
+    def _requeue(self, changes):
+        # Puts a failed batch back, unless a newer change to the same task was queued since
+        for kind, value in changes:
+            self.pending.setdefault(value["id"] if kind == "put" else value, (kind, value))
+
+    def _merge(self, disk, changes):
+        tasks = {t["id"]: t for t in disk.get("tasks", [])}
+        for kind, value in changes:
+            if kind == "put":
+                tasks[value["id"]] = value
+            else:
+                tasks.pop(value, None)
+        disk["tasks"] = sorted(tasks.values(), key=lambda t: t["id"])
+        disk["next_id"] = max(disk.get("next_id", 1), self.d.get("next_id", 1))
+        disk.pop("rollups", None)  # rebuilt on next use
+        return disk
+
+class TrackerService:
+    """Serializes operations on the backend and counts changes for /events."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.lock = threading.RLock()
+        self.changed = threading.Condition(self.lock)
+        self.seq = 0
+        self.running = True
+        self._writer = None
+        if isinstance(backend, MemoryBackend):
+            self._writer = threading.Thread(target=self._write_loop, name="tracker-writer", daemon=True)
+            self._writer.start()
+
+    def call(self, method, params):
+        if method not in WRITE_METHODS + READ_METHODS:
+            raise KeyError(method)
+        with self.lock:
+            result = getattr(self.backend, method)(**params)
+            if method in WRITE_METHODS:
+                self.seq += 1
+                self.changed.notify_all()
+            # serialize while holding the lock: results may point into the in-memory document
+            return json.dumps({"result": result})
+
+    def iter_sessions(self, params):
+        if isinstance(self.backend, MemoryBackend):
+            with self.lock:
+                return [json.dumps(row) for row in self.backend.iter_sessions(**params)]
+        # SQLite streams from its own read connection
+        return (json.dumps(row) for row in self.backend.iter_sessions(**params))
+
+    def wait_for_change(self, since, timeout):
+        deadline = time.monotonic() + timeout
+        with self.changed:
+            while self.seq <= since and self.running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.changed.wait(remaining)
+            return self.seq
+
+    def status(self):
+        with self.lock:
+            pending = len(self.backend.pending) if isinstance(self.backend, MemoryBackend) else 0
+            return {"backend": self.backend.name, "seq": self.seq, "pending": pending, "pid": os.getpid()}
+
+    def _write_loop(self):
+        last_seq = 0
+        while True:
+            with self.changed:
+                while self.seq == last_seq and self.running:
+                    self.changed.wait()
+                if not self.running:
+                    break
+            time.sleep(FLUSH_DELAY_SECONDS)
+            with self.lock:
+                last_seq = self.seq
+            self._flush()
+        self._flush()
+
+    def _flush(self):
+        # Not called with self.lock held: flush() takes it only to snapshot the document
+        try:
+            self.backend.flush(self.lock)
+        except (OSError, ConflictError) as e:
+            # keep the changes queued and try again with the next change
+            print(f"Error saving {self.backend.data_file}: {e}", file=sys.stderr)
+
+    def shutdown(self):
+        with self.changed:
+            self.running = False
+            self.changed.notify_all()
+        if self._writer is not None:
+            self._writer.join()
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "ProcessTracker"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _authorized(self):
+        if secrets.compare_digest(self.headers.get("X-Tracker-Token", ""), self.server.token):
+            return True
+        self._send(403, {"error": "bad token"})
+        return False
+
+    def _send(self, code, payload):
+        body = (payload if isinstance(payload, str) else json.dumps(payload)).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        url = urlparse(self.path)
+        service = self.server.service
+        if url.path == "/status":
+            self._send(200, service.status())
+        elif url.path == "/events":
+            query = parse_qs(url.query)
+            try:
+                since = int(query.get("since", ["0"])[0])
+                timeout = float(query.get("timeout", [EVENTS_TIMEOUT_SECONDS])[0])
+                if not math.isfinite(timeout):
+                    raise ValueError(timeout)
+            except ValueError:
+                self._send(400, {"error": "since must be an integer and timeout a number of seconds"})
+                return
+            self._send(200, {"seq": service.wait_for_change(since, max(0.0, min(timeout, EVENTS_TIMEOUT_SECONDS)))})
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            params = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send(400, {"error": "invalid JSON body"})
+            return
+        path = urlparse(self.path).path
+        service = self.server.service
+        if path == "/sessions":
+            rows = service.iter_sessions(params)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            # HTTP/1.0: the body ends when the connection closes, so rows can be written as they are read
+            for row in rows:
+                self.wfile.write(row.encode("utf-8") + b"\n")
+            return
+        if not path.startswith("/rpc/"):
+            self._send(404, {"error": "not found"})
+            return
+        try:
+            self._send(200, service.call(path[len("/rpc/"):], params))
+        except KeyError:
+            self._send(404, {"error": f"unknown method {path[len('/rpc/'):]}"})
+        except (ValueError, TypeError) as e:
+            self._send(400, {"error": str(e)})
+        except Exception as e:
+            # storage failures (sqlite3.Error, OSError, ConflictError) still get a JSON answer
+            self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+def open_service_backend(name=None):
+    name = name or default_backend_name()
+    if name == "sqlite":
+        return SqliteBackend()
+    return MemoryBackend(DATA_FILE, open_backups())
+
+def serve(port=0):
+    service = TrackerService(open_service_backend())
+    server = ThreadingHTTPServer((HOST, port), Handler)
+    server.daemon_threads = True
+    server.service = service
+    server.token = secrets.token_hex(16)
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    # the token must never be readable by other users, not even briefly
+    write_file(DAEMON_FILE, json.dumps({"port": server.server_address[1], "token": server.token, "pid": os.getpid()}),
+               mode=0o600)
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    print(f"Process Tracker daemon ({service.backend.name}) listening on http://{HOST}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        # pending changes are saved before exiting
+        service.shutdown()
+        try:
+            if json.loads(DAEMON_FILE.read_text(encoding="utf-8")).get("pid") == os.getpid():
+                DAEMON_FILE.unlink()
+        except (OSError, ValueError):
+            pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Process Tracker daemon")
+    parser.add_argument("--port", type=int, default=0, help="Port on 127.0.0.1 (default: any free port)")
+    args = parser.parse_args(argv)
+    serve(args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import sys
+import json
+import time
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from backups import SnapshotBackups
+from storage import JsonBackend
+
+
+class SnapshotDedupTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.backups = SnapshotBackups(self.dir / "backups", self.dir, min_interval=0)
+        self.backend = JsonBackend(self.dir / "tasks.json", self.backups)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_saving_unchanged_tasks_twice_keeps_one_backup(self):
+        self.backend.save(self.backend.load())
+        self.backend.save(self.backend.load())
+        self.assertEqual(self.backend.load()["version"], 2)
+        self.assertEqual(len(self.backups.list_backups()), 1)
+
+    def test_changed_tasks_get_a_new_backup(self):
+        self.backend.save(self.backend.load())
+        self.backend.add_task("Write tests")
+        self.assertEqual(len(self.backups.list_backups()), 2)
+
+
+class SnapshotThrottleTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.backups = SnapshotBackups(self.dir / "backups", self.dir, min_interval=0.3)
+        self.backend = JsonBackend(self.dir / "tasks.json", self.backups)
+
+    def tearDown(self):
+        self.backups.flush()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def backed_up_titles(self):
+        # backup names have second resolution, so order them by their content instead
+        return sorted(([t["title"] for t in json.loads(path.read_text(encoding="utf-8"))["tasks"]]
+                       for _, _, path in self.backups.list_backups()), key=len)
+
+    def test_burst_within_the_interval_is_backed_up_when_it_ends(self):
+        self.backend.add_task("First")
+        self.backend.add_task("Second")
+        self.backend.add_task("Third")
+        self.assertEqual(len(self.backups.list_backups()), 1)
+        time.sleep(0.6)
+        self.assertEqual(self.backed_up_titles(), [["First"], ["First", "Second", "Third"]])
+
+    def test_flush_writes_the_deferred_backup_right_away(self):
+        self.backend.add_task("First")
+        self.backend.add_task("Second")
+        self.backups.flush()
+        self.assertEqual(self.backed_up_titles(), [["First"], ["First", "Second"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import rollups
+import storage
+from storage import JsonBackend, ConflictError, SAVE_RETRIES
+
+
+class JsonRollupsTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.backend = JsonBackend(self.dir / "tasks.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_whole_document_save_keeps_rollups_current(self):
+        task = self.backend.add_task("Write tests", tags=["dev"])
+        self.backend.log_manual(task["id"], 30)
+        d = self.backend.load()
+        d["tasks"][0]["sessions"].append({"start": "2026-01-05T10:00:00", "end": "2026-01-05T10:20:00", "minutes": 20})
+        self.backend.save(d)
+
+        on_disk = json.loads((self.dir / "tasks.json").read_text(encoding="utf-8"))
+        self.assertEqual(on_disk["rollups"]["version"], on_disk["version"])
+        # reads use the saved rollups instead of rebuilding from every session
+        with mock.patch.object(rollups, "build", side_effect=AssertionError("rebuilt on read")):
+            summaries = self.backend.task_summaries()
+            self.assertEqual(sum(m for _, _, m, _ in self.backend.rollup_rows("tag")), 50)
+        self.assertEqual(summaries[0]["tracked_minutes"], 50)
+
+    def test_read_only_operations_parse_the_file_once(self):
+        task = self.backend.add_task("Write tests")
+        with mock.patch.object(JsonBackend, "load", autospec=True, side_effect=JsonBackend.load) as load:
+            self.backend.task_summaries()
+            self.backend.rollup_rows("day")
+            self.backend.get_task(task["id"])
+            self.assertEqual(load.call_count, 1)
+            self.backend.log_manual(task["id"], 5)  # replaces the file
+            self.assertEqual(len(self.backend.get_task(task["id"])["sessions"]), 1)
+
+
+class RetryOnConflictTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.backend = JsonBackend(self.dir / "tasks.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_backs_off_then_holds_the_file_lock_for_the_last_attempt(self):
+        save = JsonBackend.save
+        attempts = []
+
+        def losing_save(backend, d, changes=None):
+            attempts.append(backend.file_lock._depth)
+            if len(attempts) < SAVE_RETRIES:
+                raise ConflictError("another process saved first")
+            save(backend, d, changes)
+
+        with mock.patch.object(JsonBackend, "save", losing_save), \
+                mock.patch.object(storage.time, "sleep") as sleep:
+            task = self.backend.add_task("Contended")
+        self.assertEqual(attempts, [0] * (SAVE_RETRIES - 1) + [1])
+        self.assertEqual(sleep.call_count, SAVE_RETRIES - 1)
+        self.assertEqual(self.backend.get_task(task["id"])["title"], "Contended")
+        self.assertEqual(self.backend.file_lock._depth, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
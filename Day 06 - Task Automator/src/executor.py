@@ -0,0 +1,286 @@
+"""
+Execution layer for the Task Automator.
+
+Commands run on a fixed pool of worker threads, so a burst of due tasks
+never starts more than `max_workers` processes at once. A task runs at most
+once at a time; when it comes due while its previous run is still going, its
+"overlap" setting decides what happens:
+- "skip"  drop the new run (default)
+- "queue" run it once the previous run ends (several waiting runs become one)
+- "kill"  stop the previous run and start the new one
+
+A run that outlives its task's "timeout" (minutes) is killed together with
+any processes it started. stdout and stderr are streamed line by line to
+data/logs/<task>.log (rotated at LOG_MAX_BYTES), and every run's exit code
+and duration are appended to data/logs/runs.jsonl. Each process is waited
+for by the worker that started it, so no zombies are left behind. A run
+ends when its command exits, even if a program it started in the background
+(e.g. "start chrome ...") still holds the output pipe.
+"""
+import os
+import re
+import json
+import time
+import signal
+import logging
+import threading
+import subprocess
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+OVERLAP_POLICIES = ("skip", "queue", "kill")
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUP_COUNT = 3
+# Time a killed process gets to exit after SIGTERM before it is sent SIGKILL
+KILL_GRACE_SECONDS = 5
+# Time given to the output reader to catch up after the command exits
+OUTPUT_DRAIN_SECONDS = 1
+
+def log_name(task_name):
+    """File-safe name for a task's log file."""
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", task_name).strip("_.") or "task"
+
+def rotating_logger(name, path):
+    """A logger writing bare lines to a size-rotated file (not registered with logging, so never shared)."""
+    handler = RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger = logging.Logger(f"task_automator.{name}", logging.INFO)
+    logger.addHandler(handler)
+    return logger
+
+def popen_group(command):
+    """Starts a shell command in its own process group so it can be killed with its children."""
+    if os.name == "nt":
+        flags = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        flags = {"start_new_session": True}
+    return subprocess.Popen(command, shell=True, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT, text=True, errors="replace", **flags)
+
+def signal_tree(proc, force=False):
+    """Sends SIGTERM (SIGKILL if `force`) to a process and everything it started."""
+    if proc.poll() is not None:
+        return
+    if os.name == "nt":
+        # taskkill /F has no gentle variant for console programs
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGKILL if force else signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+
+def kill_tree(proc, grace=KILL_GRACE_SECONDS):
+    """Terminates a process tree, forcing it if it is still alive after `grace` seconds."""
+    signal_tree(proc)
+    try:
+        proc.wait(grace)
+    except subprocess.TimeoutExpired:
+        signal_tree(proc, force=True)
+
+def copy_output(pipe, output):
+    """Copies a process's output to its log, line by line, until the pipe closes."""
+    try:
+        for line in pipe:
+            output.info(line.rstrip("\n"))
+        pipe.close()
+    except (OSError, ValueError):
+        pass
+
+class Run:
+    """One execution of a task."""
+
+    def __init__(self, task):
+        self.task = task
+        self.proc = None
+        self.stop_reason = None  # "timeout" / "replaced" / "shutdown" once killed
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Starts the process unless the run was killed before it got a worker."""
+        with self._lock:
+            if self.stop_reason is None:
+                self.proc = popen_group(self.task["command"])
+            return self.proc
+
+    def _stop(self, reason):
+        with self._lock:
+            self.stop_reason = self.stop_reason or reason
+            return self.proc
+
+    def kill(self, reason):
+        proc = self._stop(reason)
+        if proc is not None:
+            kill_tree(proc)
+
+    def terminate(self, reason):
+        """Sends SIGTERM without waiting; see Executor.shutdown."""
+        proc = self._stop(reason)
+        if proc is not None:
+            signal_tree(proc)
+
+    def force_kill(self):
+        if self.proc is not None:
+            signal_tree(self.proc, force=True)
+
+class Executor:
+    """Bounded pool of workers that run task commands and record the results."""
+
+    def __init__(self, log_dir, max_workers=4, log=print):
+        self.log_dir = log_dir
+        self.max_workers = max(1, int(max_workers))
+        self.log = log
+        self._cond = threading.Condition()
+        self._ready = deque()   # tasks waiting for a free worker
+        self._queued = set()    # names of the tasks in _ready
+        self._active = {}       # task name -> Run in progress
+        self._waiting = {}      # task name -> task to start when its active run ends
+        self._running = True
+        os.makedirs(log_dir, exist_ok=True)
+        self._history = rotating_logger("runs", os.path.join(log_dir, "runs.jsonl"))
+        self._outputs = {}      # log file name -> logger for the task's output
+        self._workers = [threading.Thread(target=self._work, name=f"executor-{i}", daemon=True)
+                         for i in range(self.max_workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, task):
+        """Queues a run of the task, applying its overlap policy. Never blocks."""
+        name = task["name"]
+        policy = task.get("overlap", "skip")
+        with self._cond:
+            if not self._running:
+                return
+            if name in self._queued:
+                self.log(f"SKIPPED task '{name}': a run is already waiting for a free worker")
+                return
+            active = self._active.get(name)
+            if active is None:
+                self._ready.append(task)
+                self._queued.add(name)
+                self._cond.notify()
+                if len(self._active) >= self.max_workers:
+                    self.log(f"QUEUED task '{name}': all {self.max_workers} workers are busy")
+                return
+            if policy == "queue":
+                self._waiting[name] = task
+                self.log(f"QUEUED task '{name}': previous run still going")
+                return
+            if policy == "kill":
+                self._waiting[name] = task
+                self.log(f"KILLING previous run of task '{name}'")
+            else:
+                self.log(f"SKIPPED task '{name}': previous run still going")
+                return
+        # kill_tree may wait for the process to exit, so it must not hold up the scheduler
+        threading.Thread(target=active.kill, args=("replaced",), daemon=True).start()
+
+    def running(self):
+        """Names of the tasks with a run in progress."""
+        with self._cond:
+            return sorted(self._active)
+
+    def shutdown(self, kill=True, timeout=KILL_GRACE_SECONDS + 1):
+        """Stops accepting runs, kills the running ones (if asked) and waits for the workers."""
+        with self._cond:
+            self._running = False
+            self._ready.clear()
+            self._queued.clear()
+            self._waiting.clear()
+            active = list(self._active.values())
+            self._cond.notify_all()
+        # Every run gets SIGTERM at once and the grace period is shared, so the wait does not grow with the runs
+        if kill:
+            for run in active:
+                run.terminate("shutdown")
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(max(0, deadline - time.monotonic()))
+        if kill:
+            for run in active:
+                run.force_kill()
+            for worker in self._workers:
+                worker.join(OUTPUT_DRAIN_SECONDS)
+        for logger in [self._history, *self._outputs.values()]:
+            for handler in logger.handlers:
+                handler.close()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while self._running and not self._ready:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                task = self._ready.popleft()
+                self._queued.discard(task["name"])
+                run = self._active[task["name"]] = Run(task)
+            try:
+                self._execute(run)
+            except Exception as e:
+                # keep the worker alive whatever went wrong, or the pool would shrink
+                self.log(f"Executor error in task '{task.get('name')}': {e}")
+            finally:
+                with self._cond:
+                    del self._active[task["name"]]
+                    follow_up = self._waiting.pop(task["name"], None)
+                    if follow_up is not None and self._running:
+                        self._ready.append(follow_up)
+                        self._queued.add(follow_up["name"])
+                        self._cond.notify()
+
+    def _output_log(self, name):
+        with self._cond:
+            key = log_name(name)
+            if key not in self._outputs:
+                self._outputs[key] = rotating_logger(f"task.{key}", os.path.join(self.log_dir, f"{key}.log"))
+            return self._outputs[key]
+
+    def _execute(self, run):
+        task = run.task
+        name, command = task["name"], task["command"]
+        started = datetime.now()
+        t0 = time.monotonic()
+        self.log(f"EXECUTING task: '{name}' (Cmd: {command})")
+        output = None
+        timer = None
+        exit_code = None
+        try:
+            output = self._output_log(name)
+            output.info(f"=== {started:%Y-%m-%d %H:%M:%S} run started: {command}")
+            timeout = float(task["timeout"]) * 60 if task.get("timeout") else None
+            if run.start() is None:
+                raise OSError("run cancelled before it started")
+            # Output is read on its own thread: the run ends when the command exits, not at EOF
+            reader = threading.Thread(target=copy_output, args=(run.proc.stdout, output),
+                                      name=f"output-{log_name(name)}", daemon=True)
+            reader.start()
+            if timeout:
+                timer = threading.Timer(timeout, run.kill, args=("timeout",))
+                timer.daemon = True
+                timer.start()
+            exit_code = run.proc.wait()
+            status = run.stop_reason or ("ok" if exit_code == 0 else "failed")
+            reader.join(OUTPUT_DRAIN_SECONDS)
+            if reader.is_alive():
+                output.info("--- command exited; a background process it started still holds the output")
+        except Exception as e:
+            status = run.stop_reason or "error"
+            if output is not None:
+                output.info(f"!!! {e}")
+            if run.proc is not None:
+                run.kill("error")
+                exit_code = run.proc.wait()
+        finally:
+            if timer is not None:
+                timer.cancel()
+        duration = round(time.monotonic() - t0, 3)
+        if output is not None:
+            output.info(f"=== run ended: {status}, exit code {exit_code}, {duration:.1f}s")
+        self._history.info(json.dumps({
+            "task": name, "command": command, "start": started.isoformat(timespec="seconds"),
+            "duration_seconds": duration, "exit_code": exit_code, "status": status
+        }))
+        self.log(f"FINISHED task: '{name}' ({status}, exit code {exit_code}, {duration:.1f}s)")
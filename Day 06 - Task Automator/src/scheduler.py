@@ -0,0 +1,172 @@
+"""
+Event-driven scheduler for the Task Automator.
+
+Every task gets an absolute next fire time. The times live in a min-heap,
+and a single thread sleeps until the earliest one (or until a task is added
+or removed), so tasks fire on the second and each event costs O(log n).
+"""
+import heapq
+import itertools
+import threading
+from datetime import datetime, timedelta
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+# Longest single sleep; waking up now and then keeps the schedule right after
+# the system clock is changed (see Scheduler._pop_due) or the machine resumes
+# from sleep.
+MAX_SLEEP_SECONDS = 300
+
+# --- Trigger Math ---
+def next_fire_time(task, after, last_fire=None):
+    """Returns the first datetime strictly after `after` at which the task is due."""
+    trigger = task["trigger"]
+    if trigger == "Interval":
+        interval = timedelta(minutes=int(task["interval"]))
+        if interval.total_seconds() <= 0:
+            raise ValueError("Interval must be at least 1 minute")
+        if last_fire is None:
+            return after  # interval tasks first run when the scheduler starts
+        if last_fire > after:
+            # The clock went back: keep the interval from now instead of waiting out the gap
+            return after + interval
+        # Stay on the original grid; skip slots missed while the machine was asleep
+        missed = max(0, (after - last_fire) // interval)
+        return last_fire + interval * (missed + 1)
+
+    at = datetime.strptime(task["time"], "%H:%M").time()
+    candidate = datetime.combine(after.date(), at)
+    if trigger == "Daily":
+        if candidate <= after:
+            candidate += timedelta(days=1)
+        return candidate
+    if trigger == "Weekly":
+        days_ahead = (DAYS.index(task["day"]) - after.weekday()) % 7
+        candidate += timedelta(days=days_ahead)
+        if candidate <= after:
+            candidate += timedelta(days=7)
+        return candidate
+    raise ValueError(f"Unknown trigger type: {trigger}")
+
+# --- Scheduler ---
+class Scheduler:
+    """Fires `on_due(task)` at each task's next run time from one background thread."""
+
+    def __init__(self, on_due, on_error=None, now=datetime.now):
+        self.on_due = on_due
+        self.on_error = on_error or (lambda task, error: None)
+        self.now = now
+        self._cond = threading.Condition()
+        self._heap = []          # (fire time, sequence, task key)
+        self._entries = {}       # task key -> (task, fire time, last fire time) of the live heap entry
+        self._last_now = None    # clock reading at the previous wake, to notice it going back
+        self._seq = itertools.count()
+        self._thread = None
+        self._running = False
+
+    def add(self, task, after=None, last_fire=None):
+        """Schedules a task (or reschedules it if already known) and wakes the thread."""
+        try:
+            when = next_fire_time(task, after or self.now(), last_fire)
+        except (KeyError, ValueError) as e:
+            self.on_error(task, e)
+            return None
+        with self._cond:
+            self._entries[id(task)] = (task, when, last_fire)
+            heapq.heappush(self._heap, (when, next(self._seq), id(task)))
+            self._cond.notify()
+        return when
+
+    def remove(self, task):
+        """Unschedules a task. Its heap entry is dropped lazily when it reaches the top."""
+        with self._cond:
+            if self._entries.pop(id(task), None) is not None:
+                self._cond.notify()
+
+    def set_tasks(self, tasks):
+        """Replaces the whole schedule."""
+        with self._cond:
+            self._entries.clear()
+            self._heap = []
+        for task in tasks:
+            self.add(task)
+
+    def next_run(self, task):
+        """The task's next fire time, or None if it is not scheduled."""
+        with self._cond:
+            entry = self._entries.get(id(task))
+            return entry[1] if entry else None
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _reschedule_all(self, now):
+        """Recomputes every fire time from `now`. Called with the lock held."""
+        self._heap = []
+        for key, (task, _, last_fire) in list(self._entries.items()):
+            try:
+                when = next_fire_time(task, now, last_fire)
+            except (KeyError, ValueError) as e:
+                del self._entries[key]
+                self.on_error(task, e)
+                continue
+            self._entries[key] = (task, when, last_fire)
+            self._heap.append((when, next(self._seq), key))
+        heapq.heapify(self._heap)
+
+    def _pop_due(self):
+        """Pops every task due now and pushes its following run. Called with the lock held."""
+        due = []
+        now = self.now()
+        if self._last_now is not None and now < self._last_now:
+            # The clock went back: pending times may now be far off (a day for a Daily task)
+            self._reschedule_all(now)
+        self._last_now = now
+        while self._heap and self._heap[0][0] <= now:
+            when, _, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            if entry is None or entry[1] != when:
+                continue  # removed or rescheduled since this entry was pushed
+            task = entry[0]
+            due.append(task)
+            try:
+                following = next_fire_time(task, now, last_fire=when)
+            except (KeyError, ValueError) as e:
+                del self._entries[key]
+                self.on_error(task, e)
+                continue
+            self._entries[key] = (task, following, when)
+            heapq.heappush(self._heap, (following, next(self._seq), key))
+        return due
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    due = self._pop_due()
+                    if due:
+                        break
+                    if self._heap:
+                        timeout = (self._heap[0][0] - self.now()).total_seconds()
+                        self._cond.wait(min(max(timeout, 0), MAX_SLEEP_SECONDS))
+                    else:
+                        self._cond.wait(MAX_SLEEP_SECONDS)
+                if not self._running:
+                    return
+            # Run callbacks outside the lock so they may add or remove tasks
+            for task in due:
+                try:
+                    self.on_due(task)
+                except Exception as e:
+                    self.on_error(task, e)
@@ -2,15 +2,19 @@ import tkinter as tk
 from tkinter import ttk, messagebox, font, simpledialog, scrolledtext
 import json
 import os
-import threading
-import time
 from datetime import datetime
-import subprocess
 import queue
+from scheduler import Scheduler
+from executor import Executor
 
 # --- Configuration ---
 DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
 TASKS_FILE = os.path.join(DATA_DIR, 'tasks.json')
+LOGS_DIR = os.path.join(DATA_DIR, 'logs')
+# Most commands running at the same time
+MAX_WORKERS = int(os.environ.get('TASK_AUTOMATOR_WORKERS', 4))
+# "If still running" choices -> executor overlap policies
+OVERLAP_OPTIONS = {"Skip": "skip", "Queue": "queue", "Kill previous": "kill"}
 
 # --- Helper Functions ---
 def ensure_files():
@@ -28,8 +32,9 @@ class TaskAutomatorApp:
         self.root.geometry("800x600")
 
         self.tasks = []
-        self.last_run_times = {} # For interval tasks
         self.log_queue = queue.Queue()
+        self.executor = Executor(LOGS_DIR, MAX_WORKERS, self.log)
+        self.scheduler = Scheduler(self.execute_task, self.log_scheduler_error)
 
         self.setup_styles()
         self.create_widgets()
@@ -37,6 +42,7 @@ class TaskAutomatorApp:
         self.load_tasks()
         self.start_scheduler()
         self.poll_log_queue()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def setup_styles(self):
         """Configure the 'attractive' dark theme."""
@@ -133,6 +139,18 @@ class TaskAutomatorApp:
 
         self.update_trigger_options(None) # Set initial view
 
+        # Overlap policy and timeout
+        ttk.Label(controls_frame, text="If Still Running:").pack(anchor="w", pady=(10, 0))
+        self.overlap_policy = ttk.Combobox(controls_frame, values=list(OVERLAP_OPTIONS), state="readonly")
+        self.overlap_policy.pack(fill="x", anchor="w")
+        self.overlap_policy.current(0)
+
+        timeout_frame = ttk.Frame(controls_frame)
+        timeout_frame.pack(fill="x", anchor="w", pady=5)
+        ttk.Label(timeout_frame, text="Timeout (mins, optional):").pack(side=tk.LEFT)
+        self.timeout_mins = ttk.Entry(timeout_frame, width=8)
+        self.timeout_mins.pack(side=tk.LEFT, padx=5)
+
         # Add Task Button
         self.add_button = ttk.Button(controls_frame, text="Add Task", command=self.add_task)
         self.add_button.pack(fill="x", pady=20)
@@ -187,7 +205,12 @@ class TaskAutomatorApp:
             messagebox.showwarning("Input Error", "Task Name and Command are required.")
             return
 
-        task = {"name": name, "command": command, "trigger": trigger}
+        if any(t["name"] == name for t in self.tasks):
+            messagebox.showwarning("Input Error", f"A task named '{name}' already exists.")
+            return
+
+        task = {"name": name, "command": command, "trigger": trigger,
+                "overlap": OVERLAP_OPTIONS[self.overlap_policy.get()]}
         
         try:
             if trigger == "Daily":
@@ -201,14 +224,21 @@ class TaskAutomatorApp:
                 task["day"] = self.weekly_day.get()
             elif trigger == "Interval":
                 task["interval"] = int(self.interval_mins.get())
+                if task["interval"] < 1:
+                    raise ValueError("interval must be at least 1 minute")
+            if self.timeout_mins.get().strip():
+                task["timeout"] = float(self.timeout_mins.get())
+                if task["timeout"] <= 0:
+                    raise ValueError("timeout must be positive")
         except ValueError as e:
-            messagebox.showwarning("Input Error", f"Invalid trigger value: {e}\n\nTime must be HH:MM\nInterval must be a number.")
+            messagebox.showwarning("Input Error", f"Invalid trigger value: {e}\n\nTime must be HH:MM\nInterval and Timeout must be numbers.")
             return
 
         self.tasks.append(task)
+        next_run = self.scheduler.add(task)
         self.update_listbox()
         self.save_tasks()
-        self.log(f"Added task: {name}")
+        self.log(f"Added task: {name}" + (f" (next run {next_run:%Y-%m-%d %H:%M:%S})" if next_run else ""))
 
         # Clear inputs
         self.name_entry.delete(0, tk.END)
@@ -216,6 +246,7 @@ class TaskAutomatorApp:
         self.daily_time.delete(0, tk.END)
         self.weekly_time.delete(0, tk.END)
         self.interval_mins.delete(0, tk.END)
+        self.timeout_mins.delete(0, tk.END)
 
     def delete_task(self):
         """Deletes the selected task."""
@@ -224,6 +255,7 @@ class TaskAutomatorApp:
             task_name = self.tasks[selected_index]["name"]
             
             if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete task '{task_name}'?"):
+                self.scheduler.remove(self.tasks[selected_index])
                 del self.tasks[selected_index]
                 self.update_listbox()
                 self.save_tasks()
@@ -241,6 +273,10 @@ class TaskAutomatorApp:
                 display = f"[{task['trigger']}] {task['name']} @ {task['day']}, {task['time']} -- (Cmd: {task['command']})"
             elif task['trigger'] == 'Interval':
                 display = f"[{task['trigger']}] {task['name']} @ Every {task['interval']} mins -- (Cmd: {task['command']})"
+            if task.get('overlap', 'skip') != 'skip':
+                display += f" [if running: {task['overlap']}]"
+            if task.get('timeout'):
+                display += f" [timeout {task['timeout']:g} mins]"
             self.task_listbox.insert(tk.END, display)
 
     def load_tasks(self):
@@ -253,6 +289,7 @@ class TaskAutomatorApp:
         except (IOError, json.JSONDecodeError) as e:
             self.log(f"Error loading tasks: {e}. Starting fresh.")
             self.tasks = []
+        self.scheduler.set_tasks(self.tasks)
 
     def save_tasks(self):
         """Saves the current self.tasks list to tasks.json."""
@@ -286,61 +323,29 @@ class TaskAutomatorApp:
 
     def start_scheduler(self):
         """Starts the background scheduler thread."""
-        scheduler_thread = threading.Thread(target=self.run_scheduler, daemon=True)
-        scheduler_thread.start()
-        self.log("Scheduler thread started. Checking every 60 seconds.")
-
-    def run_scheduler(self):
-        """The background thread loop."""
-        while True:
-            now = datetime.now()
-            current_time_str = now.strftime("%H:%M")
-            current_day_str = now.strftime("%A")
-            
-            for task in self.tasks:
-                try:
-                    task_name = task.get("name", "Unnamed Task")
-                    is_due = False
-
-                    if task["trigger"] == "Daily":
-                        if task["time"] == current_time_str:
-                            is_due = self.check_last_run(task_name, 60 * 23) # Only run once a day
-                            
-                    elif task["trigger"] == "Weekly":
-                        if task["day"] == current_day_str and task["time"] == current_time_str:
-                            is_due = self.check_last_run(task_name, 60 * 60 * 24 * 6) # Only run once a week
-                    
-                    elif task["trigger"] == "Interval":
-                        interval_seconds = task["interval"] * 60
-                        is_due = self.check_last_run(task_name, interval_seconds - 30) # -30s buffer
-
-                    if is_due:
-                        self.execute_task(task)
-
-                except Exception as e:
-                    self.log(f"Scheduler Error processing task '{task.get('name')}': {e}")
-            
-            time.sleep(60) # Check once per minute
+        self.scheduler.start()
+        upcoming = [t for t in (self.scheduler.next_run(task) for task in self.tasks) if t]
+        if upcoming:
+            self.log(f"Scheduler started. Next run at {min(upcoming):%Y-%m-%d %H:%M:%S}.")
+        else:
+            self.log("Scheduler started. No tasks scheduled.")
 
-    def check_last_run(self, task_name, throttle_seconds):
-        """Checks if a task has run within the throttle period."""
-        now = time.time()
-        last_run = self.last_run_times.get(task_name, 0)
-        
-        if (now - last_run) > throttle_seconds:
-            self.last_run_times[task_name] = now
-            return True
-        return False
+    def log_scheduler_error(self, task, error):
+        """Called by the scheduler thread when a task cannot be scheduled or run."""
+        self.log(f"Scheduler Error processing task '{task.get('name')}': {error}")
 
     def execute_task(self, task):
-        """Runs the task's command in a subprocess."""
-        command = task["command"]
-        self.log(f"EXECUTING task: '{task['name']}' (Cmd: {command})")
-        try:
-            # Use Popen for non-blocking execution
-            subprocess.Popen(command, shell=True)
-        except Exception as e:
-            self.log(f"Failed to execute task '{task['name']}': {e}")
+        """Hands the task to the worker pool (called from the scheduler thread)."""
+        self.executor.submit(task)
+
+    def on_close(self):
+        """Stops the scheduler and any running commands, then closes the window."""
+        running = self.executor.running()
+        if running and not messagebox.askyesno("Tasks Running", f"Stop the running tasks ({', '.join(running)}) and quit?"):
+            return
+        self.scheduler.stop()
+        self.executor.shutdown()
+        self.root.destroy()
 
 
 # --- Run the Application ---
@@ -0,0 +1,122 @@
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from executor import Executor
+
+
+@unittest.skipIf(os.name == "nt", "uses POSIX shell commands")
+class ExecutorTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.messages = []
+        self.executor = None
+
+    def tearDown(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def start(self, workers=2):
+        self.executor = Executor(self.dir, workers, self.messages.append)
+        return self.executor
+
+    def runs(self, count, timeout=10):
+        """Waits until `count` runs are recorded in runs.jsonl and returns them."""
+        path = os.path.join(self.dir, "runs.jsonl")
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    runs = [json.loads(line) for line in f]
+                if len(runs) >= count:
+                    return runs
+            time.sleep(0.02)
+        self.fail(f"expected {count} runs, messages: {self.messages}")
+
+    def test_records_exit_code_and_output(self):
+        self.start().submit({"name": "echo", "command": "echo out; echo err >&2; exit 3"})
+        run, = self.runs(1)
+        self.assertEqual((run["task"], run["status"], run["exit_code"]), ("echo", "failed", 3))
+        with open(os.path.join(self.dir, "echo.log"), encoding="utf-8") as f:
+            log = f.read()
+        self.assertIn("out\nerr\n", log)
+
+    def test_pool_size_bounds_concurrent_runs(self):
+        ex = self.start(workers=2)
+        for i in range(3):
+            ex.submit({"name": f"t{i}", "command": "sleep 0.5"})
+        time.sleep(0.2)
+        self.assertEqual(len(ex.running()), 2)
+        self.assertEqual(len(self.runs(3)), 3)
+
+    def test_overlap_skip(self):
+        ex = self.start()
+        task = {"name": "s", "command": "sleep 0.3"}
+        ex.submit(task)
+        time.sleep(0.1)
+        ex.submit(task)
+        self.runs(1)
+        time.sleep(0.3)
+        self.assertEqual(len(self.runs(1)), 1)
+
+    def test_overlap_queue_coalesces(self):
+        ex = self.start()
+        task = {"name": "q", "command": "sleep 0.3", "overlap": "queue"}
+        ex.submit(task)
+        time.sleep(0.1)
+        ex.submit(task)
+        ex.submit(task)
+        self.assertEqual([r["status"] for r in self.runs(2)], ["ok", "ok"])
+        time.sleep(0.4)
+        self.assertEqual(len(self.runs(2)), 2)
+
+    def test_overlap_kill_previous(self):
+        ex = self.start()
+        task = {"name": "k", "command": "sleep 30", "overlap": "kill"}
+        ex.submit(task)
+        time.sleep(0.2)
+        ex.submit(task)
+        first, = self.runs(1)
+        self.assertEqual(first["status"], "replaced")
+        time.sleep(0.2)
+        self.assertEqual(ex.running(), ["k"])
+
+    def test_timeout_kills_the_run(self):
+        self.start().submit({"name": "t", "command": "sleep 30", "timeout": 0.005})
+        run, = self.runs(1)
+        self.assertEqual(run["status"], "timeout")
+        self.assertLess(run["duration_seconds"], 5)
+
+    def test_background_child_does_not_hold_the_worker(self):
+        ex = self.start(workers=1)
+        ex.submit({"name": "detached", "command": "sleep 3 & echo started"})
+        ex.submit({"name": "next", "command": "true"})
+        runs = self.runs(2, timeout=2.5)
+        self.assertEqual([(r["task"], r["status"]) for r in runs], [("detached", "ok"), ("next", "ok")])
+
+    def test_bad_task_does_not_shrink_the_pool(self):
+        ex = self.start(workers=1)
+        ex.submit({"name": "bad", "command": "true", "timeout": "soon"})
+        ex.submit({"name": "good", "command": "true"})
+        self.assertEqual([r["status"] for r in self.runs(2)], ["error", "ok"])
+
+    def test_shutdown_kills_runs_together(self):
+        ex = self.start(workers=3)
+        for i in range(3):
+            ex.submit({"name": f"stubborn{i}", "command": "trap '' TERM; sleep 30"})
+        time.sleep(0.3)
+        t0 = time.monotonic()
+        ex.shutdown(timeout=0.5)
+        self.assertLess(time.monotonic() - t0, 0.5 * 3)
+        self.assertEqual(ex.running(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import sys
+import time
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from scheduler import Scheduler, next_fire_time
+
+
+class NextFireTimeTest(unittest.TestCase):
+    def test_daily_later_today(self):
+        task = {"trigger": "Daily", "time": "09:30"}
+        self.assertEqual(next_fire_time(task, datetime(2026, 3, 4, 8, 0)), datetime(2026, 3, 4, 9, 30))
+
+    def test_daily_rolls_over_to_tomorrow(self):
+        task = {"trigger": "Daily", "time": "09:30"}
+        # due time is exclusive, and the year boundary is crossed normally
+        self.assertEqual(next_fire_time(task, datetime(2026, 3, 4, 9, 30)), datetime(2026, 3, 5, 9, 30))
+        self.assertEqual(next_fire_time(task, datetime(2026, 12, 31, 23, 0)), datetime(2027, 1, 1, 9, 30))
+
+    def test_weekly_later_this_week(self):
+        task = {"trigger": "Weekly", "day": "Friday", "time": "18:00"}
+        # 2026-03-04 is a Wednesday
+        self.assertEqual(next_fire_time(task, datetime(2026, 3, 4, 12, 0)), datetime(2026, 3, 6, 18, 0))
+
+    def test_weekly_rolls_over_to_next_week(self):
+        task = {"trigger": "Weekly", "day": "Wednesday", "time": "10:00"}
+        self.assertEqual(next_fire_time(task, datetime(2026, 3, 4, 9, 0)), datetime(2026, 3, 4, 10, 0))
+        self.assertEqual(next_fire_time(task, datetime(2026, 3, 4, 10, 0)), datetime(2026, 3, 11, 10, 0))
+
+    def test_interval_first_run_is_immediate(self):
+        now = datetime(2026, 3, 4, 12, 0)
+        self.assertEqual(next_fire_time({"trigger": "Interval", "interval": 15}, now), now)
+
+    def test_interval_stays_on_grid(self):
+        task = {"trigger": "Interval", "interval": 15}
+        last = datetime(2026, 3, 4, 12, 0)
+        self.assertEqual(next_fire_time(task, datetime(2026, 3, 4, 12, 5), last), datetime(2026, 3, 4, 12, 15))
+
+    def test_interval_catch_up_skips_missed_slots(self):
+        task = {"trigger": "Interval", "interval": 15}
+        last = datetime(2026, 3, 4, 12, 0)
+        # woke from sleep at 13:07: one run at 13:15, not four back-to-back
+        self.assertEqual(next_fire_time(task, datetime(2026, 3, 4, 13, 7), last), datetime(2026, 3, 4, 13, 15))
+        self.assertEqual(next_fire_time(task, datetime(2026, 3, 4, 13, 15), last), datetime(2026, 3, 4, 13, 30))
+
+    def test_interval_clock_moved_backwards(self):
+        task = {"trigger": "Interval", "interval": 15}
+        last = datetime(2026, 3, 4, 12, 0)
+        now = last - timedelta(hours=1)
+        self.assertEqual(next_fire_time(task, now, last), now + timedelta(minutes=15))
+
+    def test_invalid_tasks(self):
+        with self.assertRaises(ValueError):
+            next_fire_time({"trigger": "Interval", "interval": 0}, datetime(2026, 3, 4))
+        with self.assertRaises(ValueError):
+            next_fire_time({"trigger": "Monthly", "time": "10:00"}, datetime(2026, 3, 4))
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.value = now
+
+    def __call__(self):
+        return self.value
+
+
+class SchedulerClockTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock(datetime(2026, 3, 4, 12, 0))
+        self.fired = []
+        self.scheduler = Scheduler(lambda task: self.fired.append(task["name"]), now=self.clock)
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def set_clock(self, now):
+        """Moves the clock and wakes the scheduler thread as its periodic wake-up would."""
+        self.clock.value = now
+        with self.scheduler._cond:
+            self.scheduler._cond.notify()
+        time.sleep(0.1)
+
+    def wait_fired(self, count):
+        deadline = time.monotonic() + 2
+        while len(self.fired) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(self.fired), count)
+
+    def test_interval_restarts_when_the_clock_goes_back(self):
+        task = {"name": "every15", "trigger": "Interval", "interval": 15}
+        self.scheduler.add(task)
+        self.scheduler.start()
+        self.wait_fired(1)
+        self.assertEqual(self.scheduler.next_run(task), datetime(2026, 3, 4, 12, 15))
+        self.set_clock(datetime(2026, 3, 4, 10, 0))
+        self.assertEqual(self.scheduler.next_run(task), datetime(2026, 3, 4, 10, 15))
+        self.set_clock(datetime(2026, 3, 4, 10, 16))
+        self.wait_fired(2)
+        self.assertEqual(self.scheduler.next_run(task), datetime(2026, 3, 4, 10, 30))
+
+    def test_daily_fires_again_when_the_clock_goes_back(self):
+        task = {"name": "daily", "trigger": "Daily", "time": "09:30"}
+        self.scheduler.add(task)
+        self.scheduler.start()
+        self.assertEqual(self.scheduler.next_run(task), datetime(2026, 3, 5, 9, 30))
+        self.set_clock(datetime(2026, 3, 4, 8, 0))
+        self.assertEqual(self.scheduler.next_run(task), datetime(2026, 3, 4, 9, 30))
+        self.assertEqual(self.fired, [])
+
+    def test_forward_jump_fires_once(self):
+        task = {"name": "every15", "trigger": "Interval", "interval": 15}
+        self.scheduler.add(task)
+        self.scheduler.start()
+        self.wait_fired(1)
+        self.set_clock(datetime(2026, 3, 4, 14, 5))
+        self.wait_fired(2)
+        time.sleep(0.1)
+        self.assertEqual(len(self.fired), 2)
+        self.assertEqual(self.scheduler.next_run(task), datetime(2026, 3, 4, 14, 15))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import re
+import time
+from collections import Counter
+
+# Rollup granularities: name -> (table, bucket width in seconds)
+ROLLUPS = {
+    'minute': ('click_rollup_minute', 60),
+    'hour': ('click_rollup_hour', 3600),
+    'day': ('click_rollup_day', 86400),
+}
+MAX_REFERRER_LENGTH = 512
+
+BOT_PATTERN = re.compile(r'bot|crawl|spider|slurp|preview|curl|wget|python-requests|httpclient', re.IGNORECASE)
+TABLET_PATTERN = re.compile(r'ipad|tablet|kindle|silk', re.IGNORECASE)
+MOBILE_PATTERN = re.compile(r'mobi|iphone|ipod|android|blackberry|opera mini|windows phone', re.IGNORECASE)
+
+def classify_user_agent(user_agent):
+    """Reduces a User-Agent header to one of: bot, tablet, mobile, desktop, unknown."""
+    if not user_agent:
+        return 'unknown'
+    if BOT_PATTERN.search(user_agent):
+        return 'bot'
+    if TABLET_PATTERN.search(user_agent):
+        return 'tablet'
+    if MOBILE_PATTERN.search(user_agent):
+        return 'mobile'
+    return 'desktop'
+
+def make_event(short_code, referrer=None, user_agent=None, timestamp=None):
+    """Builds a click event tuple: (timestamp, short_code, referrer, ua_class)."""
+    if referrer:
+        referrer = referrer[:MAX_REFERRER_LENGTH]
+    return (int(timestamp if timestamp is not None else time.time()), short_code, referrer or None, classify_user_agent(user_agent))
+
+def bucket_start(timestamp, granularity):
+    """Returns the start of the bucket that contains a UNIX timestamp."""
+    width = ROLLUPS[granularity][1]
+    return timestamp - timestamp % width
+
+def write_events(conn, events):
+    """Appends events to click_events and adds them to every rollup table.
+
+    Runs on the caller's connection so it can share a transaction with the click flush.
+    """
+    if not events:
+        return
+    conn.executemany(
+        'INSERT INTO click_events (ts, short_code, referrer, ua_class) VALUES (?, ?, ?, ?)',
+        events
+    )
+    for granularity, (table, _) in ROLLUPS.items():
+        # Pre-aggregate in memory so each (code, bucket) is written once per flush
+        counts = Counter((code, bucket_start(ts, granularity)) for ts, code, _, _ in events)
+        conn.executemany(
+            f'INSERT INTO {table} (short_code, bucket, clicks) VALUES (?, ?, ?) '
+            'ON CONFLICT (short_code, bucket) DO UPDATE SET clicks = clicks + excluded.clicks',
+            [(code, bucket, clicks) for (code, bucket), clicks in counts.items()]
+        )
+
+def clicks_by_bucket(conn, short_code, granularity, since, until=None):
+    """Returns [(bucket_start, clicks), ...] for one code from a rollup table."""
+    table = ROLLUPS[granularity][0]
+    until = until if until is not None else int(time.time())
+    rows = conn.execute(
+        f'SELECT bucket, clicks FROM {table} WHERE short_code = ? AND bucket >= ? AND bucket <= ? ORDER BY bucket',
+        (short_code, bucket_start(int(since), granularity), int(until))
+    ).fetchall()
+    return [(row[0], row[1]) for row in rows]
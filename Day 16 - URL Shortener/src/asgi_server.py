@@ -0,0 +1,182 @@
+"""
+Async redirect server for the URL Shortener.
+
+A minimal ASGI application that serves only the hot paths:
+- GET  /<short_code>  -> 302 redirect (cache first, database on a miss)
+- POST /shorten       -> JSON {"original_url": ..., "custom_code": ..., "expires_in": seconds}
+- GET  /metrics       -> Prometheus metrics
+
+It shares urls.db, the link cache, the write-behind click counter and the
+code generator with the Flask app through link_service. Cache hits are
+answered on the event loop; database work runs in worker threads over the
+connection pool so the loop never blocks on SQLite. The Bloom filter is
+checked in memory on the loop and refreshed from a background task; a code it
+rules out is rechecked against new rows in a worker thread before the 404.
+
+Run with:  python src/asgi_server.py   (requires: pip install uvicorn)
+"""
+import asyncio
+import json
+import sqlite3
+import time
+import metrics
+from link_store import store
+from link_service import (
+    click_counter, link_cache, code_filter, link_reaper,
+    find_original_url, create_link, parse_expires_in, LinkError,
+)
+
+HOST = '127.0.0.1'
+PORT = 8000
+# Largest /shorten request body accepted
+MAX_BODY_BYTES = 64 * 1024
+
+def header(scope, name):
+    """Returns a request header as str (or None)."""
+    for key, value in scope.get('headers', ()):
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+async def send_response(send, status, body=b'', content_type=b'application/json', extra_headers=()):
+    """Sends a complete HTTP response."""
+    headers = [(b'content-type', content_type), (b'content-length', str(len(body)).encode())]
+    headers.extend(extra_headers)
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+async def send_metrics(send):
+    """Serves the Prometheus scrape endpoint."""
+    await send_response(send, 200, metrics.registry.render().encode(), content_type=metrics.CONTENT_TYPE.encode())
+
+async def send_json(send, status, payload):
+    """Sends a JSON response."""
+    await send_response(send, status, json.dumps(payload).encode())
+
+async def read_body(receive):
+    """Reads the request body, returning None if it exceeds MAX_BODY_BYTES."""
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+async def handle_redirect(scope, send, short_code):
+    """Redirects to the original URL and counts the click."""
+    # Hot codes are answered straight from the cache without leaving the event loop
+    original_url = link_cache.get(short_code)
+    if original_url is None:
+        if not code_filter.might_exist(short_code, refresh=False) and \
+                not await asyncio.to_thread(code_filter.recheck, short_code):
+            # Ruled out by the Bloom filter, even after picking up other processes' new codes
+            await send_json(send, 404, {'error': f"Short link '{short_code}' not found."})
+            return
+        # The cache and filter were checked above; only the query runs in a thread
+        original_url = await asyncio.to_thread(find_original_url, short_code)
+    if original_url is None:
+        await send_json(send, 404, {'error': f"Short link '{short_code}' not found."})
+        return
+    click_counter.record(short_code, header(scope, b'referer'), header(scope, b'user-agent'))
+    await send_response(send, 302, content_type=b'text/plain', extra_headers=[(b'location', original_url.encode('utf-8'))])
+
+async def handle_shorten(scope, receive, send):
+    """Creates a link from a JSON body and returns its short code."""
+    body = await read_body(receive)
+    if body is None:
+        await send_json(send, 413, {'error': 'Request body too large.'})
+        return
+    try:
+        payload = json.loads(body or b'{}')
+        original_url = str(payload.get('original_url') or '').strip()
+        custom_code = str(payload.get('custom_code') or '').strip()
+    except (ValueError, AttributeError):
+        await send_json(send, 400, {'error': 'Body must be a JSON object.'})
+        return
+    try:
+        expires_in = parse_expires_in(payload.get('expires_in'))
+        short_code = await asyncio.to_thread(create_link, original_url, custom_code, expires_in)
+    except LinkError as e:
+        await send_json(send, e.status, {'error': str(e)})
+        return
+    except sqlite3.Error as e:
+        await send_json(send, 500, {'error': f'An error occurred: {e}'})
+        return
+    host = header(scope, b'host') or f'{HOST}:{PORT}'
+    await send_json(send, 201, {'short_code': short_code, 'short_url': f"{scope.get('scheme', 'http')}://{host}/{short_code}"})
+
+async def refresh_code_filter():
+    """Picks up codes created by other processes, off the event loop."""
+    while True:
+        await asyncio.sleep(code_filter.refresh_seconds)
+        try:
+            await asyncio.to_thread(code_filter.refresh_if_due)
+        except sqlite3.Error:
+            pass  # keep the current filter and try again next time
+
+async def lifespan(receive, send):
+    """Prepares the database and starts the reaper on startup; flushes pending clicks when the server shuts down."""
+    refresher = None
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Create or upgrade the schema (safe to run every time)
+            await asyncio.to_thread(store.init)
+            await asyncio.to_thread(code_filter.rebuild)
+            refresher = asyncio.create_task(refresh_code_filter())
+            link_reaper.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if refresher is not None:
+                refresher.cancel()
+            await asyncio.to_thread(link_reaper.stop)
+            await asyncio.to_thread(click_counter.stop)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def app(scope, receive, send):
+    """ASGI entry point."""
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+    method, path = scope['method'], scope['path']
+    start = time.perf_counter()
+    status = {}
+
+    async def send_recording_status(message):
+        if message['type'] == 'http.response.start':
+            status['code'] = message['status']
+        await send(message)
+
+    if path == '/shorten':
+        route = '/shorten'
+        if method != 'POST':
+            await send_json(send_recording_status, 405, {'error': 'Use POST with a JSON body.'})
+        else:
+            await handle_shorten(scope, receive, send_recording_status)
+    elif path == '/metrics':
+        route = '/metrics'
+        await send_metrics(send_recording_status)
+    elif method in ('GET', 'HEAD') and path.lstrip('/') and '/' not in path.lstrip('/'):
+        route = '/<string:short_code>'
+        await handle_redirect(scope, send_recording_status, path.lstrip('/'))
+    else:
+        route = '<unmatched>'
+        await send_json(send_recording_status, 404, {'error': 'Not found.'})
+    metrics.observe_request(route, method, status.get('code', 0), time.perf_counter() - start)
+
+if __name__ == '__main__':
+    # The database is created or upgraded on startup (see lifespan)
+    try:
+        import uvicorn
+    except ImportError:
+        print("The async server needs uvicorn: pip install uvicorn")
+    else:
+        print(f"Starting async redirect server at http://{HOST}:{PORT}")
+        uvicorn.run(app, host=HOST, port=PORT, log_level='warning', access_log=False)
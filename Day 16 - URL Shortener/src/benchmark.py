@@ -0,0 +1,272 @@
+"""
+Load-testing and latency benchmark for the URL Shortener.
+
+Seeds a separate database with N links, then drives redirects (with a
+Zipf-like popularity distribution), creates and dashboard loads from
+concurrent workers. By default it uses the Flask test client in-process;
+--socket serves the app over a real HTTP socket. Results are printed (and
+optionally saved) as JSON.
+
+--url targets an already running asgi_server.py instead. The running server
+holds the database open, so that mode never reseeds it: seed it first with
+--seed-only, then start the server on the same URL_SHORTENER_DB. Creates are
+sent as JSON, and the dashboard phase is skipped (the async server has no
+dashboard).
+
+Example:
+    python src/benchmark.py --links 100000 --requests 20000 --workers 8 --output before.json
+"""
+import argparse
+import contextlib
+import glob
+import http.client
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the URL Shortener.")
+    parser.add_argument('--db', default=os.path.join(tempfile.gettempdir(), 'url_shortener_bench.db'),
+                        help="Database file to seed and use (recreated unless --url is given)")
+    parser.add_argument('--links', type=int, default=10000, help="Links to seed")
+    parser.add_argument('--zipf', type=float, default=1.1, help="Zipf exponent for link popularity (0 = uniform)")
+    parser.add_argument('--requests', type=int, default=5000, help="Redirect requests to send")
+    parser.add_argument('--creates', type=int, default=500, help="Create (POST /shorten) requests to send")
+    parser.add_argument('--dashboard', type=int, default=200, help="Dashboard page loads to send")
+    parser.add_argument('--workers', type=int, default=8, help="Concurrent workers")
+    parser.add_argument('--socket', action='store_true', help="Serve the Flask app on a real socket")
+    parser.add_argument('--url', help="Benchmark an already running asgi_server.py at this base URL instead")
+    parser.add_argument('--seed-only', action='store_true', help="Seed the database and exit (to start a server on it)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed for reproducible workloads")
+    parser.add_argument('--output', help="Also write the JSON report to this file")
+    return parser.parse_args(argv)
+
+# --- Workload ---
+
+def seed_database(db_file, count):
+    """Recreates the benchmark database (and its shards) with `count` links and returns their short codes."""
+    base, ext = os.path.splitext(db_file)
+    for path in [db_file] + glob.glob(f'{glob.escape(base)}.shard*of*{ext}'):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    from database import SEQUENCE_START
+    from link_store import store
+    from short_codes import encode_base62
+    # Keep stdout clean for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        store.init()
+    codes = [encode_base62(SEQUENCE_START + i) for i in range(count)]
+    for start in range(0, count, 10000):
+        store.insert_new([(f'https://example.com/page/{i}', codes[i]) for i in range(start, min(start + 10000, count))])
+    if count:
+        # Keep generated codes from colliding with the seeded ones
+        store.reserve_block(count)
+    return codes
+
+def existing_codes(db_file, count):
+    """Returns up to `count` short codes from an already seeded database, without modifying it."""
+    if not os.path.exists(db_file):
+        sys.exit(f"{db_file} does not exist; seed it first with --seed-only, then start the server on it")
+    from link_store import store
+    codes, _ = store.scan_codes(limit=count)
+    if not codes:
+        sys.exit(f"{db_file} has no links; seed it first with --seed-only, then start the server on it")
+    return codes
+
+def zipf_sample(codes, exponent, size, rng):
+    """Draws codes so that the k-th most popular one is picked with weight 1 / k**exponent."""
+    ranked = list(codes)
+    rng.shuffle(ranked)
+    cum_weights, total = [], 0.0
+    for rank in range(1, len(ranked) + 1):
+        total += 1.0 / rank ** exponent
+        cum_weights.append(total)
+    return rng.choices(ranked, cum_weights=cum_weights, k=size)
+
+# --- Clients ---
+
+class TestClientDriver:
+    """Sends requests through Flask's in-process test client."""
+
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def request(self, method, path, form=None):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        response = client.open(path, method=method, data=form)
+        response.close()
+        return response.status_code
+
+class SocketDriver:
+    """Sends requests over HTTP keep-alive connections (one per worker thread).
+
+    Request bodies are sent as form data, or as JSON if `json_bodies` (the async server's /shorten).
+    """
+
+    def __init__(self, base_url, json_bodies=False):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.json_bodies = json_bodies
+        self.local = threading.local()
+
+    def request(self, method, path, form=None):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        body, headers = None, {}
+        if form is not None and self.json_bodies:
+            body = json.dumps(form)
+            headers['Content-Type'] = 'application/json'
+        elif form is not None:
+            from urllib.parse import urlencode
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self.local.conn = None
+            return 0
+
+def start_socket_server(app):
+    """Serves the Flask app with werkzeug's threaded server on a free port."""
+    from werkzeug.serving import make_server
+    # Per-request access logging would dominate the measurements
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+# --- Measurement ---
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def run_phase(driver, jobs, workers, ok_statuses):
+    """Runs (method, path, form) jobs on `workers` threads and summarises latency and throughput."""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker(chunk):
+        nonlocal errors
+        local_latencies, local_errors = [], 0
+        for method, path, form in chunk:
+            start = time.perf_counter()
+            status = driver.request(method, path, form)
+            local_latencies.append(time.perf_counter() - start)
+            if status not in ok_statuses:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors += local_errors
+
+    chunks = [jobs[i::workers] for i in range(workers)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(worker, chunks))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        'requests': len(jobs),
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(len(jobs) / elapsed, 1) if elapsed else 0.0,
+        'mean_ms': ms(sum(latencies) / len(latencies)) if latencies else 0.0,
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'max_ms': ms(latencies[-1]) if latencies else 0.0,
+    }
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Point every module at the benchmark database before they are imported
+    os.environ['URL_SHORTENER_DB'] = os.path.abspath(args.db)
+    rng = random.Random(args.seed)
+
+    if args.url:
+        # The server already has the database open; recreating it would pull it out from under it
+        codes = existing_codes(args.db, args.links)
+    else:
+        codes = seed_database(args.db, args.links)
+        if args.seed_only:
+            print(f"Seeded {len(codes)} links into {os.path.abspath(args.db)}", file=sys.stderr)
+            return
+    from link_store import store
+
+    server = None
+    if args.url:
+        driver, mode = SocketDriver(args.url, json_bodies=True), f'asgi server ({args.url})'
+    else:
+        from url_shortener import app
+        from link_service import link_cache, click_counter
+        if args.socket:
+            server, base_url = start_socket_server(app)
+            driver, mode = SocketDriver(base_url), f'socket ({base_url})'
+        else:
+            driver, mode = TestClientDriver(app), 'flask test client'
+
+    redirect_jobs = [('GET', f'/{code}', None) for code in zipf_sample(codes, args.zipf, args.requests, rng)]
+    create_jobs = [('POST', '/shorten', {'original_url': f'https://example.org/new/{i}', 'custom_code': ''})
+                   for i in range(args.creates)]
+    dashboard_jobs = []
+    # The async server has no dashboard
+    for i in range(0 if args.url else args.dashboard):
+        # Mix the first page with deep pages to show keyset pagination cost
+        cursor = rng.randint(1, max(1, args.links))
+        if store.shard_count > 1:
+            # Sharded dashboards page on 'id-shard' cursors
+            cursor = f'{cursor}-0'
+        path = '/' if i % 2 == 0 else f'/?after={cursor}'
+        dashboard_jobs.append(('GET', path, None))
+
+    results = {
+        'redirect': run_phase(driver, redirect_jobs, args.workers, {301, 302, 307, 308}),
+        'create': run_phase(driver, create_jobs, args.workers, {201, 302}),
+    }
+    if not args.url:
+        results['dashboard'] = run_phase(driver, dashboard_jobs, args.workers, {200})
+    report = {
+        'config': {
+            'mode': mode, 'db': os.path.abspath(args.db), 'links': len(codes), 'zipf': args.zipf,
+            'workers': args.workers, 'seed': args.seed, 'python': sys.version.split()[0],
+        },
+        'results': results,
+    }
+    if not args.url:
+        # In-process counters are only meaningful when this process served the requests
+        click_counter.flush()
+        report.update(cache=link_cache.stats(), clicks=click_counter.stats(), pool=store.pool_stats())
+    if server is not None:
+        server.shutdown()
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+import hashlib
+import math
+import threading
+import time
+from link_store import store
+
+# Filter sizing; the filter is rebuilt with twice the capacity once it fills up
+BLOOM_MIN_CAPACITY = 100000
+BLOOM_ERROR_RATE = 0.01
+# How often to pick up codes created by other processes (CLI imports, other servers);
+# a code the filter rules out also triggers a pick-up first, see ShortCodeFilter.recheck
+BLOOM_REFRESH_SECONDS = 5.0
+REBUILD_CHUNK_SIZE = 5000
+
+class BloomFilter:
+    """A fixed-size Bloom filter over strings (no false negatives, tunable false positives)."""
+
+    def __init__(self, capacity, error_rate=BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        """Derives hash_count bit positions from one digest (double hashing)."""
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class ShortCodeFilter:
+    """Bloom filter over every short code in the links table, used to reject unknown codes cheaply."""
+
+    def __init__(self, min_capacity=BLOOM_MIN_CAPACITY, error_rate=BLOOM_ERROR_RATE, refresh_seconds=BLOOM_REFRESH_SECONDS):
+        self.min_capacity = min_capacity
+        self.error_rate = error_rate
+        self.refresh_seconds = refresh_seconds
+        self._filter = None
+        self._marks = None         # highest links.id already in the filter, per shard
+        self._last_refresh = 0.0
+        self._rebuilding = False
+        self._added_during_rebuild = []
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._initial_build_lock = threading.Lock()
+        self.rejected = 0
+        self.passed = 0
+        self.false_positives = 0
+        self.rebuilds = 0
+
+    def rebuild(self):
+        """Builds a fresh filter from the database (call at startup; also used when the filter fills up)."""
+        with self._lock:
+            self._rebuilding = True
+            self._added_during_rebuild = []
+        try:
+            total = store.count()
+            new_filter = BloomFilter(max(self.min_capacity, total * 2), self.error_rate)
+            marks = None
+            while True:
+                codes, marks = store.scan_codes(marks, limit=REBUILD_CHUNK_SIZE)
+                if not codes:
+                    break
+                for code in codes:
+                    new_filter.add(code)
+        except Exception:
+            with self._lock:
+                self._rebuilding = False
+            raise
+        with self._lock:
+            # Codes created while we were scanning may not have been seen by the scan
+            for code in self._added_during_rebuild:
+                new_filter.add(code)
+            self._filter = new_filter
+            self._marks = marks if self._marks is None else tuple(map(max, self._marks, marks))
+            self._last_refresh = time.monotonic()
+            self._rebuilding = False
+            self._added_during_rebuild = []
+            self.rebuilds += 1
+
+    def add(self, short_code):
+        """Adds a newly created code."""
+        with self._lock:
+            if self._rebuilding:
+                self._added_during_rebuild.append(short_code)
+            if self._filter is None:
+                return
+            self._filter.add(short_code)
+            full = self._filter.count > self._filter.capacity and not self._rebuilding
+        if full:
+            # Past capacity the false-positive rate climbs; resize in the background
+            threading.Thread(target=self.rebuild, name='bloom-rebuild', daemon=True).start()
+
+    def refresh_if_due(self):
+        """Builds the filter on first use and picks up other processes' codes every refresh_seconds (queries SQLite)."""
+        if self._filter is None:
+            with self._initial_build_lock:
+                if self._filter is None:
+                    self.rebuild()
+        elif time.monotonic() - self._last_refresh > self.refresh_seconds:
+            self._refresh()
+
+    def might_exist(self, short_code, refresh=True):
+        """False means the code definitely does not exist; True means check the database.
+
+        Before ruling a code out, codes created by other processes since the last refresh are picked
+        up (see recheck), so a link made by another server a moment ago is never rejected.
+
+        With refresh=False the check never touches the database (safe on an event loop): False then
+        only means the code is not in the filter yet, and the caller must confirm it with recheck()
+        off the loop. The caller keeps the filter current with refresh_if_due(), and an unbuilt
+        filter lets every code through.
+        """
+        if refresh:
+            self.refresh_if_due()
+        current = self._filter
+        if current is None:
+            return True
+        if short_code in current:
+            self.passed += 1
+            return True
+        if refresh:
+            return self.recheck(short_code)
+        return False
+
+    def recheck(self, short_code):
+        """Picks up other processes' new codes, then checks the code again (queries SQLite).
+
+        Concurrent rechecks share one scan: a caller that waited for another's scan skips its own.
+        """
+        started = time.monotonic()
+        with self._refresh_lock:
+            if self._last_refresh < started:
+                self._scan()
+        current = self._filter
+        if current is None or short_code in current:
+            self.passed += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def record_false_positive(self):
+        """Counts a code the filter let through but the database did not have."""
+        self.false_positives += 1
+
+    def _refresh(self):
+        """Adds codes inserted by other processes since the last scan (one indexed range query per shard)."""
+        if not self._refresh_lock.acquire(blocking=False):
+            return  # another thread is already refreshing
+        try:
+            self._scan()
+        finally:
+            self._refresh_lock.release()
+
+    def _scan(self):
+        """The body of _refresh. Called with _refresh_lock held."""
+        if self._marks is None:
+            return  # not built yet
+        codes, marks = store.scan_codes(self._marks)
+        with self._lock:
+            # during a rebuild every code must reach _added_during_rebuild, so nothing is skipped
+            current = None if self._rebuilding else self._filter
+        for code in codes:
+            if current is not None and code in current:
+                continue  # added by this process already; counting it twice would resize early
+            self.add(code)
+        with self._lock:
+            self._marks = tuple(map(max, self._marks, marks))
+            self._last_refresh = time.monotonic()
+
+    def stats(self):
+        """Returns filter size and short-circuit counters."""
+        current = self._filter
+        return {
+            'codes': current.count if current else 0,
+            'capacity': current.capacity if current else 0,
+            'bits': current.size if current else 0,
+            'hash_functions': current.hash_count if current else 0,
+            'rejected': self.rejected,
+            'passed': self.passed,
+            'false_positives': self.false_positives,
+            'rebuilds': self.rebuilds,
+        }
@@ -0,0 +1,195 @@
+import argparse
+import csv
+import io
+import json
+import sys
+from link_store import store
+from short_codes import ShortCodeGenerator, is_valid_custom_code
+
+# Rows inserted per transaction during an import
+IMPORT_BATCH_SIZE = 1000
+# Rows fetched per query during an export
+EXPORT_CHUNK_SIZE = 1000
+# Generated codes that collide with an existing custom code are retried this many times
+MAX_CODE_ATTEMPTS = 10
+
+EXPORT_FIELDS = ('id', 'short_code', 'original_url', 'clicks', 'expires_at')
+FORMATS = ('csv', 'jsonl')
+
+# --- Parsing ---
+
+def iter_csv_rows(lines):
+    """Yields import rows from CSV text with columns original_url[,custom_code].
+
+    A header row is optional; it is detected by an 'original_url' first cell.
+    """
+    reader = csv.reader(lines)
+    columns = None
+    for row in reader:
+        line = reader.line_num
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        if columns is None:
+            columns = [cell.strip().lower() for cell in row]
+            if 'original_url' in columns:
+                continue
+            columns = ['original_url', 'custom_code']
+        values = dict(zip(columns, (cell.strip() for cell in row)))
+        yield {'line': line, 'original_url': values.get('original_url', ''), 'custom_code': values.get('custom_code', '')}
+
+def iter_jsonl_rows(lines):
+    """Yields import rows from JSON Lines: {"original_url": ..., "custom_code": ...}."""
+    for line, text in enumerate(lines, start=1):
+        text = text.strip()
+        if not text:
+            continue
+        try:
+            obj = json.loads(text)
+        except json.JSONDecodeError as e:
+            yield {'line': line, 'original_url': '', 'custom_code': '', 'error': f'invalid JSON: {e.msg}'}
+            continue
+        if not isinstance(obj, dict):
+            yield {'line': line, 'original_url': '', 'custom_code': '', 'error': 'expected a JSON object'}
+            continue
+        yield {
+            'line': line,
+            'original_url': str(obj.get('original_url') or '').strip(),
+            'custom_code': str(obj.get('custom_code') or '').strip(),
+        }
+
+def iter_rows(lines, fmt):
+    """Picks the parser for a format name."""
+    if fmt == 'csv':
+        return iter_csv_rows(lines)
+    if fmt == 'jsonl':
+        return iter_jsonl_rows(lines)
+    raise ValueError(f"Unknown format '{fmt}', expected one of: {', '.join(FORMATS)}")
+
+# --- Import ---
+
+def import_links(rows, generator=None, batch_size=IMPORT_BATCH_SIZE, on_created=None):
+    """Inserts rows in batched transactions and returns a report with per-row rejections.
+
+    `on_created` is called with the list of new short codes after each committed batch.
+    """
+    generator = generator or ShortCodeGenerator()
+    report = {'inserted': 0, 'rejected': []}
+    seen_custom = set()
+    batch = []
+    for row in rows:
+        reason = row.get('error')
+        code = row['custom_code']
+        if not reason and not row['original_url']:
+            reason = 'missing original_url'
+        elif not reason and code:
+            if not is_valid_custom_code(code):
+                reason = 'invalid custom code'
+            elif code in seen_custom:
+                reason = 'duplicate custom code in import'
+        if reason:
+            report['rejected'].append({'line': row['line'], 'short_code': code or None, 'reason': reason})
+            continue
+        if code:
+            seen_custom.add(code)
+        batch.append(row)
+        if len(batch) >= batch_size:
+            _insert_batch(batch, generator, report, on_created)
+            batch = []
+    if batch:
+        _insert_batch(batch, generator, report, on_created)
+    return report
+
+def _insert_batch(batch, generator, report, on_created):
+    """Writes one batch: one existence query and one executemany inside a single write transaction per shard."""
+    pending = [(row, row['custom_code'] or None) for row in batch]
+    for _ in range(MAX_CODE_ATTEMPTS):
+        # Generated codes are drawn before taking the writer, which the generator also uses
+        assigned = [(row, custom, custom or generator.next_code()) for row, custom in pending]
+        retry = []
+        taken = store.insert_new([(row['original_url'], code) for row, _, code in assigned])
+        to_insert = []
+        for row, custom, code in assigned:
+            if code not in taken:
+                to_insert.append((row['original_url'], code))
+            elif custom:
+                report['rejected'].append({'line': row['line'], 'short_code': custom, 'reason': 'custom code already taken'})
+            else:
+                # A custom code already uses this generated value, draw another one
+                retry.append((row, None))
+        report['inserted'] += len(to_insert)
+        if on_created and to_insert:
+            on_created([code for _, code in to_insert])
+        if not retry:
+            return
+        pending = retry
+    for row, _ in pending:
+        report['rejected'].append({'line': row['line'], 'short_code': None, 'reason': 'could not allocate a short code'})
+
+# --- Export ---
+
+def iter_export(fmt, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yields the whole links table as CSV or JSONL text, one chunk at a time."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}', expected one of: {', '.join(FORMATS)}")
+    buffer = io.StringIO()
+    writer = None
+    if fmt == 'csv':
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+    count = 0
+    for link in store.iter_links(chunk_size, EXPORT_FIELDS):
+        if writer:
+            writer.writerow(link)
+        else:
+            buffer.write(json.dumps(link) + '\n')
+        count += 1
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+# --- CLI ---
+
+def guess_format(path, explicit=None):
+    """Uses --format if given, otherwise the file extension (defaults to jsonl)."""
+    if explicit:
+        return explicit
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import/export links for the URL Shortener.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    imp = sub.add_parser('import', help="Import links from a CSV or JSONL file ('-' for stdin)")
+    imp.add_argument('file')
+    imp.add_argument('--format', choices=FORMATS)
+    imp.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+    exp = sub.add_parser('export', help="Export all links to a CSV or JSONL file ('-' for stdout)")
+    exp.add_argument('file')
+    exp.add_argument('--format', choices=FORMATS)
+    args = parser.parse_args(argv)
+    fmt = guess_format(args.file, args.format)
+
+    if args.command == 'import':
+        source = sys.stdin if args.file == '-' else open(args.file, newline='', encoding='utf-8')
+        try:
+            report = import_links(iter_rows(source, fmt), batch_size=args.batch_size)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        for rejected in report['rejected']:
+            print(f"line {rejected['line']}: {rejected['reason']} ({rejected['short_code'] or '-'})", file=sys.stderr)
+        print(f"Imported {report['inserted']} links, rejected {len(report['rejected'])}.")
+    else:
+        target = sys.stdout if args.file == '-' else open(args.file, 'w', newline='', encoding='utf-8')
+        try:
+            for chunk in iter_export(fmt):
+                target.write(chunk)
+        finally:
+            if target is not sys.stdout:
+                target.close()
+                print(f"Exported links to {args.file}")
+
+if __name__ == '__main__':
+    main()
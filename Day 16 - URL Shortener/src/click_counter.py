@@ -0,0 +1,107 @@
+import atexit
+import sqlite3
+import threading
+from link_store import store
+from analytics import make_event
+
+# Flush pending clicks every FLUSH_INTERVAL seconds, or sooner once FLUSH_THRESHOLD clicks are queued
+FLUSH_INTERVAL_SECONDS = 2.0
+FLUSH_THRESHOLD = 500
+
+class ClickAggregator:
+    """Accumulates click deltas and click events in memory and writes them to the database in batches."""
+
+    def __init__(self, interval=FLUSH_INTERVAL_SECONDS, threshold=FLUSH_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self._pending = {}  # short_code -> clicks not yet written
+        self._pending_total = 0
+        self._events = []  # analytics events not yet written
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.flushes = 0
+        self.flushed_clicks = 0
+
+    def record(self, short_code, referrer=None, user_agent=None):
+        """Counts one click and queues its analytics event. Never touches the database."""
+        event = make_event(short_code, referrer, user_agent)
+        with self._lock:
+            self._events.append(event)
+            self._pending[short_code] = self._pending.get(short_code, 0) + 1
+            self._pending_total += 1
+            full = self._pending_total >= self.threshold
+        self._ensure_started()
+        if full:
+            # Let the background thread do the write so this request stays fast
+            self._wakeup.set()
+
+    def pending(self):
+        """Returns a snapshot of clicks that have not been written yet."""
+        with self._lock:
+            return dict(self._pending)
+
+    def flush(self):
+        """Writes all pending deltas and events in a single transaction (one per shard). Returns the number of clicks written."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, {}
+                events, self._events = self._events, []
+                self._pending_total = 0
+            try:
+                store.apply_clicks(batch, events)
+            except sqlite3.Error as e:
+                print(f"Error flushing clicks: {e}")
+                # Put the batch back so the counts are retried on the next flush
+                with self._lock:
+                    self._events[:0] = events
+                    for code, delta in batch.items():
+                        self._pending[code] = self._pending.get(code, 0) + delta
+                        self._pending_total += delta
+                return 0
+            written = sum(batch.values())
+            self.flushes += 1
+            self.flushed_clicks += written
+            return written
+
+    def stop(self):
+        """Stops the background thread and writes whatever is still pending."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.interval + 5)
+        self.flush()
+
+    def stats(self):
+        """Returns the pending/flushed counters."""
+        with self._lock:
+            pending_clicks = self._pending_total
+            pending_codes = len(self._pending)
+        return {
+            'pending_clicks': pending_clicks,
+            'pending_codes': pending_codes,
+            'flushes': self.flushes,
+            'flushed_clicks': self.flushed_clicks,
+        }
+
+    def _ensure_started(self):
+        """Starts the flush thread on first use and registers the shutdown flush."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='click-flusher', daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def _run(self):
+        """Background loop: flush every interval, or early when the threshold is reached."""
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
@@ -1,26 +1,93 @@
 import sqlite3
 import os
+import threading
+from contextlib import contextmanager
 
-DB_FILE = os.path.join(os.path.dirname(__file__), 'urls.db')
+# Set URL_SHORTENER_DB to use a different database file (e.g. for benchmarks)
+DB_FILE = os.environ.get('URL_SHORTENER_DB') or os.path.join(os.path.dirname(__file__), 'urls.db')
+# First sequence number for generated codes (62**5 is the smallest 6-character base62 value)
+SEQUENCE_START = 62 ** 5
 
-def init_db():
+# PRAGMAs applied to every connection the app opens
+PRAGMA_PROFILE = {
+    'journal_mode': 'WAL',       # readers never block behind the writer
+    'synchronous': 'NORMAL',     # fsync at checkpoints only; safe with WAL
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -16000,        # ~16 MB page cache per connection
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,        # wait up to 5 s for another process's write lock
+}
+# Pool sizing
+POOL_MAX_READERS = 8
+STATEMENT_CACHE_SIZE = 256
+
+def init_db(db_file=DB_FILE):
     """Initializes the database and creates the 'links' table."""
+    conn = None
     try:
-        conn = sqlite3.connect(DB_FILE)
+        conn = sqlite3.connect(db_file)
         cursor = conn.cursor()
         
+        # Let the reaper hand freed pages back a few at a time (only takes effect on new files,
+        # see enable_incremental_vacuum for existing ones)
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        
         # Create table
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS links (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             short_code TEXT UNIQUE NOT NULL,
             original_url TEXT NOT NULL,
-            clicks INTEGER NOT NULL DEFAULT 0
+            clicks INTEGER NOT NULL DEFAULT 0,
+            expires_at INTEGER
+        )
+        """)
+        # Older databases: add the expiry column (unix time, NULL = never expires)
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(links)")]
+        if 'expires_at' not in columns:
+            cursor.execute("ALTER TABLE links ADD COLUMN expires_at INTEGER")
+        
+        # Index for prefix search on the dashboard (short_code is already indexed by UNIQUE)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_links_original_url ON links (original_url)")
+        # Only links with an expiry are indexed, so the reaper's scan stays small
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_links_expires_at ON links (expires_at) WHERE expires_at IS NOT NULL")
+        
+        # Shared counter used to hand out collision-free short codes
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS code_sequence (
+            name TEXT PRIMARY KEY,
+            next_value INTEGER NOT NULL
         )
         """)
+        cursor.execute(
+            "INSERT OR IGNORE INTO code_sequence (name, next_value) VALUES ('links', ?)",
+            (SEQUENCE_START,)
+        )
+        
+        # Append-only click log, plus rollups maintained on every flush
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS click_events (
+            id INTEGER PRIMARY KEY,
+            ts INTEGER NOT NULL,
+            short_code TEXT NOT NULL,
+            referrer TEXT,
+            ua_class TEXT NOT NULL
+        )
+        """)
+        # Lets the reaper delete an expired link's events without a table scan
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_click_events_short_code ON click_events (short_code)")
+        for table in ('click_rollup_minute', 'click_rollup_hour', 'click_rollup_day'):
+            cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                short_code TEXT NOT NULL,
+                bucket INTEGER NOT NULL,
+                clicks INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (short_code, bucket)
+            ) WITHOUT ROWID
+            """)
         
         conn.commit()
-        print(f"Database initialized successfully at {DB_FILE}")
+        print(f"Database initialized successfully at {db_file}")
         
     except sqlite3.Error as e:
         print(f"An error occurred while initializing the database: {e}")
@@ -28,13 +95,126 @@ def init_db():
         if conn:
             conn.close()
 
-def get_db_connection():
-    """Returns a connection to the SQLite database."""
-    conn = sqlite3.connect(DB_FILE)
+def enable_incremental_vacuum(db_file=DB_FILE):
+    """Switches an existing database to auto_vacuum=INCREMENTAL. Rewrites the whole file once (VACUUM)."""
+    conn = sqlite3.connect(db_file)
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            print(f"Enabling incremental vacuum on {db_file} (one-time full VACUUM)...")
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+def open_connection(db_file=DB_FILE, pragmas=None, read_only=False):
+    """Opens a connection with the PRAGMA profile applied."""
+    conn = sqlite3.connect(db_file, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
     conn.row_factory = sqlite3.Row
+    for name, value in (PRAGMA_PROFILE if pragmas is None else pragmas).items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    if read_only:
+        conn.execute("PRAGMA query_only = ON")
     return conn
 
+def get_db_connection():
+    """Returns a new standalone connection to the SQLite database."""
+    return open_connection(DB_FILE)
+
+class ConnectionPool:
+    """Reuses SQLite connections: a bounded set of read-only readers and one shared writer.
+
+    In WAL mode the readers keep seeing the last committed data while the writer works,
+    so page loads and redirects never wait for an insert or a click flush.
+    """
+
+    def __init__(self, db_file=DB_FILE, max_readers=POOL_MAX_READERS, pragmas=None):
+        self.db_file = db_file
+        self.max_readers = max_readers
+        self.pragmas = pragmas
+        self._idle_readers = []
+        self._readers_open = 0
+        self._reader_slots = threading.BoundedSemaphore(max_readers)
+        self._readers_lock = threading.Lock()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+
+    def acquire_reader(self):
+        """Takes an idle reader connection (or opens one), waiting if all are in use."""
+        self._reader_slots.acquire()
+        try:
+            with self._readers_lock:
+                if self._idle_readers:
+                    return self._idle_readers.pop()
+                self._readers_open += 1
+            return open_connection(self.db_file, self.pragmas, read_only=True)
+        except Exception:
+            with self._readers_lock:
+                self._readers_open -= 1
+            self._reader_slots.release()
+            raise
+
+    def release_reader(self, conn):
+        """Returns a reader connection to the pool."""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._readers_lock:
+            self._idle_readers.append(conn)
+        self._reader_slots.release()
+
+    @contextmanager
+    def reader(self):
+        """Context manager that lends out a read-only connection."""
+        conn = self.acquire_reader()
+        try:
+            yield conn
+        finally:
+            self.release_reader(conn)
+
+    @contextmanager
+    def writer(self):
+        """Context manager for the single writer connection; commits on success, rolls back on error."""
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = open_connection(self.db_file, self.pragmas)
+            conn = self._writer
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    def open_standalone(self):
+        """Opens a connection outside the pool (for long scans that should not hold a reader slot)."""
+        return open_connection(self.db_file, self.pragmas)
+
+    def close(self):
+        """Closes every idle connection and the writer."""
+        with self._readers_lock:
+            for conn in self._idle_readers:
+                conn.close()
+            self._readers_open -= len(self._idle_readers)
+            self._idle_readers = []
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def stats(self):
+        """Returns reader usage counts for monitoring."""
+        with self._readers_lock:
+            return {
+                'readers_open': self._readers_open,
+                'readers_idle': len(self._idle_readers),
+                'readers_max': self.max_readers,
+                'writer_open': self._writer is not None,
+            }
+
+# Shared pool for the app; connections are opened lazily on first use
+pool = ConnectionPool()
+
 # This allows the file to be run directly to initialize the DB
 if __name__ == "__main__":
     print("Initializing database...")
-    init_db()
\ No newline at end of file
+    init_db()
+    enable_incremental_vacuum()
\ No newline at end of file
@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Default cache sizing (can be overridden when creating a LinkCache)
+CACHE_MAX_SIZE = 10000
+CACHE_TTL_SECONDS = 300
+
+class LinkCache:
+    """A bounded, thread-safe LRU cache of short_code -> original_url with a TTL."""
+
+    def __init__(self, max_size=CACHE_MAX_SIZE, ttl=CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # short_code -> (original_url, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, short_code):
+        """Returns the cached URL for a code, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(short_code)
+            if entry is None:
+                self.misses += 1
+                return None
+            original_url, expires_at = entry
+            if expires_at <= time.monotonic():
+                # Stale entry: drop it and treat as a miss
+                del self._entries[short_code]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(short_code)
+            self.hits += 1
+            return original_url
+
+    def put(self, short_code, original_url, max_age=None):
+        """Stores a mapping, evicting the least recently used entry when full.
+
+        `max_age` (seconds) shortens the TTL, e.g. for a link that expires sooner.
+        """
+        ttl = self.ttl if max_age is None else min(self.ttl, max_age)
+        with self._lock:
+            self._entries[short_code] = (original_url, time.monotonic() + ttl)
+            self._entries.move_to_end(short_code)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, short_code):
+        """Removes a single code from the cache (call after creating or editing a link)."""
+        with self._lock:
+            self._entries.pop(short_code, None)
+
+    def clear(self):
+        """Drops every cached entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Returns the current size and hit/miss/eviction counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,124 @@
+import sqlite3
+import time
+from link_store import store
+from link_cache import LinkCache
+from click_counter import ClickAggregator
+from short_codes import ShortCodeGenerator, is_valid_custom_code
+from bloom_filter import ShortCodeFilter
+from reaper import LinkReaper
+from metrics import registry
+
+# Shared state for every front-end in this process (Flask app and ASGI server)
+# In-process cache of short_code -> original_url for the redirect hot path
+link_cache = LinkCache()
+# Write-behind click counter (flushed periodically and on shutdown)
+click_counter = ClickAggregator()
+# Collision-free code generator (reserves blocks of sequence numbers)
+code_generator = ShortCodeGenerator()
+# Bloom filter over existing codes so unknown codes are rejected without a query
+code_filter = ShortCodeFilter()
+# Deletes expired links in small batches and compacts the database (started by the servers)
+link_reaper = LinkReaper(on_deleted=lambda codes: [link_cache.invalidate(code) for code in codes])
+# Gauges read at scrape time by /metrics
+registry.gauge_callback('link_cache_entries', 'Entries in the redirect cache.', lambda: link_cache.stats()['size'])
+registry.gauge_callback('link_cache_hits_total', 'Redirect cache hits.', lambda: link_cache.hits, kind='counter')
+registry.gauge_callback('link_cache_misses_total', 'Redirect cache misses.', lambda: link_cache.misses, kind='counter')
+registry.gauge_callback('link_cache_evictions_total', 'Redirect cache LRU evictions.', lambda: link_cache.evictions, kind='counter')
+registry.gauge_callback('clicks_pending', 'Clicks waiting to be flushed.', lambda: click_counter.stats()['pending_clicks'])
+registry.gauge_callback('click_flushes_total', 'Click flush transactions.', lambda: click_counter.flushes, kind='counter')
+registry.gauge_callback('bloom_rejected_total', 'Lookups rejected by the Bloom filter without a query.', lambda: code_filter.rejected, kind='counter')
+registry.gauge_callback('bloom_false_positives_total', 'Lookups the Bloom filter passed that did not exist.', lambda: code_filter.false_positives, kind='counter')
+registry.gauge_callback('db_pool_readers_open', 'Reader connections open in the pool.', lambda: store.pool_stats()['readers_open'])
+registry.gauge_callback('db_pool_readers_idle', 'Idle reader connections in the pool.', lambda: store.pool_stats()['readers_idle'])
+registry.gauge_callback('db_pool_readers_max', 'Maximum reader connections in the pool.', lambda: store.pool_stats()['readers_max'])
+registry.gauge_callback('links_reaped_total', 'Expired links deleted by the reaper.', lambda: link_reaper.reaped, kind='counter')
+registry.gauge_callback('db_shards', 'SQLite files the links are spread over.', lambda: store.shard_count)
+# Generated codes only fail to insert when a custom code already took the same value
+MAX_CODE_ATTEMPTS = 10
+# Longest expiry accepted for a link (10 years)
+MAX_EXPIRES_IN_SECONDS = 10 * 365 * 86400
+
+class UnknownShortCode(LookupError):
+    """The Bloom filter proved a short code does not exist (no database query was made)."""
+
+class LinkError(Exception):
+    """A link could not be created. `status` is the matching HTTP status code."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+def lookup_original_url(short_code):
+    """Resolves a short code via the cache, falling back to the database. Returns None if unknown.
+
+    Raises UnknownShortCode when the Bloom filter rules the code out before any query.
+    """
+    original_url = link_cache.get(short_code)
+    if original_url is not None:
+        return original_url
+    if not code_filter.might_exist(short_code):
+        raise UnknownShortCode(short_code)
+    return find_original_url(short_code)
+
+def find_original_url(short_code):
+    """The database half of lookup_original_url, for callers that already checked the cache and Bloom filter."""
+    link = store.find_link(short_code)
+    if link is None:
+        code_filter.record_false_positive()
+        return None
+    original_url, expires_at = link
+    # Never serve a link from the cache past its expiry
+    link_cache.put(short_code, original_url, None if expires_at is None else expires_at - time.time())
+    return original_url
+
+def insert_link(original_url, short_code, expires_at=None):
+    """Inserts a link on its shard's writer connection. Raises sqlite3.IntegrityError if the code is taken."""
+    store.insert(original_url, short_code, expires_at)
+    links_created([short_code])
+
+def links_created(short_codes):
+    """Updates in-process state after new links were committed."""
+    for short_code in short_codes:
+        link_cache.invalidate(short_code)
+        code_filter.add(short_code)
+
+def parse_expires_in(value):
+    """Turns an optional form/JSON expiry (seconds) into an int or None. Raises LinkError if invalid."""
+    if value is None or str(value).strip() == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise LinkError('Expiry must be a number of seconds.')
+
+def create_link(original_url, custom_code='', expires_in=None):
+    """Creates a link and returns its short code. Raises LinkError with a user-facing message.
+
+    `expires_in` is the link's lifetime in seconds (None keeps it forever).
+    """
+    if not original_url:
+        raise LinkError('Original URL is required!')
+    expires_at = None
+    if expires_in is not None:
+        if not 0 < expires_in <= MAX_EXPIRES_IN_SECONDS:
+            raise LinkError('Expiry must be between 1 second and 10 years.')
+        expires_at = int(time.time()) + int(expires_in)
+    if custom_code:
+        # User provided a custom code; the UNIQUE constraint rejects duplicates
+        if not is_valid_custom_code(custom_code):
+            raise LinkError(f"Custom code '{custom_code}' may only use letters, digits, '-' and '_'.")
+        try:
+            insert_link(original_url, custom_code, expires_at)
+        except sqlite3.IntegrityError:
+            raise LinkError(f"Custom code '{custom_code}' is already taken!", status=409)
+        return custom_code
+    # Generate a new short code; no lookup is needed before the insert
+    for _ in range(MAX_CODE_ATTEMPTS):
+        short_code = code_generator.next_code()
+        try:
+            insert_link(original_url, short_code, expires_at)
+            return short_code
+        except sqlite3.IntegrityError:
+            # A custom code already uses this value, take the next one
+            continue
+    raise LinkError('Could not allocate a short code, please try again.', status=503)
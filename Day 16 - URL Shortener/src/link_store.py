@@ -0,0 +1,412 @@
+import heapq
+import os
+import time
+import zlib
+from database import DB_FILE, ConnectionPool, pool, init_db
+from analytics import ROLLUPS, write_events, clicks_by_bucket
+from metrics import time_query
+
+# Set URL_SHORTENER_SHARDS=N (N > 1) to spread links over N database files
+SHARD_COUNT = int(os.environ.get('URL_SHORTENER_SHARDS') or 1)
+# Bound parameters per IN (...) query; older SQLite builds allow at most 999
+MAX_SQL_VARIABLES = 900
+# Searches matching more links than this walk the id order instead of sorting every match
+SEARCH_SORT_LIMIT = 2000
+
+def shard_path(index, count, db_file=DB_FILE):
+    """File name of one shard, e.g. urls.shard2of4.db next to urls.db."""
+    base, ext = os.path.splitext(db_file)
+    return f'{base}.shard{index}of{count}{ext}'
+
+def shard_for(short_code, count):
+    """Stable shard index for a short code (crc32, so every process agrees)."""
+    return zlib.crc32(short_code.encode('utf-8')) % count
+
+def prefix_upper_bound(prefix):
+    """Smallest string greater than every string starting with `prefix` (for index range scans)."""
+    return prefix + '\U0010ffff'
+
+def count_prefix_matches(conn, query, cap):
+    """Counts links whose code or URL starts with `query`, stopping at `cap` (index-only, bounded)."""
+    upper = prefix_upper_bound(query)
+    total = 0
+    for column in ('short_code', 'original_url'):
+        total += conn.execute(
+            f'SELECT COUNT(*) FROM (SELECT 1 FROM links WHERE {column} >= ? AND {column} < ? LIMIT ?)',
+            (query, upper, cap)
+        ).fetchone()[0]
+    return total
+
+class SingleFileStore:
+    """All links in one SQLite file (the default storage mode)."""
+
+    shard_count = 1
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def init(self):
+        """Creates or upgrades the schema."""
+        init_db(self.pool.db_file)
+
+    # --- Links ---
+
+    def find_link(self, short_code):
+        """Returns (original_url, expires_at) for a live code, or None if it is unknown or expired."""
+        with time_query('lookup'), self.pool.reader() as conn:
+            row = conn.execute('SELECT original_url, expires_at FROM links WHERE short_code = ?', (short_code,)).fetchone()
+        if row is None or is_expired(row['expires_at']):
+            # Expired links stay unreachable until the reaper deletes them
+            return None
+        return row['original_url'], row['expires_at']
+
+    def insert(self, original_url, short_code, expires_at=None):
+        """Inserts one link. Raises sqlite3.IntegrityError if the code is taken."""
+        with time_query('insert'), self.pool.writer() as conn:
+            conn.execute(
+                'INSERT INTO links (original_url, short_code, expires_at) VALUES (?, ?, ?)',
+                (original_url, short_code, expires_at)
+            )
+
+    def insert_new(self, links):
+        """Inserts [(original_url, short_code), ...] in one transaction, skipping codes that exist.
+
+        Returns the set of codes that were already taken (and therefore not inserted).
+        """
+        if not links:
+            return set()
+        with time_query('bulk_insert'), self.pool.writer() as conn:
+            # Hold the write lock from the existence check through the insert
+            conn.execute('BEGIN IMMEDIATE')
+            codes = [code for _, code in links]
+            taken = set()
+            # Large batches are checked in chunks to stay under SQLite's bound-variable limit
+            for i in range(0, len(codes), MAX_SQL_VARIABLES):
+                chunk = codes[i:i + MAX_SQL_VARIABLES]
+                placeholders = ','.join('?' * len(chunk))
+                taken.update(row[0] for row in conn.execute(f'SELECT short_code FROM links WHERE short_code IN ({placeholders})', chunk))
+            conn.executemany(
+                'INSERT INTO links (original_url, short_code) VALUES (?, ?)',
+                [(url, code) for url, code in links if code not in taken]
+            )
+        return taken
+
+    def apply_clicks(self, deltas, events):
+        """Adds click deltas {code: n} and appends analytics events in one transaction."""
+        with time_query('click_update'), self.pool.writer() as conn:
+            conn.executemany(
+                'UPDATE links SET clicks = clicks + ? WHERE short_code = ?',
+                [(delta, code) for code, delta in deltas.items()]
+            )
+            with time_query('click_events'):
+                write_events(conn, events)
+
+    def reserve_block(self, block_size):
+        """Advances the shared code sequence by one block and returns its [start, end) range."""
+        with time_query('sequence_reserve'), self.pool.writer() as conn:
+            row = conn.execute(
+                'UPDATE code_sequence SET next_value = next_value + ? WHERE name = ? RETURNING next_value',
+                (block_size, 'links')
+            ).fetchone()
+        if row is None:
+            raise RuntimeError("code_sequence table is missing. Run 'python src/database.py' to upgrade the database.")
+        return row[0] - block_size, row[0]
+
+    # --- Expiry & compaction ---
+
+    def delete_expired(self, now, batch_size):
+        """Deletes up to `batch_size` expired links with their click history in one short transaction.
+
+        Returns the deleted short codes.
+        """
+        with time_query('reap'), self.pool.writer() as conn:
+            codes = [row[0] for row in conn.execute(
+                'SELECT short_code FROM links WHERE expires_at <= ? ORDER BY expires_at LIMIT ?', (now, batch_size)
+            )]
+            if codes:
+                placeholders = ','.join('?' * len(codes))
+                conn.execute(f'DELETE FROM links WHERE short_code IN ({placeholders})', codes)
+                conn.execute(f'DELETE FROM click_events WHERE short_code IN ({placeholders})', codes)
+                for table, _ in ROLLUPS.values():
+                    conn.execute(f'DELETE FROM {table} WHERE short_code IN ({placeholders})', codes)
+        return codes
+
+    def compact(self, step_pages):
+        """Returns free pages to the file system `step_pages` at a time, then runs PRAGMA optimize.
+
+        Each step is its own write transaction so other writers are never held up for long.
+        Returns the number of pages freed (0 if the file is not in incremental auto_vacuum mode).
+        """
+        freed = 0
+        with self.pool.reader() as conn:
+            incremental = conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+        while incremental:
+            with time_query('vacuum'), self.pool.writer() as conn:
+                free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+                if not free_pages:
+                    break
+                # executescript steps the pragma to completion; execute() would free a single page
+                conn.executescript(f'PRAGMA incremental_vacuum({int(step_pages)})')
+                step_freed = free_pages - conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if step_freed <= 0:
+                break  # nothing could be freed (e.g. pages still in use by a reader); try next time
+            freed += step_freed
+        with time_query('optimize'), self.pool.writer() as conn:
+            conn.execute('PRAGMA optimize')
+        return freed
+
+    # --- Dashboard ---
+
+    def select_page(self, query='', below=None, above=None, descending=True, limit=50):
+        """Returns up to `limit` live rows with above < id < below, ordered by id.
+
+        A narrow search reads its matches through the short_code / original_url indexes and sorts
+        them (fewer than SEARCH_SORT_LIMIT rows). A broad one, such as 'https://', walks the
+        links in id order and stops after `limit` matches, so a page never sorts the whole table.
+        """
+        conditions, params = ['(expires_at IS NULL OR expires_at > ?)'], [int(time.time())]
+        table = 'links'
+        with time_query('dashboard_page'), self.pool.reader() as conn:
+            if query:
+                # Prefix match as a range so the indexes can be used
+                upper = prefix_upper_bound(query)
+                conditions.append('((short_code >= ? AND short_code < ?) OR (original_url >= ? AND original_url < ?))')
+                params += [query, upper, query, upper]
+                if count_prefix_matches(conn, query, SEARCH_SORT_LIMIT) >= SEARCH_SORT_LIMIT:
+                    table = 'links NOT INDEXED'
+            if below is not None:
+                conditions.append('id < ?')
+                params.append(below)
+            if above is not None:
+                conditions.append('id > ?')
+                params.append(above)
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+            params.append(limit)
+            return conn.execute(
+                f"SELECT * FROM {table} {where} ORDER BY id {'DESC' if descending else 'ASC'} LIMIT ?", params
+            ).fetchall()
+
+    def fetch_page(self, query='', after=None, before=None, page_size=50):
+        """Keyset pagination, newest first. Returns (links, prev_cursor, next_cursor).
+
+        `after` moves to older links, `before` to newer ones; cursors are link ids as strings.
+        """
+        after, before = parse_int(after), parse_int(before)
+        if before is not None:
+            rows = self.select_page(query, above=before, descending=False, limit=page_size + 1)
+        else:
+            rows = self.select_page(query, below=after, limit=page_size + 1)
+        return paginate(rows, page_size, after is not None, before is not None, lambda row: str(row['id']))
+
+    # --- Scans ---
+
+    def iter_links(self, chunk_size=1000, fields=('id', 'short_code', 'original_url', 'clicks')):
+        """Yields every link as a dict in id order, reading in chunks on a dedicated connection."""
+        conn = self.pool.open_standalone()
+        try:
+            last_id = 0
+            while True:
+                rows = conn.execute(
+                    f"SELECT {', '.join(fields)} FROM links WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, chunk_size)
+                ).fetchall()
+                if not rows:
+                    return
+                for row in rows:
+                    yield dict(row)
+                last_id = rows[-1]['id']
+        finally:
+            conn.close()
+
+    def scan_codes(self, marks=None, limit=None):
+        """Returns (codes, marks) for links added after `marks` (per-shard last seen ids)."""
+        last_id = marks[0] if marks else 0
+        sql = 'SELECT id, short_code FROM links WHERE id > ? ORDER BY id'
+        params = [last_id]
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        conn = self.pool.open_standalone()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        if rows:
+            last_id = rows[-1]['id']
+        return [row['short_code'] for row in rows], (last_id,)
+
+    def count(self):
+        """Number of links."""
+        with self.pool.reader() as conn:
+            return conn.execute('SELECT COUNT(*) FROM links').fetchone()[0]
+
+    # --- Analytics & stats ---
+
+    def clicks_by_bucket(self, short_code, granularity, since):
+        """Rollup buckets for one code."""
+        with self.pool.reader() as conn:
+            return clicks_by_bucket(conn, short_code, granularity, since)
+
+    def pool_stats(self):
+        return self.pool.stats()
+
+class ShardedStore:
+    """Links hash-partitioned by short code across several SQLite files.
+
+    Every shard is a SingleFileStore with its own pool (and its own write lock), so
+    writes to different shards run in parallel. The code sequence stays in the
+    catalog database (urls.db).
+    """
+
+    def __init__(self, shard_pools, catalog_pool):
+        self.shards = [SingleFileStore(shard_pool) for shard_pool in shard_pools]
+        self.shard_count = len(self.shards)
+        self.catalog = SingleFileStore(catalog_pool)
+
+    def init(self):
+        self.catalog.init()
+        for shard in self.shards:
+            shard.init()
+
+    def shard(self, short_code):
+        return self.shards[shard_for(short_code, self.shard_count)]
+
+    def group_by_shard(self, items, key):
+        """Splits items into one list per shard index."""
+        groups = {}
+        for item in items:
+            groups.setdefault(shard_for(key(item), self.shard_count), []).append(item)
+        return groups
+
+    def find_link(self, short_code):
+        return self.shard(short_code).find_link(short_code)
+
+    def insert(self, original_url, short_code, expires_at=None):
+        self.shard(short_code).insert(original_url, short_code, expires_at)
+
+    def insert_new(self, links):
+        taken = set()
+        for index, group in self.group_by_shard(links, key=lambda link: link[1]).items():
+            taken |= self.shards[index].insert_new(group)
+        return taken
+
+    def apply_clicks(self, deltas, events):
+        delta_groups = self.group_by_shard(deltas.items(), key=lambda item: item[0])
+        event_groups = self.group_by_shard(events, key=lambda event: event[1])
+        for index in set(delta_groups) | set(event_groups):
+            self.shards[index].apply_clicks(dict(delta_groups.get(index, [])), event_groups.get(index, []))
+
+    def reserve_block(self, block_size):
+        return self.catalog.reserve_block(block_size)
+
+    def delete_expired(self, now, batch_size):
+        codes = []
+        for shard in self.shards:
+            codes.extend(shard.delete_expired(now, batch_size))
+        return codes
+
+    def compact(self, step_pages):
+        return sum(shard.compact(step_pages) for shard in self.shards)
+
+    def fetch_page(self, query='', after=None, before=None, page_size=50):
+        """Merges one page from every shard, ordered by (id, shard) newest first.
+
+        Cursors are 'id-shard' strings so the position is exact across shards.
+        """
+        after, before = parse_shard_cursor(after), parse_shard_cursor(before)
+        rows = []
+        for index, shard in enumerate(self.shards):
+            if before is not None:
+                cursor_id, cursor_shard = before
+                # (id, index) > (cursor_id, cursor_shard)
+                above = cursor_id if index <= cursor_shard else cursor_id - 1
+                shard_rows = shard.select_page(query, above=above, descending=False, limit=page_size + 1)
+            else:
+                below = None
+                if after is not None:
+                    cursor_id, cursor_shard = after
+                    # (id, index) < (cursor_id, cursor_shard)
+                    below = cursor_id if index >= cursor_shard else cursor_id + 1
+                shard_rows = shard.select_page(query, below=below, limit=page_size + 1)
+            rows.extend((row['id'], index, row) for row in shard_rows)
+        rows.sort(key=lambda item: (item[0], item[1]), reverse=before is None)
+        merged = [dict(row, shard=index) for _, index, row in rows[:page_size + 1]]
+        return paginate(merged, page_size, after is not None, before is not None, lambda row: f"{row['id']}-{row['shard']}")
+
+    def iter_links(self, chunk_size=1000, fields=('id', 'short_code', 'original_url', 'clicks')):
+        """Yields every link, merged across shards in (id, shard) order."""
+        streams = [
+            ((link['id'], index, link) for link in shard.iter_links(chunk_size, fields))
+            for index, shard in enumerate(self.shards)
+        ]
+        for _, _, link in heapq.merge(*streams, key=lambda item: (item[0], item[1])):
+            yield link
+
+    def scan_codes(self, marks=None, limit=None):
+        marks = marks or (0,) * self.shard_count
+        codes, new_marks = [], []
+        for shard, mark in zip(self.shards, marks):
+            shard_codes, (shard_mark,) = shard.scan_codes((mark,), limit)
+            codes.extend(shard_codes)
+            new_marks.append(shard_mark)
+        return codes, tuple(new_marks)
+
+    def count(self):
+        return sum(shard.count() for shard in self.shards)
+
+    def clicks_by_bucket(self, short_code, granularity, since):
+        return self.shard(short_code).clicks_by_bucket(short_code, granularity, since)
+
+    def pool_stats(self):
+        stats = [shard.pool_stats() for shard in self.shards]
+        return {
+            'shards': self.shard_count,
+            'readers_open': sum(s['readers_open'] for s in stats),
+            'readers_idle': sum(s['readers_idle'] for s in stats),
+            'readers_max': sum(s['readers_max'] for s in stats),
+            'writer_open': sum(1 for s in stats if s['writer_open']),
+        }
+
+def is_expired(expires_at, now=None):
+    """True if a link's expires_at (unix time or None) has passed."""
+    return expires_at is not None and expires_at <= (time.time() if now is None else now)
+
+def parse_int(value):
+    """Parses an optional integer cursor, ignoring invalid values."""
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+def parse_shard_cursor(value):
+    """Parses an 'id-shard' cursor into (id, shard), ignoring invalid values."""
+    if value is None:
+        return None
+    try:
+        link_id, shard = value.split('-', 1)
+        return int(link_id), int(shard)
+    except ValueError:
+        return None
+
+def paginate(rows, page_size, has_after, has_before, cursor_of):
+    """Shared tail of keyset pagination: trims the look-ahead row and works out the cursors."""
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if has_before:
+        rows.reverse()
+        has_newer, has_older = has_more, True
+    else:
+        has_newer, has_older = has_after, has_more
+    prev_cursor = cursor_of(rows[0]) if rows and has_newer else None
+    next_cursor = cursor_of(rows[-1]) if rows and has_older else None
+    return rows, prev_cursor, next_cursor
+
+def open_store(shard_count=SHARD_COUNT, db_file=DB_FILE):
+    """Builds the configured store: one file, or `shard_count` shard files plus the catalog."""
+    if shard_count <= 1:
+        return SingleFileStore(pool if db_file == DB_FILE else ConnectionPool(db_file))
+    shard_pools = [ConnectionPool(shard_path(index, shard_count, db_file)) for index in range(shard_count)]
+    return ShardedStore(shard_pools, pool if db_file == DB_FILE else ConnectionPool(db_file))
+
+# Store used by the app
+store = open_store()
@@ -0,0 +1,140 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds (0.5 ms .. 2.5 s)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+def format_labels(names, values, extra=()):
+    """Formats label pairs as {a="x",b="y"} (empty string when there are none)."""
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+class Counter:
+    """A monotonically increasing counter with optional labels."""
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f'{self.name}{format_labels(self.label_names, label_values)} {value}')
+        return lines
+
+class Histogram:
+    """A cumulative-bucket histogram (Prometheus semantics) with optional labels."""
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for label_values, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{format_labels(self.label_names, label_values, [("le", bound)])} {cumulative}')
+            lines.append(f'{self.name}_bucket{format_labels(self.label_names, label_values, [("le", "+Inf")])} {series[-1]}')
+            lines.append(f'{self.name}_sum{format_labels(self.label_names, label_values)} {series[-2]:.6f}')
+            lines.append(f'{self.name}_count{format_labels(self.label_names, label_values)} {series[-1]}')
+        return lines
+
+class CallbackMetric:
+    """A gauge or counter whose value is read from a callback at scrape time."""
+
+    def __init__(self, name, documentation, callback, kind='gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.kind = kind
+
+    def render(self):
+        try:
+            value = self.callback()
+        except Exception:
+            return []  # never let a broken gauge take down the scrape
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}', f'{self.name} {value}']
+
+class MetricsRegistry:
+    """Holds every metric and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, label_names=()):
+        return self._register(Counter(name, documentation, label_names))
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def gauge_callback(self, name, documentation, callback, kind='gauge'):
+        return self._register(CallbackMetric(name, documentation, callback, kind))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+# Process-wide registry and the metrics shared by the Flask app and the ASGI server
+registry = MetricsRegistry()
+http_requests = registry.counter('http_requests_total', 'HTTP requests handled.', ('route', 'method', 'status'))
+http_latency = registry.histogram('http_request_duration_seconds', 'HTTP request latency in seconds.', ('route', 'method'))
+db_query_latency = registry.histogram('db_query_duration_seconds', 'SQLite statement latency in seconds.', ('statement',))
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+@contextmanager
+def time_query(statement):
+    """Times a block of database work under a statement label (lookup, click_update, insert, ...)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        db_query_latency.observe(time.perf_counter() - start, statement)
+
+def observe_request(route, method, status, seconds):
+    """Records one handled HTTP request."""
+    http_requests.inc(route, method, str(status))
+    http_latency.observe(seconds, route, method)
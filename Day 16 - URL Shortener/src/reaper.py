@@ -0,0 +1,90 @@
+import sqlite3
+import threading
+import time
+from link_store import store
+
+# Look for expired links every REAP_INTERVAL seconds, deleting at most REAP_BATCH_SIZE per transaction
+REAP_INTERVAL_SECONDS = 60.0
+REAP_BATCH_SIZE = 500
+# Compact the database file (incremental vacuum + PRAGMA optimize) this often
+VACUUM_INTERVAL_SECONDS = 3600.0
+VACUUM_STEP_PAGES = 1000
+
+class LinkReaper:
+    """Background thread that deletes expired links in small batches and periodically compacts the database."""
+
+    def __init__(self, interval=REAP_INTERVAL_SECONDS, batch_size=REAP_BATCH_SIZE,
+                 vacuum_interval=VACUUM_INTERVAL_SECONDS, vacuum_step=VACUUM_STEP_PAGES, on_deleted=None):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.vacuum_interval = vacuum_interval
+        self.vacuum_step = vacuum_step
+        self.on_deleted = on_deleted
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._last_vacuum = time.monotonic()
+        self.runs = 0
+        self.reaped = 0
+        self.vacuums = 0
+        self.pages_freed = 0
+
+    def reap(self):
+        """Deletes every link that has expired, one small transaction at a time. Returns the number deleted."""
+        with self._lock:
+            now = int(time.time())
+            deleted = 0
+            while not self._stopped.is_set():
+                codes = store.delete_expired(now, self.batch_size)
+                if not codes:
+                    break
+                deleted += len(codes)
+                if self.on_deleted:
+                    self.on_deleted(codes)
+                # Give other writers a turn between batches
+                time.sleep(0.01)
+            self.runs += 1
+            self.reaped += deleted
+            return deleted
+
+    def compact(self):
+        """Frees unused pages and refreshes query planner statistics. Returns the number of pages freed."""
+        with self._lock:
+            freed = store.compact(self.vacuum_step)
+            self._last_vacuum = time.monotonic()
+            self.vacuums += 1
+            self.pages_freed += freed
+            return freed
+
+    def start(self):
+        """Starts the background thread (once)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='link-reaper', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stops the background thread after its current batch."""
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.interval + 5)
+
+    def stats(self):
+        """Returns the reaper counters."""
+        return {
+            'runs': self.runs,
+            'reaped': self.reaped,
+            'vacuums': self.vacuums,
+            'pages_freed': self.pages_freed,
+        }
+
+    def _run(self):
+        """Background loop: reap every interval, compact every vacuum_interval."""
+        while not self._stopped.wait(self.interval):
+            try:
+                self.reap()
+                if time.monotonic() - self._last_vacuum >= self.vacuum_interval:
+                    self.compact()
+            except sqlite3.Error as e:
+                print(f"Error reaping expired links: {e}")
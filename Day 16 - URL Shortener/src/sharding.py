@@ -0,0 +1,154 @@
+"""
+Shard migration tool for the URL Shortener.
+
+Links are hash-partitioned by short code (see link_store.py). This tool
+moves existing data between layouts:
+
+    python src/sharding.py migrate --shards 4
+        single urls.db -> 4 shard files (urls.shard0of4.db ...)
+    python src/sharding.py rebalance --from-shards 4 --to-shards 8
+        re-hashes every link, click event and rollup row into 8 shards
+    python src/sharding.py status --shards 4
+        prints the link count of every shard
+
+Stop the servers before migrating, then start them with
+URL_SHORTENER_SHARDS set to the new shard count. The source files are
+left untouched, so switching the variable back restores the old layout.
+"""
+import argparse
+import sys
+from database import open_connection
+from link_store import open_store, shard_for, SingleFileStore
+from analytics import ROLLUPS
+
+# Rows copied per transaction
+MIGRATE_CHUNK_SIZE = 5000
+
+LINK_FIELDS = ('id', 'short_code', 'original_url', 'clicks', 'expires_at')
+
+def shards_of(store):
+    """The list of SingleFileStores behind a store."""
+    return [store] if isinstance(store, SingleFileStore) else store.shards
+
+def group_rows(rows, shard_count):
+    """Groups rows (short_code first) by their target shard index."""
+    groups = {}
+    for row in rows:
+        groups.setdefault(shard_for(row[0], shard_count), []).append(row)
+    return groups
+
+def write_groups(targets, groups, sql):
+    """Runs one executemany per target shard."""
+    for index, rows in groups.items():
+        with targets[index].pool.writer() as conn:
+            conn.executemany(sql, rows)
+
+def iter_table(db_file, sql, chunk_size):
+    """Yields chunks of rows from a query on a dedicated connection."""
+    conn = open_connection(db_file)
+    try:
+        cursor = conn.execute(sql)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield [tuple(row) for row in rows]
+    finally:
+        conn.close()
+
+def copy_links(source, targets, chunk_size):
+    """Copies links in global (id, shard) order so each target keeps the original creation order."""
+    copied, batch = 0, []
+    for link in source.iter_links(chunk_size, LINK_FIELDS):
+        batch.append((link['short_code'], link['original_url'], link['clicks'], link['expires_at']))
+        if len(batch) >= chunk_size:
+            write_groups(targets, group_rows(batch, len(targets)), 'INSERT INTO links (short_code, original_url, clicks, expires_at) VALUES (?, ?, ?, ?)')
+            copied += len(batch)
+            batch = []
+    if batch:
+        write_groups(targets, group_rows(batch, len(targets)), 'INSERT INTO links (short_code, original_url, clicks, expires_at) VALUES (?, ?, ?, ?)')
+        copied += len(batch)
+    return copied
+
+def copy_events(sources, targets, chunk_size):
+    """Copies the raw click log, routing each event by its short code."""
+    copied = 0
+    for source in sources:
+        for rows in iter_table(source.pool.db_file, 'SELECT short_code, ts, referrer, ua_class FROM click_events ORDER BY id', chunk_size):
+            write_groups(targets, group_rows(rows, len(targets)), 'INSERT INTO click_events (short_code, ts, referrer, ua_class) VALUES (?, ?, ?, ?)')
+            copied += len(rows)
+    return copied
+
+def copy_rollups(sources, targets, chunk_size):
+    """Copies every rollup table, adding to buckets that already exist in the target."""
+    copied = 0
+    for table, _ in ROLLUPS.values():
+        upsert = (
+            f'INSERT INTO {table} (short_code, bucket, clicks) VALUES (?, ?, ?) '
+            'ON CONFLICT (short_code, bucket) DO UPDATE SET clicks = clicks + excluded.clicks'
+        )
+        for source in sources:
+            for rows in iter_table(source.pool.db_file, f'SELECT short_code, bucket, clicks FROM {table}', chunk_size):
+                write_groups(targets, group_rows(rows, len(targets)), upsert)
+                copied += len(rows)
+    return copied
+
+def clear(targets):
+    """Deletes every link, click event and rollup row from the target shards."""
+    for target in targets:
+        with target.pool.writer() as conn:
+            conn.execute('DELETE FROM links')
+            conn.execute('DELETE FROM click_events')
+            for table, _ in ROLLUPS.values():
+                conn.execute(f'DELETE FROM {table}')
+
+def rebalance(from_shards, to_shards, chunk_size=MIGRATE_CHUNK_SIZE, force=False):
+    """Copies all data from the `from_shards` layout into the `to_shards` layout. Returns copy counts."""
+    if from_shards == to_shards:
+        raise ValueError('Source and target shard counts are the same.')
+    source, target = open_store(from_shards), open_store(to_shards)
+    sources, targets = shards_of(source), shards_of(target)
+    target.init()
+    if target.count():
+        if not force:
+            raise ValueError('Target shards already contain links; pass --force to replace them.')
+        clear(targets)
+    return {
+        'links': copy_links(source, targets, chunk_size),
+        'click_events': copy_events(sources, targets, chunk_size),
+        'rollup_rows': copy_rollups(sources, targets, chunk_size),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Split or re-shard the URL Shortener's link storage.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    mig = sub.add_parser('migrate', help='Split the single urls.db into N shard files')
+    mig.add_argument('--shards', type=int, required=True)
+    reb = sub.add_parser('rebalance', help='Re-hash data from one shard count to another')
+    reb.add_argument('--from-shards', type=int, required=True)
+    reb.add_argument('--to-shards', type=int, required=True)
+    for command in (mig, reb):
+        command.add_argument('--chunk-size', type=int, default=MIGRATE_CHUNK_SIZE)
+        command.add_argument('--force', action='store_true', help='Replace data already in the target shards')
+    st = sub.add_parser('status', help='Print the number of links in each shard')
+    st.add_argument('--shards', type=int, required=True)
+    args = parser.parse_args(argv)
+
+    if args.command == 'status':
+        for shard in shards_of(open_store(args.shards)):
+            print(f"{shard.pool.db_file}: {shard.count()} links")
+        return
+    from_shards, to_shards = (1, args.shards) if args.command == 'migrate' else (args.from_shards, args.to_shards)
+    if from_shards < 1 or to_shards < 1:
+        parser.error('shard counts must be at least 1')
+    try:
+        counts = rebalance(from_shards, to_shards, args.chunk_size, args.force)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Copied {counts['links']} links, {counts['click_events']} click events and "
+          f"{counts['rollup_rows']} rollup rows into {to_shards} shard(s).")
+    print(f"Start the app with URL_SHORTENER_SHARDS={to_shards} to use the new layout.")
+
+if __name__ == '__main__':
+    main()
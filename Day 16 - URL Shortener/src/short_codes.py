@@ -0,0 +1,67 @@
+import random
+import re
+import string
+import threading
+from link_store import store
+
+# 'sequential' hands out base62-encoded numbers from a shared sequence (cannot collide);
+# 'random' keeps the original behaviour of picking 6 random characters.
+SHORT_CODE_MODE = 'sequential'
+# How many sequence numbers a process reserves at once
+ID_BLOCK_SIZE = 100
+
+BASE62_ALPHABET = string.digits + string.ascii_letters
+CUSTOM_CODE_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+# Paths that are handled by other routes and would shadow a short link
+RESERVED_CODES = {'shorten', 'stats', 'metrics'}
+
+def encode_base62(number):
+    """Encodes a non-negative integer as a base62 string."""
+    if number == 0:
+        return BASE62_ALPHABET[0]
+    digits = []
+    while number:
+        number, remainder = divmod(number, 62)
+        digits.append(BASE62_ALPHABET[remainder])
+    return ''.join(reversed(digits))
+
+def decode_base62(code):
+    """Decodes a base62 string back into an integer."""
+    number = 0
+    for char in code:
+        number = number * 62 + BASE62_ALPHABET.index(char)
+    return number
+
+def generate_random_code(length=6):
+    """Generates a random alphanumeric short code."""
+    characters = string.ascii_letters + string.digits
+    return ''.join(random.choice(characters) for _ in range(length))
+
+def is_valid_custom_code(code):
+    """Checks that a custom code is URL-safe and does not clash with a built-in route."""
+    return bool(CUSTOM_CODE_PATTERN.match(code)) and code.lower() not in RESERVED_CODES
+
+class ShortCodeGenerator:
+    """Hands out short codes from blocks of sequence numbers reserved in the database."""
+
+    def __init__(self, mode=SHORT_CODE_MODE, block_size=ID_BLOCK_SIZE):
+        self.mode = mode
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def next_code(self):
+        """Returns a fresh short code. Only touches the database once per block."""
+        if self.mode == 'random':
+            return generate_random_code()
+        with self._lock:
+            if self._next >= self._end:
+                self._next, self._end = self._reserve_block()
+            number = self._next
+            self._next += 1
+        return encode_base62(number)
+
+    def _reserve_block(self):
+        """Atomically advances the shared sequence by one block and returns its [start, end) range."""
+        return store.reserve_block(self.block_size)
@@ -1,40 +1,69 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, g
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, g, jsonify
+import io
 import sqlite3
-import random
-import string
 import os
-from database import get_db_connection
+import time
+from datetime import datetime, timezone
+from database import DB_FILE
+from link_store import store
+from link_service import (
+    link_cache, click_counter, code_generator, code_filter,
+    link_reaper, lookup_original_url, create_link, parse_expires_in, links_created, LinkError, UnknownShortCode,
+)
+from analytics import ROLLUPS
+import metrics
+import bulk_io
 
 # App configuration
 app = Flask(__name__, template_folder='templates')
 app.config['SECRET_KEY'] = 'your_very_secret_key_change_this'
-DB_FILE = os.path.join(os.path.dirname(__file__), 'urls.db')
-
-def get_db():
-    """Opens a new database connection if one is not already open."""
-    if 'db' not in g:
-        g.db = get_db_connection()
-    return g.db
-
-@app.teardown_appcontext
-def close_db(e=None):
-    """Closes the database connection at the end of the request."""
-    db = g.pop('db', None)
-    if db is not None:
-        db.close()
-
-def generate_short_code(length=6):
-    """Generates a random alphanumeric short code."""
-    characters = string.ascii_letters + string.digits
-    return ''.join(random.choice(characters) for _ in range(length))
+
+# Dashboard pagination
+DASHBOARD_PAGE_SIZE = 50
+DASHBOARD_MAX_PAGE_SIZE = 500
+
+@app.before_request
+def start_timer():
+    """Remembers when the request started for the latency histogram."""
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Counts the request and records its latency under the matched route pattern."""
+    start = g.get('request_start')
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else '<unmatched>'
+        metrics.observe_request(route, request.method, response.status_code, time.perf_counter() - start)
+    return response
+
+@app.template_filter('utc_time')
+def utc_time(timestamp):
+    """Formats a unix timestamp for the dashboard."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%d %H:%M UTC')
+
+def int_arg(name, default=None):
+    """Reads an optional integer query parameter, ignoring invalid values."""
+    try:
+        return int(request.args[name])
+    except (KeyError, ValueError):
+        return default
 
 @app.route('/', methods=['GET'])
 def index():
-    """Main dashboard page. Shows form and all links."""
-    db = get_db()
-    links = db.execute('SELECT * FROM links ORDER BY id DESC').fetchall()
+    """Main dashboard page. Shows form and one page of links."""
+    query = request.args.get('q', '').strip()
+    page_size = max(1, min(int_arg('per_page', DASHBOARD_PAGE_SIZE), DASHBOARD_MAX_PAGE_SIZE))
+    # Keyset pagination (merged across shards when sharding is enabled)
+    links, prev_cursor, next_cursor = store.fetch_page(
+        query, after=request.args.get('after'), before=request.args.get('before'), page_size=page_size
+    )
     base_url = request.host_url
-    return render_template('index.html', links=links, base_url=base_url)
+    # Include clicks that are still waiting to be flushed
+    pending_clicks = click_counter.pending()
+    return render_template(
+        'index.html', links=links, base_url=base_url, pending_clicks=pending_clicks,
+        query=query, per_page=page_size, prev_cursor=prev_cursor, next_cursor=next_cursor
+    )
 
 @app.route('/shorten', methods=['POST'])
 def shorten():
@@ -42,34 +71,12 @@ def shorten():
     original_url = request.form['original_url']
     custom_code = request.form['custom_code'].strip()
     
-    if not original_url:
-        flash('Original URL is required!', 'error')
-        return redirect(url_for('index'))
-
-    db = get_db()
-    
-    if custom_code:
-        # User provided a custom code
-        existing = db.execute('SELECT * FROM links WHERE short_code = ?', (custom_code,)).fetchone()
-        if existing:
-            flash(f"Custom code '{custom_code}' is already taken!", 'error')
-            return redirect(url_for('index'))
-        short_code = custom_code
-    else:
-        # Generate a new short code
-        while True:
-            short_code = generate_short_code()
-            existing = db.execute('SELECT * FROM links WHERE short_code = ?', (short_code,)).fetchone()
-            if not existing:
-                break
-    
     try:
-        db.execute(
-            'INSERT INTO links (original_url, short_code) VALUES (?, ?)',
-            (original_url, short_code)
-        )
-        db.commit()
+        expires_in = parse_expires_in(request.form.get('expires_in'))
+        create_link(original_url, custom_code, expires_in)
         flash(f"Success! Your short link is ready.", 'success')
+    except LinkError as e:
+        flash(str(e), 'error')
     except sqlite3.Error as e:
         flash(f"An error occurred: {e}", 'error')
 
@@ -78,32 +85,114 @@ def shorten():
 @app.route('/<string:short_code>')
 def redirect_to_url(short_code):
     """Redirect endpoint. Finds link, logs click, and redirects."""
-    db = get_db()
-    link = db.execute('SELECT * FROM links WHERE short_code = ?', (short_code,)).fetchone()
-    
-    if link:
-        # Increment click count
-        try:
-            db.execute(
-                'UPDATE links SET clicks = clicks + 1 WHERE short_code = ?',
-                (short_code,)
-            )
-            db.commit()
-        except sqlite3.Error as e:
-            print(f"Error incrementing click: {e}")
-            
+    try:
+        original_url = lookup_original_url(short_code)
+    except UnknownShortCode:
+        # Ruled out by the Bloom filter without a lookup; answered like any unknown code below
+        original_url = None
+
+    if original_url:
+        # Count the click in memory; it is written to the database in batches
+        click_counter.record(short_code, request.referrer, request.user_agent.string)
+
         # Redirect to the original URL
-        return redirect(link['original_url'])
+        return redirect(original_url)
     else:
         # If the link doesn't exist, go to the home page
         flash(f"Short link '{short_code}' not found.", 'error')
         return redirect(url_for('index'))
 
+@app.route('/api/links/<string:short_code>/clicks')
+def link_clicks(short_code):
+    """Returns bucketed click counts for one link, e.g. ?granularity=hour&days=30."""
+    granularity = request.args.get('granularity', 'hour')
+    if granularity not in ROLLUPS:
+        return jsonify(error=f"granularity must be one of: {', '.join(ROLLUPS)}"), 400
+    days = max(1, min(int_arg('days', 30), 366))
+    since = int(time.time()) - days * 86400
+    # Make sure recent clicks are included in the rollups
+    click_counter.flush()
+    buckets = store.clicks_by_bucket(short_code, granularity, since)
+    return jsonify(
+        short_code=short_code,
+        granularity=granularity,
+        since=datetime.fromtimestamp(since, timezone.utc).isoformat(),
+        buckets=[
+            {'start': datetime.fromtimestamp(bucket, timezone.utc).isoformat(), 'clicks': clicks}
+            for bucket, clicks in buckets
+        ],
+        total=sum(clicks for _, clicks in buckets),
+    )
+
+@app.route('/api/links/bulk', methods=['POST'])
+def bulk_import():
+    """Imports links from a CSV or JSONL request body in batched transactions."""
+    fmt = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'jsonl')
+    if fmt not in bulk_io.FORMATS:
+        return jsonify(error=f"format must be one of: {', '.join(bulk_io.FORMATS)}"), 400
+    # Parse the body as it streams in rather than reading it all first
+    lines = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+    report = bulk_io.import_links(
+        bulk_io.iter_rows(lines, fmt),
+        generator=code_generator,
+        on_created=links_created,
+    )
+    return jsonify(report)
+
+@app.route('/api/links/export')
+def bulk_export():
+    """Streams every link as CSV or JSONL without loading the table into memory."""
+    fmt = request.args.get('format', 'jsonl')
+    if fmt not in bulk_io.FORMATS:
+        return jsonify(error=f"format must be one of: {', '.join(bulk_io.FORMATS)}"), 400
+    # Write pending clicks first so the exported counts are current
+    click_counter.flush()
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(
+        bulk_io.iter_export(fmt),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=links.{fmt}'},
+    )
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint: request counts, latency histograms, query timings and gauges."""
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/stats/cache')
+def cache_stats():
+    """Returns the redirect cache counters as JSON."""
+    return jsonify(link_cache.stats())
+
+@app.route('/stats/bloom')
+def bloom_stats():
+    """Returns the unknown-code filter counters as JSON."""
+    return jsonify(code_filter.stats())
+
+@app.route('/stats/pool')
+def pool_stats():
+    """Returns the connection pool usage (summed over shards) as JSON."""
+    return jsonify(store.pool_stats())
+
+@app.route('/stats/reaper')
+def reaper_stats():
+    """Returns the expired-link reaper counters as JSON."""
+    return jsonify(link_reaper.stats())
+
+@app.route('/stats/clicks')
+def click_stats():
+    """Returns the write-behind click counter state as JSON."""
+    return jsonify(click_counter.stats())
+
 if __name__ == '__main__':
     # Check if DB exists before running
     if not os.path.exists(DB_FILE):
         print("Database not found!")
         print("Please run 'python src/database.py' to initialize the database.")
     else:
+        # Bring older databases up to the current schema (safe to run every time)
+        store.init()
+        code_filter.rebuild()
+        link_reaper.start()
         print("Starting Flask server at http://127.0.0.1:5000")
         app.run(debug=True)
\ No newline at end of file